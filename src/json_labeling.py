@@ -1,6 +1,10 @@
 import os
 import json
 import time
+import asyncio
+import hashlib
+import unicodedata
+from collections import deque
 from tqdm import tqdm
 import logging
 import argparse
@@ -8,15 +12,25 @@ import pyperclip
 import sys
 import re
 
-# Set up logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('classification_json.log'),
-        logging.StreamHandler()
-    ]
+SYSTEM_PROMPT = "You are a helpful assistant."
+PROMPT_HEADER = (
+    "You are a Vietnamese sentiment classifier. Classify each comment as one of <NEG>, <NEU>, or <POS>.\n"
+    "Reply in the format: INDEX: <NEG/NEU/POS>\n\n"
 )
+PROMPT_FOOTER = "\nReply with lines in the form:\nINDEX: <NEG/NEU/POS>\n"
+# Longer comments are clipped in the prompt (head and tail kept)
+MAX_COMMENT_TOKENS = 500
+
+def setup_logging():
+    """Log to classification_json.log and the console."""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler('classification_json.log'),
+            logging.StreamHandler()
+        ]
+    )
 
 def extract_sentiment(label_text):
     """Extract just the NEG/NEU/POS from potentially longer label text."""
@@ -29,6 +43,83 @@ def extract_sentiment(label_text):
         return "NEU"
     return None
 
+def clip_comment(text, max_tokens=MAX_COMMENT_TOKENS):
+    """Keep the head and tail of a comment that is too long for one prompt line."""
+    max_chars = max_tokens * 4
+    if len(text) <= max_chars:
+        return text
+    half = max_chars // 2
+    return text[:half] + " … " + text[-half:]
+
+def prompt_line(item):
+    text = " ".join(clip_comment(item["content"]).splitlines())
+    return f"Comment {item['global_index']}: {text}\n"
+
+def build_prompt(chunk, footer=True):
+    """Build the classification prompt for a chunk of flattened comments."""
+    prompt = PROMPT_HEADER
+    for item in chunk:
+        prompt += prompt_line(item)
+    if footer:
+        prompt += PROMPT_FOOTER
+    return prompt
+
+def parse_label_line(line):
+    """
+    Parse one 'INDEX: <NEG/NEU/POS>' line.
+    Returns (index, '<LABEL>') or None if the line is not a valid label.
+    """
+    parts = line.split(":")
+    if len(parts) != 2:
+        return None
+    idx_str, label = parts[0].strip(), parts[1].strip()
+    sentiment_type = extract_sentiment(label)
+    if not sentiment_type:
+        return None
+    try:
+        return int(idx_str.replace("Comment", "").strip()), f"<{sentiment_type}>"
+    except ValueError:
+        return None
+
+def parse_answer(text):
+    """Parse a model reply into {global_index: '<LABEL>'}; later lines win."""
+    labels = {}
+    for line in text.strip().splitlines():
+        parsed = parse_label_line(line)
+        if parsed:
+            labels[parsed[0]] = parsed[1]
+    return labels
+
+def estimate_tokens(text):
+    """Rough token estimate for rate limiting (about 4 characters per token)."""
+    return len(text) // 4 + 1
+
+def item_tokens(item):
+    """Estimated tokens an item adds to a request: its prompt line plus its answer line."""
+    return estimate_tokens(prompt_line(item)) + estimate_tokens(f"{item['global_index']}: <NEU>\n")
+
+def pack_batches(items, target_tokens=2000, max_items=50):
+    """
+    Split items into consecutive batches of about target_tokens estimated tokens
+    (prompt overhead included) and at most max_items each.
+    An item that alone exceeds the target gets a batch of its own; its text is
+    already clipped to MAX_COMMENT_TOKENS in the prompt.
+    target_tokens=None packs by max_items only.
+    """
+    overhead = estimate_tokens(SYSTEM_PROMPT + PROMPT_HEADER + PROMPT_FOOTER)
+    batches = []
+    batch, used = [], overhead
+    for it in items:
+        cost = item_tokens(it)
+        if batch and (len(batch) >= max_items or (target_tokens is not None and used + cost > target_tokens)):
+            batches.append(batch)
+            batch, used = [], overhead
+        batch.append(it)
+        used += cost
+    if batch:
+        batches.append(batch)
+    return batches
+
 def load_json(json_path):
     """Load JSON data from a file."""
     try:
@@ -44,8 +135,10 @@ def save_json(json_path, data):
     try:
         with open(json_path, "w", encoding="utf-8") as f:
             json.dump(data, f, ensure_ascii=False, indent=2)
+        return True
     except Exception as e:
         logging.error(f"Error saving JSON: {str(e)}")
+        return False
 
 def flatten_comments(data):
     """
@@ -79,11 +172,80 @@ def restore_comments(data, flattened):
     Write back each labeled comment's sentiment into the original data structure.
     """
     for item in flattened:
+        sentiment = item.get("sentiment")
+        if not sentiment:
+            continue
         o_idx = item["outer_idx"]
         c_idx = item["comment_idx"]
-        sentiment = item["sentiment"]
         data[o_idx]["comments"][c_idx]["sentiment"] = sentiment
 
+def content_hash(text):
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest()
+
+class LabelJournal:
+    """
+    Append-only JSONL checkpoint of labels, written after every chunk.
+    Each line records global_index, outer_idx, comment_idx, a content hash and the
+    sentiment, so a resumed run only reuses labels for the very same comments.
+    """
+    def __init__(self, path):
+        self.path = path
+
+    def append(self, items):
+        """Append labeled items and fsync so they survive a crash."""
+        lines = [
+            json.dumps({
+                "global_index": it["global_index"],
+                "outer_idx": it["outer_idx"],
+                "comment_idx": it["comment_idx"],
+                "hash": content_hash(it["content"]),
+                "sentiment": it["sentiment"],
+            }, ensure_ascii=False) + "\n"
+            for it in items if it.get("sentiment")
+        ]
+        if not lines:
+            return
+        # Start on a fresh line if a crash left a partial last line behind
+        if os.path.exists(self.path) and os.path.getsize(self.path) > 0:
+            with open(self.path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    lines.insert(0, "\n")
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.writelines(lines)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def load(self):
+        """Return {global_index: entry}; a torn last line is ignored."""
+        entries = {}
+        if not os.path.exists(self.path):
+            return entries
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                entries[entry["global_index"]] = entry
+        return entries
+
+    def apply(self, flattened):
+        """Copy journaled labels onto matching flattened items; returns how many were applied."""
+        entries = self.load()
+        applied = 0
+        for it in flattened:
+            entry = entries.get(it["global_index"])
+            if entry and entry["outer_idx"] == it["outer_idx"] and entry["comment_idx"] == it["comment_idx"] \
+                    and entry["hash"] == content_hash(it["content"]):
+                it["sentiment"] = entry["sentiment"]
+                applied += 1
+        return applied
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
 def get_user_input_immediate(chunk, all_items, auto_copy=True):
     """
     Immediately parse lines as user enters them.
@@ -91,12 +253,7 @@ def get_user_input_immediate(chunk, all_items, auto_copy=True):
     If the same index appears multiple times, the last one will overwrite the previous.
     """
     # Build the prompt text
-    prompt = (
-        "You are a Vietnamese sentiment classifier. Classify each comment as one of <NEG>, <NEU>, or <POS>.\n"
-        "Reply in the format: INDEX: <NEG/NEU/POS>\n\n"
-    )
-    for item in chunk:
-        prompt += f"Comment {item['global_index']}: {item['content']}\n"
+    prompt = build_prompt(chunk, footer=False)
 
     print("\n=== PROMPT TO COPY (if needed) ===")
     print(prompt)
@@ -127,25 +284,13 @@ def get_user_input_immediate(chunk, all_items, auto_copy=True):
             print("Aborting this chunk...")
             break
         
-        parts = user_line.split(":")
-        if len(parts) == 2:
-            idx_str, label = parts[0].strip(), parts[1].strip()
-            sentiment_type = extract_sentiment(label)
-            if sentiment_type:
-                # Attempt to parse the integer index
-                idx_str = idx_str.replace('Comment', '').strip()
-                try:
-                    real_idx = int(idx_str)
-                    if real_idx in needed_indices:
-                        new_labels[real_idx] = f"<{sentiment_type}>"
-                    else:
-                        print(f"Index {real_idx} not in current chunk.")
-                except ValueError:
-                    print(f"Could not parse index '{idx_str}', please try again.")
-            else:
-                print("Invalid sentiment. Must contain NEG, NEU, or POS.")
+        parsed = parse_label_line(user_line)
+        if parsed is None:
+            print("Invalid line. Use 'INDEX: <NEG/NEU/POS>' with a numeric index.")
+        elif parsed[0] in needed_indices:
+            new_labels[parsed[0]] = parsed[1]
         else:
-            print("Invalid format. Use 'INDEX: <NEG/NEU/POS>'.")
+            print(f"Index {parsed[0]} not in current chunk.")
         
         for assigned_idx in list(needed_indices):
             if assigned_idx in new_labels:
@@ -160,79 +305,392 @@ def get_user_input_immediate(chunk, all_items, auto_copy=True):
 
     return len(new_labels)
 
-def manual_classify(flattened, chunk_size=10, auto_copy=True):
-    """Manual classification logic."""
-    idx = 0
+def manual_classify(flattened, chunk_size=10, auto_copy=True, on_chunk=None, batch_tokens=None):
+    """
+    Manual classification logic. Chunks hold at most chunk_size comments and about
+    batch_tokens estimated tokens. on_chunk(chunk) is called after each chunk.
+    """
     with tqdm(total=len(flattened), desc="Processing comments") as pbar:
-        while idx < len(flattened):
-            chunk = flattened[idx:idx+chunk_size]
+        for chunk in pack_batches(flattened, target_tokens=batch_tokens, max_items=chunk_size):
             processed = get_user_input_immediate(chunk, flattened, auto_copy=auto_copy)
+            if on_chunk:
+                on_chunk(chunk)
             pbar.update(len(chunk))
             logging.info(f"Processed {processed}/{len(chunk)} comments in chunk")
-            idx += chunk_size
 
-def automatic_classify(flattened, chunk_size=10):
-    """Automatic classification logic using openai (if needed)."""
-    from openai import OpenAI
-    client = OpenAI(api_key="YOUR_API_KEY")
+_EMOJI_RE = re.compile(
+    "[\U0001F000-\U0001FAFF\u2600-\u27BF\u2B00-\u2BFF\u3030\u303D\u3297\u3299]"
+)
+_EMOJI_NOISE_RE = re.compile("[\uFE0E\uFE0F\u200D\U0001F3FB-\U0001F3FF]")
 
-    idx = 0
-    with tqdm(total=len(flattened), desc="Processing comments") as pbar:
-        while idx < len(flattened):
-            chunk = flattened[idx:idx+chunk_size]
-            prompt = (
-                "You are a Vietnamese sentiment classifier. Classify each comment as one of <NEG>, <NEU>, or <POS>. "
-                "Reply in the format: INDEX: <NEG/NEU/POS>\n\n"
-            )
-            for it in chunk:
-                prompt += f"Comment {it['global_index']}: {it['content']}\n"
-            prompt += "\nReply with lines in the form:\nINDEX: <NEG/NEU/POS>\n"
+def normalize_text(text):
+    """
+    Cache key for a comment: case- and diacritic-insensitive (đ -> d), whitespace
+    collapsed, emoji variation selectors/skin tones dropped, and runs of the same
+    emoji or punctuation collapsed to one.
+    """
+    text = _EMOJI_NOISE_RE.sub("", text)
+    text = unicodedata.normalize("NFKD", text.casefold())
+    text = "".join(ch for ch in text if not unicodedata.combining(ch)).replace("đ", "d")
+    # Space out emoji so "tốt😍😍" and "tốt 😍" share a key
+    text = _EMOJI_RE.sub(lambda m: f" {m.group(0)} ", text)
+    text = re.sub(r"(\S)(?:\s*\1)+", lambda m: m.group(1) if not m.group(1).isalnum() else m.group(0), text)
+    return re.sub(r"\s+", " ", text).strip()
 
+class LabelCache:
+    """Persistent normalized-text -> label cache stored as a JSON object."""
+    def __init__(self, path):
+        self.path = path
+        self.labels = {}
+        self.hits = 0
+        if path and os.path.exists(path):
             try:
-                response = client.chat.completions.create(
-                    model="gpt-4o-mini",
-                    messages=[
-                        {"role": "system", "content": "You are a helpful assistant."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    temperature=0.0
-                )
-                answer = response.choices[0].message.content.strip().splitlines()
-                processed = 0
-
-                for line in answer:
-                    parts = line.split(":")
-                    if len(parts) == 2:
-                        idx_str, label = parts[0].strip(), parts[1].strip()
-                        sentiment_type = extract_sentiment(label)
-                        if sentiment_type:
-                            try:
-                                real_idx = int(idx_str.replace("Comment", "").strip())
-                                # find item in chunk with global_index == real_idx
-                                for it in chunk:
-                                    if it["global_index"] == real_idx:
-                                        it["sentiment"] = f"<{sentiment_type}>"
-                                        processed += 1
-                                        break
-                            except ValueError:
-                                logging.error(f"Error parsing index in line {line}")
-            
+                with open(path, "r", encoding="utf-8") as f:
+                    self.labels = json.load(f)
             except Exception as e:
-                logging.error(f"API error: {str(e)}")
-                time.sleep(5)
+                logging.warning(f"Could not read label cache {path}: {str(e)}")
+
+    def get(self, key):
+        label = self.labels.get(key)
+        if label:
+            self.hits += 1
+        return label
+
+    def put(self, key, label):
+        self.labels[key] = label
+
+    def save(self):
+        """Write atomically so an interrupted save never corrupts the cache."""
+        if not self.path:
+            return
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.labels, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+class TextDeduper:
+    """
+    Collapse comments with the same normalized text so each is classified once.
+    prepare() applies cached labels and returns one representative per unseen text;
+    fan_out() copies a labeled representative's sentiment to its duplicates.
+    """
+    def __init__(self, cache=None):
+        self.cache = cache
+        self.groups = {}
+
+    def prepare(self, items):
+        """Returns (representatives to classify, items labeled from the cache)."""
+        representatives = []
+        cached = []
+        for it in items:
+            key = normalize_text(it["content"])
+            label = self.cache.get(key) if self.cache else None
+            if label:
+                it["sentiment"] = label
+                cached.append(it)
+            elif key in self.groups:
+                self.groups[key].append(it)
+            else:
+                self.groups[key] = [it]
+                representatives.append(it)
+        logging.info(
+            f"{len(items)} comments: {len(cached)} from cache, "
+            f"{len(items) - len(cached) - len(representatives)} duplicates collapsed, "
+            f"{len(representatives)} unique texts to classify"
+        )
+        return representatives, cached
+
+    def fan_out(self, chunk, remember=True):
+        """
+        Propagate labels from a chunk of representatives; returns all items labeled.
+        remember=False keeps the labels out of the persistent cache (e.g. local-model guesses).
+        """
+        labeled = []
+        for rep in chunk:
+            label = rep.get("sentiment")
+            if not label:
                 continue
+            key = normalize_text(rep["content"])
+            for it in self.groups.get(key, [rep]):
+                it["sentiment"] = label
+                labeled.append(it)
+            if remember and self.cache is not None:
+                self.cache.put(key, label)
+        return labeled
 
-            pbar.update(len(chunk))
-            logging.info(f"Processed {processed}/{len(chunk)} comments in chunk")
-            idx += chunk_size
+class RateLimiter:
+    """
+    Sliding one-minute window limiter for requests per minute and tokens per minute.
+    Either limit may be None (unlimited).
+    """
+    def __init__(self, rpm=None, tpm=None, clock=time.monotonic, sleep=asyncio.sleep):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.clock = clock
+        self.sleep = sleep
+        self.window = deque()  # (timestamp, tokens)
+        self.tokens_in_window = 0
+        self.lock = asyncio.Lock()
+
+    def _prune(self, now):
+        while self.window and now - self.window[0][0] >= 60:
+            _, tokens = self.window.popleft()
+            self.tokens_in_window -= tokens
+
+    def _fits(self, tokens):
+        if self.rpm is not None and len(self.window) >= self.rpm:
+            return False
+        # A single request larger than the TPM limit is let through on an empty window
+        if self.tpm is not None and self.window and self.tokens_in_window + tokens > self.tpm:
+            return False
+        return True
+
+    async def acquire(self, tokens=0):
+        """Wait until a request of the given size fits in the window, then record it."""
+        async with self.lock:
+            while True:
+                now = self.clock()
+                self._prune(now)
+                if self._fits(tokens):
+                    self.window.append((now, tokens))
+                    self.tokens_in_window += tokens
+                    return
+                await self.sleep(max(0.01, 60 - (now - self.window[0][0])))
+
+class ClassificationStats:
+    """Throughput and latency numbers for one classification run."""
+    def __init__(self):
+        self.started = time.monotonic()
+        self.latencies = []
+        self.requests = 0
+        self.errors = 0
+        self.items = 0
+        self.labeled = 0
+        self.tokens = 0
+        self.invalid = 0
+        self.requeued = 0
+        self.splits = 0
+        self.unlabeled = []
+
+    def record(self, latency, items, labeled, tokens):
+        self.requests += 1
+        self.latencies.append(latency)
+        self.items += items
+        self.labeled += labeled
+        self.tokens += tokens
+
+    def summary(self):
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        latencies = sorted(self.latencies)
+
+        def percentile(p):
+            if not latencies:
+                return 0.0
+            return latencies[min(len(latencies) - 1, int(p * len(latencies)))]
+
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "labeled": self.labeled,
+            "elapsed_s": elapsed,
+            "items_per_s": self.labeled / elapsed,
+            "requests_per_min": self.requests / elapsed * 60,
+            "tokens": self.tokens,
+            "invalid_indices": self.invalid,
+            "requeued": self.requeued,
+            "splits": self.splits,
+            "unlabeled": len(self.unlabeled),
+            "latency_p50_s": percentile(0.5),
+            "latency_p95_s": percentile(0.95),
+            "latency_max_s": latencies[-1] if latencies else 0.0,
+        }
+
+    def log(self):
+        s = self.summary()
+        logging.info(
+            f"Labeled {s['labeled']} comments in {s['elapsed_s']:.1f}s "
+            f"({s['items_per_s']:.1f} comments/s, {s['requests']} requests, {s['errors']} errors, "
+            f"{s['requests_per_min']:.0f} req/min); latency p50 {s['latency_p50_s']:.2f}s, "
+            f"p95 {s['latency_p95_s']:.2f}s, max {s['latency_max_s']:.2f}s"
+        )
+        if s["requeued"] or s["splits"] or s["invalid_indices"]:
+            logging.info(f"Re-queued {s['requeued']} comments, split {s['splits']} batches, "
+                         f"ignored {s['invalid_indices']} labels for indices outside their batch")
+        if self.unlabeled:
+            logging.warning(f"{len(self.unlabeled)} comments left unlabeled (global_index "
+                            f"{sorted(self.unlabeled)[:20]}{'...' if len(self.unlabeled) > 20 else ''}); "
+                            f"rerun to retry them")
+
+def retry_after(error):
+    """Seconds from the Retry-After header of a failed API response (0 if absent)."""
+    response = getattr(error, "response", None)
+    try:
+        return min(float(response.headers.get("retry-after")), 60)
+    except (AttributeError, TypeError, ValueError):
+        return 0
+
+async def classify_async(flattened, client, chunk_size=10, concurrency=8, rpm=None, tpm=None,
+                         model="gpt-4o-mini", retry_delay=5, stats=None, on_chunk=None, batch_tokens=None,
+                         max_retries=4, max_requeues=3, limiter=None, slots=None):
+    """
+    Classify flattened comments with up to `concurrency` requests in flight.
+    Requests hold at most chunk_size comments and about batch_tokens estimated tokens.
+    Labels are written back into the flattened items by global_index, so results
+    land in the right place whatever order the requests finish in.
+
+    A failing request is retried max_retries times with exponential backoff from
+    retry_delay. Comments missing from a reply are re-queued as a new batch; a reply
+    with no usable label at all splits the batch in two. A comment is given up on
+    after max_requeues re-sends and is listed in stats.unlabeled.
+    on_chunk(chunk) is called after each reply (e.g. LabelJournal.append).
+    A RateLimiter (limiter) and an asyncio.Semaphore capping requests in flight (slots)
+    can be shared between calls, so the limits hold across them (label_stream does).
+    Returns the ClassificationStats of the run.
+    """
+    stats = stats or ClassificationStats()
+    limiter = limiter or RateLimiter(rpm=rpm, tpm=tpm)
+    slots = slots or asyncio.Semaphore(max(1, concurrency))
+    by_index = {it["global_index"]: it for it in flattened}
+    queue = asyncio.Queue()
+    for batch in pack_batches(flattened, target_tokens=batch_tokens, max_items=chunk_size):
+        queue.put_nowait((batch, 0))
+    logging.info(f"Packed {len(flattened)} comments into {queue.qsize()} requests")
+
+    async def request(prompt, tokens):
+        """Send one prompt; returns the response or None once the retries are used up."""
+        for attempt in range(max_retries + 1):
+            try:
+                async with slots:
+                    await limiter.acquire(tokens)
+                    started = time.monotonic()
+                    response = await client.chat.completions.create(
+                        model=model,
+                        messages=[
+                            {"role": "system", "content": SYSTEM_PROMPT},
+                            {"role": "user", "content": prompt}
+                        ],
+                        temperature=0.0
+                    )
+                return response, time.monotonic() - started
+            except Exception as e:
+                stats.errors += 1
+                if attempt == max_retries:
+                    logging.error(f"API error, giving up after {attempt + 1} attempts: {str(e)}")
+                    return None, None
+                delay = max(min(retry_delay * 2 ** attempt, 60), retry_after(e))
+                logging.warning(f"API error (attempt {attempt + 1}/{max_retries + 1}), retrying in {delay}s: {str(e)}")
+                await asyncio.sleep(delay)
+
+    def give_up(items, reason):
+        stats.unlabeled.extend(it["global_index"] for it in items)
+        logging.warning(f"Leaving {len(items)} comments unlabeled: {reason}")
+        pbar.update(len(items))
+
+    async def run_batch(batch, requeues):
+        prompt = build_prompt(batch)
+        tokens = estimate_tokens(SYSTEM_PROMPT + prompt)
+        response, latency = await request(prompt, tokens)
+        if response is None:
+            give_up(batch, "API request failed")
+            return
+
+        labels = parse_answer(response.choices[0].message.content or "")
+        wanted = {it["global_index"] for it in batch}
+        stray = [idx for idx in labels if idx not in wanted]
+        if stray:
+            stats.invalid += len(stray)
+            logging.warning(f"Reply labeled {len(stray)} indices not in the batch: {stray[:10]}")
+        missing = []
+        for it in batch:
+            label = labels.get(it["global_index"])
+            if label:
+                by_index[it["global_index"]]["sentiment"] = label
+            else:
+                missing.append(it)
+        processed = len(batch) - len(missing)
+        usage = getattr(response, "usage", None)
+        stats.record(latency, len(batch), processed, getattr(usage, "total_tokens", None) or tokens)
+        if on_chunk and processed:
+            on_chunk(batch)
+        pbar.update(processed)
+        logging.info(f"Processed {processed}/{len(batch)} comments in chunk")
+
+        if not missing:
+            return
+        if requeues >= max_requeues:
+            give_up(missing, f"still missing after {requeues + 1} requests")
+        elif processed == 0 and len(missing) > 1:
+            # Nothing usable came back: retry as two smaller batches
+            half = len(missing) // 2
+            stats.splits += 1
+            queue.put_nowait((missing[:half], requeues + 1))
+            queue.put_nowait((missing[half:], requeues + 1))
+        else:
+            stats.requeued += len(missing)
+            queue.put_nowait((missing, requeues + 1))
+
+    async def worker():
+        while True:
+            batch, requeues = await queue.get()
+            try:
+                await run_batch(batch, requeues)
+            except Exception as e:
+                logging.error(f"Unexpected error handling a batch: {str(e)}")
+                give_up(batch, "unexpected error")
+            finally:
+                queue.task_done()
+
+    with tqdm(total=len(flattened), desc="Processing comments") as pbar:
+        workers = [asyncio.create_task(worker()) for _ in range(max(1, concurrency))]
+        try:
+            await queue.join()
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+    stats.log()
+    return stats
+
+def openai_client(base_url=None, api_key=None):
+    """
+    AsyncOpenAI client. The key comes from OPENAI_API_KEY unless given; base_url
+    points at any OpenAI-compatible endpoint (e.g. the local stub in stub_api.py).
+    """
+    from openai import AsyncOpenAI
+    api_key = api_key or os.environ.get("OPENAI_API_KEY")
+    if not api_key:
+        raise SystemExit("Set OPENAI_API_KEY (or use --manual)")
+    return AsyncOpenAI(api_key=api_key, base_url=base_url)
+
+def automatic_classify(flattened, chunk_size=10, concurrency=8, rpm=None, tpm=None, model="gpt-4o-mini",
+                       on_chunk=None, batch_tokens=None, base_url=None, api_key=None):
+    """Automatic classification logic using openai (if needed)."""
+    client = openai_client(base_url, api_key)
+    return asyncio.run(classify_async(flattened, client, chunk_size=chunk_size, concurrency=concurrency,
+                                      rpm=rpm, tpm=tpm, model=model, on_chunk=on_chunk,
+                                      batch_tokens=batch_tokens))
 
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("-m", "--manual", action="store_true", help="Manual mode - copy/paste to GPT")
-    parser.add_argument("-c", "--chunk_size", type=int, default=20, help="Chunk size for processing")
+    parser.add_argument("-c", "--chunk_size", type=int, default=50, help="Max comments per request")
+    parser.add_argument("--batch-tokens", type=int, default=2000,
+                        help="Target estimated tokens per request (prompt + answer); 0 = pack by count only")
     parser.add_argument("-f", "--file", type=str, default='shopee_genshinimpact.json', help="Path to JSON file")
     parser.add_argument("--no-auto-copy", action="store_true", help="Disable auto-copy to clipboard")
+    parser.add_argument("--concurrency", type=int, default=8, help="Max in-flight API requests (automatic mode)")
+    parser.add_argument("--rpm", type=int, default=None, help="Requests-per-minute limit (automatic mode)")
+    parser.add_argument("--tpm", type=int, default=None, help="Tokens-per-minute limit (automatic mode)")
+    parser.add_argument("--model", default="gpt-4o-mini", help="Model name (automatic mode)")
+    parser.add_argument("--base-url", default=None, help="OpenAI-compatible API base URL (automatic mode)")
+    parser.add_argument("--resume", action="store_true", help="Reuse labels from the checkpoint journal of an interrupted run")
+    parser.add_argument("--journal", default=None, help="Checkpoint journal path (default: <file>_labels.journal.jsonl)")
+    parser.add_argument("--label-cache", default="label_cache.json", help="Persistent normalized-text -> label cache")
+    parser.add_argument("--no-cache", action="store_true", help="Do not read or update the label cache")
+    parser.add_argument("--local-model", default=None, help="Local classifier (.npz) that labels confident comments before the API")
+    parser.add_argument("--local-threshold", type=float, default=0.9, help="Min local-model confidence to skip the API")
     args = parser.parse_args()
+    setup_logging()
 
     # Load data
     json_path = args.file
@@ -245,21 +703,59 @@ def main():
         logging.info("No unlabeled, non-empty comments found.")
         return
 
-    # Backup original
+    # Backup original (kept from the first run when resuming)
     backup_path = json_path.replace(".json", "_backup.json")
-    logging.info(f"Backing up to {backup_path}")
-    save_json(backup_path, data)
+    if not (args.resume and os.path.exists(backup_path)):
+        logging.info(f"Backing up to {backup_path}")
+        save_json(backup_path, data)
+
+    # Checkpoint journal: labels are appended after every chunk
+    journal = LabelJournal(args.journal or json_path.replace(".json", "_labels.journal.jsonl"))
+    if args.resume:
+        applied = journal.apply(flattened)
+        logging.info(f"Resumed {applied} labels from {journal.path}")
+    elif os.path.exists(journal.path):
+        logging.warning(f"Discarding old journal {journal.path} (use --resume to reuse it)")
+        journal.clear()
+    todo = [it for it in flattened if not it.get("sentiment")]
+
+    # Identical texts are classified once; known texts come straight from the cache
+    cache = None if args.no_cache else LabelCache(args.label_cache)
+    deduper = TextDeduper(cache)
+    todo, cached = deduper.prepare(todo)
+    journal.append(cached)
+
+    # Optional first pass: the local model labels what it is confident about
+    if args.local_model:
+        from local_classifier import LocalClassifier
+        confident, todo = LocalClassifier.load(args.local_model).route(todo, args.local_threshold)
+        journal.append(deduper.fan_out(confident, remember=False))
+
+    def on_chunk(chunk):
+        journal.append(deduper.fan_out(chunk))
 
     # Classify
-    if args.manual:
-        manual_classify(flattened, chunk_size=args.chunk_size, auto_copy=not args.no_auto_copy)
-    else:
-        automatic_classify(flattened, chunk_size=args.chunk_size)
+    batch_tokens = args.batch_tokens or None
+    try:
+        if args.manual:
+            manual_classify(todo, chunk_size=args.chunk_size, auto_copy=not args.no_auto_copy,
+                            on_chunk=on_chunk, batch_tokens=batch_tokens)
+        else:
+            automatic_classify(todo, chunk_size=args.chunk_size, concurrency=args.concurrency,
+                               rpm=args.rpm, tpm=args.tpm, model=args.model, on_chunk=on_chunk,
+                               batch_tokens=batch_tokens, base_url=args.base_url)
+    except KeyboardInterrupt:
+        logging.warning(f"Interrupted. Labels so far are in {journal.path}; rerun with --resume to continue.")
+        return
+    finally:
+        if cache is not None:
+            cache.save()
 
     # Write back results
     restore_comments(data, flattened)
-    save_json(json_path, data)
-    logging.info("Classification completed and saved.")
+    if save_json(json_path, data):
+        journal.clear()
+        logging.info("Classification completed and saved.")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
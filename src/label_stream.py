@@ -0,0 +1,334 @@
+import os
+import sys
+import time
+import asyncio
+import inspect
+import logging
+import argparse
+import sqlite3
+from itertools import count, islice
+
+import pandas as pd
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet input needs pyarrow
+    pq = None
+
+from json_labeling import (ClassificationStats, LabelCache, RateLimiter, TextDeduper, classify_async,
+                           content_hash, manual_classify, openai_client, setup_logging)
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scraping'))
+from extract_data import iter_products
+from review_index import review_key
+from streams import compression_of
+
+FORMATS = ("shopee", "tiki", "reviews")
+REVIEW_TABLE_COLUMNS = ["product_id", "review_id", "content", "author", "time"]
+
+
+def _text(value):
+    return value.strip() if isinstance(value, str) else ""
+
+
+def iter_shopee(path):
+    """Comments of a Shopee scrape (JSON array of products with 'comments'), one at a time."""
+    for product in iter_products(path):
+        for cmt in product.get("comments") or []:
+            if isinstance(cmt, dict):
+                # Shopee reviews have no id: keyed by (link, author, time, content) like the scraper's index
+                yield {"key": review_key(product.get("link"), cmt), "content": _text(cmt.get("content"))}
+
+
+def iter_tiki(path):
+    """Reviews of a Tiki scrape (JSON array, JSONL, .gz/.zst), one at a time."""
+    for product in iter_products(path):
+        for review in product.get("reviews") or []:
+            if isinstance(review, dict):
+                yield {"key": review_key(product.get("id"), review), "content": _text(review.get("content"))}
+
+
+def iter_review_table(path, chunk_rows=50000):
+    """Rows of a review table (product_reviews.csv or Parquet with the same columns), read in chunks."""
+    if path.endswith(".parquet"):
+        if pq is None:
+            raise ImportError("Reading Parquet needs pyarrow: pip install pyarrow")
+        parquet = pq.ParquetFile(path)
+        columns = [c for c in REVIEW_TABLE_COLUMNS if c in parquet.schema_arrow.names]
+        chunks = (batch.to_pandas() for batch in parquet.iter_batches(batch_size=chunk_rows, columns=columns))
+    else:
+        chunks = pd.read_csv(path, chunksize=chunk_rows, encoding="utf-8-sig",
+                             usecols=lambda c: c in REVIEW_TABLE_COLUMNS)
+    for df in chunks:
+        for row in df.to_dict("records"):
+            yield {"key": review_key(row.get("product_id"), row), "content": _text(row.get("content"))}
+
+
+def _strip_compression(path):
+    return os.path.splitext(path)[0] if compression_of(path) else path
+
+
+def detect_format(path):
+    """Guess the input format from the file name, or from the first object of a JSON file."""
+    base = _strip_compression(path)
+    if base.endswith((".csv", ".parquet")):
+        return "reviews"
+    if base.endswith(".jsonl"):
+        return "tiki"
+    first = next(iter_products(path), {})
+    return "shopee" if "comments" in first else "tiki"
+
+
+def iter_records(path, fmt="auto"):
+    fmt = detect_format(path) if fmt == "auto" else fmt
+    logging.info(f"Reading {path} as {fmt}")
+    if fmt == "shopee":
+        return iter_shopee(path)
+    if fmt == "tiki":
+        return iter_tiki(path)
+    if fmt == "reviews":
+        return iter_review_table(path)
+    raise ValueError(f"Unknown input format {fmt!r}, expected one of {FORMATS}")
+
+
+def default_sidecar(path):
+    return os.path.splitext(_strip_compression(path))[0] + ".labels.db"
+
+
+class LabelSidecar:
+    """
+    Labels stored next to the source, keyed by review key (review_index.review_key).
+    SQLite keeps lookups on disk, so memory does not grow with the corpus. The
+    content hash is kept so an edited review is labeled again.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS labels ("
+            "review_key TEXT PRIMARY KEY, sentiment TEXT NOT NULL, content_hash TEXT, labeled_at INTEGER)"
+        )
+        self.conn.commit()
+
+    def labeled(self, items, batch_size=500):
+        """Keys of the items that already have a label for the same content."""
+        done = set()
+        for start in range(0, len(items), batch_size):
+            batch = items[start:start + batch_size]
+            placeholders = ",".join("?" * len(batch))
+            rows = self.conn.execute(
+                f"SELECT review_key, content_hash FROM labels WHERE review_key IN ({placeholders})",
+                [it["key"] for it in batch]
+            ).fetchall()
+            stored = dict(rows)
+            done.update(it["key"] for it in batch if stored.get(it["key"]) == content_hash(it["content"]))
+        return done
+
+    def write(self, items):
+        """Upsert labeled items and commit, so every finished chunk survives a crash."""
+        rows = [(it["key"], it["sentiment"], content_hash(it["content"]), int(time.time()))
+                for it in items if it.get("sentiment")]
+        if rows:
+            self.conn.executemany("INSERT OR REPLACE INTO labels VALUES (?, ?, ?, ?)", rows)
+            self.conn.commit()
+        return len(rows)
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM labels").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
+
+
+class SidecarLabelCache:
+    """
+    LabelCache (normalized text -> label) kept in the sidecar database, so lookups
+    hit SQLite instead of a dict that grows with the corpus. Same get/put as
+    LabelCache; entries are committed with the sidecar's next write.
+    """
+    def __init__(self, sidecar):
+        self.conn = sidecar.conn
+        self.conn.execute("CREATE TABLE IF NOT EXISTS label_cache (text_key TEXT PRIMARY KEY, sentiment TEXT NOT NULL)")
+        self.conn.commit()
+        self.hits = 0
+
+    def get(self, key):
+        row = self.conn.execute("SELECT sentiment FROM label_cache WHERE text_key = ?", (key,)).fetchone()
+        if row:
+            self.hits += 1
+            return row[0]
+        return None
+
+    def put(self, key, label):
+        self.conn.execute("INSERT OR REPLACE INTO label_cache VALUES (?, ?)", (key, label))
+
+    def import_json(self, path):
+        """Seed from a LabelCache JSON file (e.g. label_cache.json of json_labeling runs)."""
+        labels = LabelCache(path).labels
+        self.conn.executemany("INSERT OR IGNORE INTO label_cache VALUES (?, ?)", labels.items())
+        self.conn.commit()
+        return len(labels)
+
+    def save(self):
+        self.conn.commit()
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM label_cache").fetchone()[0]
+
+
+def read_labels(path):
+    """Sidecar labels as a DataFrame (review_key, sentiment) for joining back onto reviews."""
+    with sqlite3.connect(path) as conn:
+        return pd.read_sql("SELECT review_key, sentiment FROM labels", conn)
+
+
+async def label_stream_async(records, sidecar, classify, window=2000, cache=None, local_model=None,
+                             local_threshold=0.9, max_windows=2):
+    """
+    Label a stream of {'key', 'content'} records window by window.
+
+    Each window skips reviews already in the sidecar, collapses duplicate texts,
+    applies the label cache and the optional local model, then calls
+    classify(items, on_chunk); on_chunk writes every finished chunk to the sidecar.
+    classify may be a coroutine function: up to max_windows windows are then
+    classified at once, so requests keep flowing while the next window is read.
+    Returns counts for the run.
+    """
+    totals = {"read": 0, "skipped": 0, "cached": 0, "local": 0, "sent": 0, "labeled": 0}
+    global_index = count()
+    records = iter(records)
+    running = set()
+    try:
+        while True:
+            window_records = list(islice(records, window))
+            if not window_records:
+                break
+            totals["read"] += len(window_records)
+            items = [dict(r, global_index=next(global_index)) for r in window_records if r["content"]]
+            done = sidecar.labeled(items)
+            todo = [it for it in items if it["key"] not in done]
+            totals["skipped"] += len(window_records) - len(todo)
+
+            deduper = TextDeduper(cache)
+            todo, cached = deduper.prepare(todo)
+            totals["cached"] += sidecar.write(cached)
+            if local_model is not None:
+                confident, todo = local_model.route(todo, local_threshold)
+                totals["local"] += sidecar.write(deduper.fan_out(confident, remember=False))
+
+            def on_chunk(chunk, deduper=deduper):
+                totals["labeled"] += sidecar.write(deduper.fan_out(chunk))
+
+            totals["sent"] += len(todo)
+            if not todo:
+                continue
+            result = classify(todo, on_chunk)
+            if inspect.isawaitable(result):
+                running.add(asyncio.ensure_future(result))
+                if len(running) >= max_windows:
+                    finished, running = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                    for task in finished:
+                        task.result()
+        await asyncio.gather(*running)
+    finally:
+        for task in running:
+            task.cancel()
+    logging.info(
+        f"Read {totals['read']} reviews: {totals['skipped']} already labeled or empty, "
+        f"{totals['cached']} from cache, {totals['local']} by the local model, "
+        f"{totals['labeled']} labeled from {totals['sent']} sent for classification"
+    )
+    return totals
+
+
+def label_stream(records, sidecar, classify, **kwargs):
+    """Synchronous label_stream_async (e.g. for manual classification)."""
+    return asyncio.run(label_stream_async(records, sidecar, classify, **kwargs))
+
+
+async def label_stream_api(records, sidecar, client, window=2000, cache=None, local_model=None, local_threshold=0.9,
+                           concurrency=8, rpm=None, tpm=None, **classify_kwargs):
+    """
+    Label a stream through the API with one client, one RateLimiter and one cap on
+    requests in flight for the whole stream, so the limits hold across windows.
+    classify_kwargs go to classify_async (chunk_size, model, batch_tokens, ...).
+    Returns (totals, ClassificationStats).
+    """
+    limiter = RateLimiter(rpm=rpm, tpm=tpm)
+    slots = asyncio.Semaphore(max(1, concurrency))
+    stats = ClassificationStats()
+
+    async def classify(todo, on_chunk):
+        await classify_async(todo, client, concurrency=concurrency, limiter=limiter, slots=slots, stats=stats,
+                             on_chunk=on_chunk, **classify_kwargs)
+
+    totals = await label_stream_async(records, sidecar, classify, window=window, cache=cache,
+                                      local_model=local_model, local_threshold=local_threshold)
+    return totals, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream reviews from a scrape or review table and label them into a sidecar")
+    parser.add_argument("-f", "--file", required=True, help="Shopee JSON, Tiki JSON/JSONL(.gz/.zst), or review CSV/Parquet")
+    parser.add_argument("--format", choices=("auto",) + FORMATS, default="auto", help="Input format (default: guess)")
+    parser.add_argument("--sidecar", default=None, help="Label database (default: <file>.labels.db)")
+    parser.add_argument("--window", type=int, default=2000, help="Reviews held in memory at a time")
+    parser.add_argument("-m", "--manual", action="store_true", help="Manual mode - copy/paste to GPT")
+    parser.add_argument("-c", "--chunk_size", type=int, default=50, help="Max comments per request")
+    parser.add_argument("--batch-tokens", type=int, default=2000,
+                        help="Target estimated tokens per request (prompt + answer); 0 = pack by count only")
+    parser.add_argument("--no-auto-copy", action="store_true", help="Disable auto-copy to clipboard")
+    parser.add_argument("--concurrency", type=int, default=8, help="Max in-flight API requests (automatic mode)")
+    parser.add_argument("--rpm", type=int, default=None, help="Requests-per-minute limit (automatic mode)")
+    parser.add_argument("--tpm", type=int, default=None, help="Tokens-per-minute limit (automatic mode)")
+    parser.add_argument("--model", default="gpt-4o-mini", help="Model name (automatic mode)")
+    parser.add_argument("--base-url", default=None, help="OpenAI-compatible API base URL (automatic mode)")
+    parser.add_argument("--label-cache", default=None,
+                        help="Seed the sidecar's normalized-text -> label cache from this JSON cache (e.g. label_cache.json)")
+    parser.add_argument("--no-cache", action="store_true", help="Do not read or update the label cache")
+    parser.add_argument("--local-model", default=None, help="Local classifier (.npz) that labels confident comments before the API")
+    parser.add_argument("--local-threshold", type=float, default=0.9, help="Min local-model confidence to skip the API")
+    args = parser.parse_args()
+    setup_logging()
+
+    batch_tokens = args.batch_tokens or None
+    local_model = None
+    if args.local_model:
+        from local_classifier import LocalClassifier
+        local_model = LocalClassifier.load(args.local_model)
+
+    sidecar = LabelSidecar(args.sidecar or default_sidecar(args.file))
+    cache = None
+    if not args.no_cache:
+        cache = SidecarLabelCache(sidecar)
+        if args.label_cache and os.path.exists(args.label_cache):
+            logging.info(f"Imported {cache.import_json(args.label_cache)} cached labels from {args.label_cache}")
+    records = iter_records(args.file, args.format)
+    stream_args = dict(window=args.window, cache=cache, local_model=local_model, local_threshold=args.local_threshold)
+    try:
+        if args.manual:
+            def classify(todo, on_chunk):
+                manual_classify(todo, chunk_size=args.chunk_size, auto_copy=not args.no_auto_copy,
+                                on_chunk=on_chunk, batch_tokens=batch_tokens)
+            label_stream(records, sidecar, classify, **stream_args)
+        else:
+            async def run():
+                client = openai_client(args.base_url)
+                try:
+                    return await label_stream_api(records, sidecar, client, concurrency=args.concurrency,
+                                                  rpm=args.rpm, tpm=args.tpm, chunk_size=args.chunk_size,
+                                                  model=args.model, batch_tokens=batch_tokens, **stream_args)
+                finally:
+                    await client.close()
+            asyncio.run(run())
+    except KeyboardInterrupt:
+        logging.warning(f"Interrupted. Finished chunks are in {sidecar.path}; rerun to continue.")
+    finally:
+        if cache is not None:
+            cache.save()
+        logging.info(f"{len(sidecar)} labels in {sidecar.path}")
+        sidecar.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+import re
+import json
+import time
+import zlib
+import logging
+import argparse
+import unicodedata
+
+import numpy as np
+
+LABELS = ["<NEG>", "<NEU>", "<POS>"]
+LABEL_IDS = {label: i for i, label in enumerate(LABELS)}
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+
+def tokenize(text):
+    """Lowercased word and symbol tokens (emoji and punctuation are kept as tokens)."""
+    return _TOKEN_RE.findall(unicodedata.normalize("NFC", text).casefold())
+
+
+def hash_features(texts, n_features=1 << 18):
+    """
+    Hashed unigram + bigram features in CSR form.
+    Returns (indptr, indices, values); each row is L2-normalized binary presence.
+    """
+    indptr = [0]
+    indices = []
+    values = []
+    for text in texts:
+        tokens = tokenize(text)
+        grams = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        row = {zlib.crc32(g.encode("utf-8")) % n_features for g in grams}
+        indices.extend(row)
+        if row:
+            values.extend([1.0 / np.sqrt(len(row))] * len(row))
+        indptr.append(len(indices))
+    return (np.asarray(indptr, dtype=np.int64), np.asarray(indices, dtype=np.int64),
+            np.asarray(values, dtype=np.float32))
+
+
+def _softmax(scores):
+    scores = scores - scores.max(axis=1, keepdims=True)
+    np.exp(scores, out=scores)
+    return scores / scores.sum(axis=1, keepdims=True)
+
+
+class LocalClassifier:
+    """
+    CPU-only sentiment classifier: hashed n-grams with a softmax linear model
+    trained by sparse mini-batch Adagrad. Needs only numpy.
+    """
+    def __init__(self, n_features=1 << 18):
+        self.n_features = n_features
+        self.weights = np.zeros((n_features, len(LABELS)), dtype=np.float32)
+        self.bias = np.zeros(len(LABELS), dtype=np.float32)
+
+    def _scores(self, indptr, indices, values):
+        n_rows = len(indptr) - 1
+        scores = np.tile(self.bias, (n_rows, 1)).astype(np.float64)
+        if len(indices):
+            contrib = self.weights[indices] * values[:, None]
+            row_ids = np.repeat(np.arange(n_rows), np.diff(indptr))
+            for c in range(len(LABELS)):
+                scores[:, c] += np.bincount(row_ids, weights=contrib[:, c], minlength=n_rows)
+        return scores
+
+    def predict_proba(self, texts, batch_size=50000):
+        """Class probabilities, shape (len(texts), 3), columns in LABELS order."""
+        out = []
+        for start in range(0, len(texts), batch_size):
+            features = hash_features(texts[start:start + batch_size], self.n_features)
+            out.append(_softmax(self._scores(*features)))
+        return np.vstack(out) if out else np.zeros((0, len(LABELS)), dtype=np.float32)
+
+    def predict(self, texts):
+        """Returns (labels, confidences)."""
+        proba = self.predict_proba(texts)
+        best = proba.argmax(axis=1)
+        return [LABELS[i] for i in best], proba[np.arange(len(best)), best]
+
+    def fit(self, texts, labels, epochs=8, batch_size=256, lr=0.5, l2=1e-6, seed=0):
+        """Train on texts with labels from LABELS."""
+        y = np.asarray([LABEL_IDS[label] for label in labels])
+        indptr, indices, values = hash_features(texts, self.n_features)
+        rng = np.random.default_rng(seed)
+        grad_sq = np.full((self.n_features, len(LABELS)), 1e-8, dtype=np.float32)
+        bias_sq = np.full(len(LABELS), 1e-8, dtype=np.float32)
+        onehot = np.eye(len(LABELS), dtype=np.float32)
+
+        for epoch in range(epochs):
+            order = rng.permutation(len(y))
+            loss = 0.0
+            for start in range(0, len(order), batch_size):
+                rows = order[start:start + batch_size]
+                # Gather the batch as its own small CSR matrix
+                lengths = indptr[rows + 1] - indptr[rows]
+                b_indptr = np.concatenate([[0], np.cumsum(lengths)])
+                take = np.repeat(indptr[rows] - b_indptr[:-1], lengths) + np.arange(b_indptr[-1])
+                b_indices, b_values = indices[take], values[take]
+
+                proba = _softmax(self._scores(b_indptr, b_indices, b_values))
+                loss -= np.log(proba[np.arange(len(rows)), y[rows]] + 1e-12).sum()
+                delta = (proba - onehot[y[rows]]) / len(rows)
+
+                row_ids = np.repeat(np.arange(len(rows)), lengths)
+                feats, inverse = np.unique(b_indices, return_inverse=True)
+                weighted = delta[row_ids] * b_values[:, None]
+                grad = np.stack([np.bincount(inverse, weights=weighted[:, c], minlength=len(feats))
+                                 for c in range(len(LABELS))], axis=1).astype(np.float32)
+                grad += l2 * self.weights[feats]
+
+                grad_sq[feats] += grad ** 2
+                self.weights[feats] -= lr * grad / np.sqrt(grad_sq[feats])
+                bias_grad = delta.sum(axis=0)
+                bias_sq += bias_grad ** 2
+                self.bias -= lr * bias_grad / np.sqrt(bias_sq)
+            logging.info(f"Epoch {epoch + 1}/{epochs}: loss {loss / max(len(y), 1):.4f}")
+        return self
+
+    def route(self, items, threshold=0.9):
+        """
+        Label flattened items the model is confident about (confidence >= threshold).
+        Returns (confident items, low-confidence items left for the API).
+        """
+        if not items:
+            return [], []
+        labels, confidences = self.predict([it["content"] for it in items])
+        confident, uncertain = [], []
+        for it, label, confidence in zip(items, labels, confidences):
+            if confidence >= threshold:
+                it["sentiment"] = label
+                confident.append(it)
+            else:
+                uncertain.append(it)
+        logging.info(f"Local model labeled {len(confident)}/{len(items)} comments "
+                     f"(threshold {threshold}); {len(uncertain)} left for the API")
+        return confident, uncertain
+
+    def save(self, path):
+        np.savez_compressed(path, weights=self.weights, bias=self.bias,
+                            n_features=self.n_features, labels=np.asarray(LABELS))
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path)
+        if list(data["labels"]) != LABELS:
+            raise ValueError(f"Model {path} was trained with labels {list(data['labels'])}")
+        model = cls(int(data["n_features"]))
+        model.weights = data["weights"]
+        model.bias = data["bias"]
+        return model
+
+
+def evaluate(model, texts, labels, threshold=0.9):
+    """Accuracy, per-class precision/recall/F1, confusion matrix and coverage at the threshold."""
+    predicted, confidences = model.predict(texts)
+    y_true = np.asarray([LABEL_IDS[label] for label in labels])
+    y_pred = np.asarray([LABEL_IDS[label] for label in predicted])
+    confusion = np.zeros((len(LABELS), len(LABELS)), dtype=np.int64)
+    np.add.at(confusion, (y_true, y_pred), 1)
+    per_class = {}
+    for i, label in enumerate(LABELS):
+        tp = confusion[i, i]
+        precision = tp / confusion[:, i].sum() if confusion[:, i].sum() else 0.0
+        recall = tp / confusion[i].sum() if confusion[i].sum() else 0.0
+        f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+        per_class[label] = {"precision": precision, "recall": recall, "f1": f1, "support": int(confusion[i].sum())}
+    covered = confidences >= threshold
+    return {
+        "n": len(y_true),
+        "accuracy": float((y_true == y_pred).mean()) if len(y_true) else 0.0,
+        "per_class": per_class,
+        "confusion": confusion.tolist(),
+        "threshold": threshold,
+        "coverage": float(covered.mean()) if len(y_true) else 0.0,
+        "accuracy_at_threshold": float((y_true[covered] == y_pred[covered]).mean()) if covered.any() else 0.0,
+    }
+
+
+def format_report(report):
+    lines = [f"Samples: {report['n']}    accuracy: {report['accuracy']:.3f}", "",
+             f"{'label':<8}{'precision':>10}{'recall':>10}{'f1':>10}{'support':>10}"]
+    for label, m in report["per_class"].items():
+        lines.append(f"{label:<8}{m['precision']:>10.3f}{m['recall']:>10.3f}{m['f1']:>10.3f}{m['support']:>10}")
+    lines += ["", "Confusion (rows = true, cols = predicted " + " ".join(LABELS) + "):"]
+    lines += ["  " + " ".join(f"{v:>7}" for v in row) for row in report["confusion"]]
+    lines += ["", f"At threshold {report['threshold']}: coverage {report['coverage']:.1%}, "
+                  f"accuracy {report['accuracy_at_threshold']:.3f} (the rest goes to the API)"]
+    return "\n".join(lines)
+
+
+def load_labeled(paths):
+    """Collect (texts, labels) from labeled JSON files written by json_labeling."""
+    texts, labels = [], []
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        for item in data:
+            if not isinstance(item, dict):
+                continue
+            for cmt in item.get("comments") or []:
+                text = (cmt.get("content") or "").strip()
+                if text and cmt.get("sentiment") in LABEL_IDS:
+                    texts.append(text)
+                    labels.append(cmt["sentiment"])
+    return texts, labels
+
+
+def split_holdout(texts, labels, holdout=0.2, seed=0):
+    order = np.random.default_rng(seed).permutation(len(texts))
+    n_test = int(len(texts) * holdout)
+    test, train = order[:n_test], order[n_test:]
+    return ([texts[i] for i in train], [labels[i] for i in train],
+            [texts[i] for i in test], [labels[i] for i in test])
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Local CPU sentiment classifier for review comments")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    train = sub.add_parser("train", help="Train from labeled JSON files")
+    train.add_argument("-f", "--files", nargs="+", required=True, help="Labeled JSON files")
+    train.add_argument("-o", "--model", default="local_sentiment.npz", help="Output model path")
+    train.add_argument("--holdout", type=float, default=0.2, help="Fraction held out for the evaluation report")
+    train.add_argument("--epochs", type=int, default=8)
+    train.add_argument("--n-features", type=int, default=1 << 18)
+    train.add_argument("-t", "--threshold", type=float, default=0.9)
+
+    evaluate_cmd = sub.add_parser("evaluate", help="Evaluation report on labeled JSON files")
+    evaluate_cmd.add_argument("-m", "--model", default="local_sentiment.npz")
+    evaluate_cmd.add_argument("-f", "--files", nargs="+", required=True)
+    evaluate_cmd.add_argument("-t", "--threshold", type=float, default=0.9)
+
+    predict = sub.add_parser("predict", help="Label confident comments of a JSON file in place")
+    predict.add_argument("-m", "--model", default="local_sentiment.npz")
+    predict.add_argument("-f", "--file", required=True)
+    predict.add_argument("-t", "--threshold", type=float, default=0.9)
+    args = parser.parse_args()
+
+    if args.command == "train":
+        texts, labels = load_labeled(args.files)
+        logging.info(f"Loaded {len(texts)} labeled comments")
+        train_x, train_y, test_x, test_y = split_holdout(texts, labels, args.holdout)
+        model = LocalClassifier(args.n_features).fit(train_x, train_y, epochs=args.epochs)
+        model.save(args.model)
+        logging.info(f"Model saved to {args.model}")
+        if test_x:
+            print(format_report(evaluate(model, test_x, test_y, args.threshold)))
+    elif args.command == "evaluate":
+        texts, labels = load_labeled(args.files)
+        print(format_report(evaluate(LocalClassifier.load(args.model), texts, labels, args.threshold)))
+    else:
+        from json_labeling import flatten_comments, load_json, restore_comments, save_json
+        data = load_json(args.file)
+        flattened = flatten_comments(data)
+        started = time.monotonic()
+        confident, _ = LocalClassifier.load(args.model).route(flattened, args.threshold)
+        logging.info(f"Classified {len(flattened)} comments in {time.monotonic() - started:.2f}s")
+        restore_comments(data, confident)
+        save_json(args.file, data)
+
+
+if __name__ == "__main__":
+    main()
@@ -10,11 +10,98 @@ import datetime
 import undetected_chromedriver as uc
 from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.common.exceptions import NoSuchElementException
+from selenium.common.exceptions import NoSuchElementException, StaleElementReferenceException, TimeoutException
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
 from tqdm import tqdm
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scraping'))
+from review_index import ReviewIndex, review_key
+
+SEARCH_CONTAINER_XPATH = '//*[@id="main"]/div/div[2]/div/div/div/div/div/div[2]/section/ul'
+
+# Element that marks each kind of Shopee page as ready
+READY_LOCATORS = {
+    'search': (By.XPATH, SEARCH_CONTAINER_XPATH),
+    'product': (By.ID, 'sll2-normal-pdp-main'),
+    'reviews': (By.CLASS_NAME, 'product-ratings__list'),
+}
+
+# Seconds to wait before giving up: page loads, product sections (category, description),
+# the ratings list, one review page change
+DEFAULT_TIMEOUTS = {'page': 15, 'details': 5, 'reviews': 5, 'paging': 5}
+
+# Text of the first review on the page, to notice when paging or a star filter has swapped the list
+FIRST_REVIEW_JS = """
+const item = arguments[0].querySelector('div[class*="shopee-product-rating__main"]');
+return item ? item.innerText : null;
+"""
+
+# Page load state and number of resources fetched since the wait started. The resource timing
+# buffer holds only 250 entries by default and stops counting once full, so the first poll
+# clears it and raises the limit.
+NETWORK_STATE_JS = """
+if (arguments[0]) {
+    performance.clearResourceTimings();
+    performance.setResourceTimingBufferSize(10000);
+}
+return [document.readyState, performance.getEntriesByType('resource').length];
+"""
+
+# Extract a whole page of search results in one round trip instead of ~7 find_element calls per item
+SEARCH_ITEMS_JS = """
+const [containerXpath, limit] = arguments;
+const container = document.evaluate(containerXpath, document, null,
+    XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+if (!container) return null;
+const text = (li, selector, fallback) => {
+    const el = li.querySelector(selector);
+    return el ? el.innerText : fallback;
+};
+const attr = (li, selector, name, fallback) => {
+    const el = li.querySelector(selector);
+    return el ? el.getAttribute(name) : fallback;
+};
+return Array.from(container.querySelectorAll('li')).slice(0, limit).map(li => {
+    const link = li.querySelector('a[class="contents"]');
+    const shipping = li.querySelector('div[class="truncate text-sp10 font-normal whitespace-nowrap text-shopee-green"]');
+    return {
+        link: link ? link.href : "<Link>",
+        name: text(li, 'div[class="line-clamp-2 break-words min-h-[2.5rem] text-sm"]', "<Product name>"),
+        price: text(li, 'div[class="truncate flex items-baseline"]', "<Product price>"),
+        rating: text(li, 'div[class="text-shopee-black87 text-xs/sp14 flex-none"]', "<Product rating>"),
+        img: attr(li, 'img[class="inset-y-0 w-full h-full pointer-events-none object-contain absolute"]', "src", "<Image>"),
+        shipping: shipping ? shipping.innerText : "",
+        location: text(li, 'div[class="flex-shrink min-w-0 truncate text-shopee-black54 font-extralight text-sp10"]', "<Location>")
+    };
+});
+"""
+
+# Extract every review on the current ratings page in one round trip
+REVIEW_ITEMS_JS = """
+const container = arguments[0];
+const text = (item, selector) => {
+    const el = item.querySelector(selector);
+    return el ? el.innerText.trim() : "";
+};
+return Array.from(container.querySelectorAll('div[class*="shopee-product-rating__main"]')).map(item => {
+    const stars = item.querySelector('div[class="shopee-product-rating__rating"]');
+    const solid = stars ? Array.from(stars.children).filter(s =>
+        (s.getAttribute('class') || '').includes('shopee-svg-icon icon-rating-solid--active icon-rating-solid')).length : 0;
+    const likes = text(item, 'div[class="shopee-product-rating__like-count"]');
+    return {
+        author: text(item, '.shopee-product-rating__author-name'),
+        rating: solid,
+        time: text(item, 'div[class="shopee-product-rating__time"]'),
+        content: text(item, 'div[style="position: relative; box-sizing: border-box; margin: 15px 0px; font-size: 14px; line-height: 20px; color: rgba(0, 0, 0, 0.87); word-break: break-word; white-space: pre-wrap;"]'),
+        seller_respond: text(item, 'div[class="TQTPT9"] div[class="qiTixQ"]'),
+        like_count: /^\\d+$/.test(likes) ? parseInt(likes, 10) : 0
+    };
+});
+"""
+
 class ShopeeScraper:
-    def __init__(self, search_term, max_products, index_only, review_limit, all_star_types=False, star_limit_per_type=10, chrome_user_data_dir=None):
+    def __init__(self, search_term, max_products, index_only, review_limit, all_star_types=False, star_limit_per_type=10, chrome_user_data_dir=None, review_index_file=None, timeouts=None, raw_archive=None):
         self.driver = None
         self.cookies_file = 'cookies_shopee.dat'
         self.search_term = search_term
@@ -24,6 +111,11 @@ class ShopeeScraper:
         self.all_star_types = all_star_types
         self.star_limit_per_type = star_limit_per_type
         self.chrome_user_data_dir = chrome_user_data_dir
+        self.timeouts = dict(DEFAULT_TIMEOUTS, **(timeouts or {}))
+        # Reviews have no id on Shopee: dedup by (product link, author, time, content) fingerprint
+        self.review_index = ReviewIndex(review_index_file)
+        # Optional RawArchive (src/scraping/raw_archive.py): HTML of every page loaded by _safe_get
+        self.raw_archive = raw_archive
         if not self.chrome_user_data_dir:
             self.chrome_user_data_dir = self.find_correct_chrome_user_data_dir()
 
@@ -78,11 +170,22 @@ class ShopeeScraper:
             pickle.dump(cookies, file)
 
     def _load_cookies(self):
-        if os.path.exists(self.cookies_file):
-            with open(self.cookies_file, 'rb') as file:
-                cookies = pickle.load(file)
-            for cookie in cookies:
-                self.driver.add_cookie(cookie)
+        """Set saved cookies through CDP so they apply before the first page load."""
+        if not os.path.exists(self.cookies_file):
+            return
+        with open(self.cookies_file, 'rb') as file:
+            cookies = pickle.load(file)
+        self.driver.execute_cdp_cmd('Network.enable', {})
+        for cookie in cookies:
+            params = {k: cookie[k] for k in ('name', 'value', 'domain', 'path', 'secure', 'httpOnly') if k in cookie}
+            if cookie.get('sameSite') in ('Strict', 'Lax', 'None'):
+                params['sameSite'] = cookie['sameSite']
+            if 'expiry' in cookie:
+                params['expires'] = cookie['expiry']
+            try:
+                self.driver.execute_cdp_cmd('Network.setCookie', params)
+            except Exception as e:
+                logging.warning(f"Could not restore cookie {cookie.get('name')}: {e}")
 
     def _load_existing_data(self):
         if os.path.exists(self.out_file):
@@ -99,15 +202,19 @@ class ShopeeScraper:
         try:
             with open(self.out_file, 'w', encoding='utf-8') as f:
                 json.dump(list(self.output_data.values()), f, ensure_ascii=False, indent=2)
+            # Review keys reach the index only once their comments are on disk
+            self.review_index.commit()
+            if self.raw_archive is not None:
+                self.raw_archive.flush()
             logging.info("Periodic save successful.")
         except Exception as e:
             logging.warning(f"Periodic save failed: {e}")
 
     def _scrape_missing_comments(self):
-        """Scrape comments for already known products that have no comments."""
+        """Scrape comments for already known products whose reviews were never collected."""
         logging.info("Scraping missing comments from existing data...")
         for link, product in list(self.output_data.items()):
-            if product.get("comments") == []:
+            if product.get("comments") == [] and not product.get("comments_scraped"):
                 try:
                     self._scrape_details(product)
                     self.output_data[link] = product
@@ -117,104 +224,112 @@ class ShopeeScraper:
 
     def _retrieve_products(self):
         logging.info("Retrieving product data...")
-        products_container_xpath = '//*[@id="main"]/div/div[2]/div/div/div/div/div/div[2]/section/ul'
-        product_elements = []
         try:
-            container = self.driver.find_element(By.XPATH, products_container_xpath)
-            product_elements = container.find_elements(By.XPATH, './/li')
-        except NoSuchElementException:
+            result = self.driver.execute_script(SEARCH_ITEMS_JS, SEARCH_CONTAINER_XPATH, self.max_products)
+        except Exception as e:
+            logging.warning(f"Product extraction script failed: {e}")
+            return []
+        if result is None:
             logging.warning("Could not locate product container.")
-        result = []
-        for idx, li in enumerate(product_elements):
-            if idx >= self.max_products:
-                break
-            try:
-                try:
-                    link_elem = li.find_element(By.XPATH, './/a[@class="contents"]')
-                    product_link = link_elem.get_attribute("href")
-                except:
-                    product_link = "<Link>"
-
-                try:
-                    name_elem = li.find_element(By.XPATH, './/div[@class="line-clamp-2 break-words min-h-[2.5rem] text-sm"]')
-                    product_name = name_elem.text
-                except:
-                    product_name = "<Product name>"
-
-                try:
-                    price_elem = li.find_element(By.XPATH, './/div[@class="truncate flex items-baseline"]')
-                    product_price = price_elem.text
-                except:
-                    product_price = "<Product price>"
-
-                try:
-                    rating_elem = li.find_element(By.XPATH, './/div[@class="text-shopee-black87 text-xs/sp14 flex-none"]')
-                    product_rating = rating_elem.text
-                except:
-                    product_rating = "<Product rating>"
-
-                try:
-                    location_elem = li.find_element(By.XPATH, './/div[@class="flex-shrink min-w-0 truncate text-shopee-black54 font-extralight text-sp10"]')
-                    location = location_elem.text
-                except:
-                    location = "<Location>"
-
-                try:
-                    img_elem = li.find_element(By.XPATH, './/img[@class="inset-y-0 w-full h-full pointer-events-none object-contain absolute"]')
-                    product_img = img_elem.get_attribute("src")
-                except:
-                    product_img = "<Image>"
-
-                try:
-                    shipping_elem = li.find_elements(By.XPATH, './/div[@class="truncate text-sp10 font-normal whitespace-nowrap text-shopee-green"]')
-                    shipping_text = shipping_elem[0].text if shipping_elem else ""
-                except:
-                    shipping_text = "<Shipping>"
-
-                product_info = {
-                    "link": product_link,
-                    "name": product_name,
-                    "price": product_price,
-                    "rating": product_rating,
-                    "img": product_img,
-                    "shipping": shipping_text,
-                    "location": location
-                }
-                result.append(product_info)
-            except Exception as e:
-                logging.warning(f"Skipping item due to error: {e}")
+            return []
         return result
 
+    def _wait_for(self, locator, timeout):
+        """Wait until the element is present; returns it, or None after the timeout."""
+        try:
+            return WebDriverWait(self.driver, timeout).until(EC.presence_of_element_located(locator))
+        except TimeoutException:
+            return None
+
+    def _network_idle(self, idle):
+        """Wait condition: the page is loaded and no new resources were fetched for `idle` seconds."""
+        state = {'count': -1, 'since': time.monotonic()}
+
+        def idle_for(driver):
+            ready, count = driver.execute_script(NETWORK_STATE_JS, state['count'] == -1)
+            now = time.monotonic()
+            if ready != 'complete' or count != state['count']:
+                state['count'], state['since'] = count, now
+                return False
+            return now - state['since'] >= idle
+        return idle_for
+
+    def _wait_network_idle(self, timeout, idle=0.5):
+        """Wait until the page is loaded and no new resources were fetched for `idle` seconds."""
+        try:
+            WebDriverWait(self.driver, timeout, poll_frequency=0.1).until(self._network_idle(idle))
+            return True
+        except TimeoutException:
+            return False
+
     def _check_captcha(self):
         """Check for captcha and wait if detected"""
         blacklist = ["login", "captcha","verify","security","check","auth","error"]
         if any(x in self.driver.current_url.lower() for x in blacklist):
             logging.info("Captcha/Login detected! Please solve it...")
             input("Press Enter after solving the captcha...")
-            time.sleep(5)  # Wait for page to settle after captcha
             return True
         return False
 
-    def _safe_get(self, url):
-        """Wrapper for driver.get() with captcha checking"""
+    def _safe_get(self, url, page=None):
+        """
+        driver.get() with captcha checking, then wait until the page is ready: the
+        READY_LOCATORS element of `page` if given, otherwise network idle.
+        The page source is then stored in the raw archive, if any, as "shopee_<page>_html".
+        Returns False if the page was not ready within the timeout.
+        """
         self.driver.get(url)
-        time.sleep(5)  # Wait for page to load
         while self._check_captcha():
             logging.info("Retrying after captcha...")
             self.driver.get(url)
-            time.sleep(5)  # Wait for page to load
-            self._check_captcha()
-            self.driver.implicitly_wait(3)
+        timeout = self.timeouts['page']
+        if page in READY_LOCATORS:
+            ready = self._wait_for(READY_LOCATORS[page], timeout) is not None
+        else:
+            ready = self._wait_network_idle(timeout)
+        if not ready:
+            logging.warning(f"Page not ready after {timeout}s: {url}")
+        self._archive_page(page)
+        return ready
+
+    def _archive_page(self, page):
+        """Store the current page source in the raw archive, if one is configured."""
+        if self.raw_archive is None:
+            return
+        try:
+            self.raw_archive.write(f"shopee_{page or 'page'}_html", self.driver.current_url, self.driver.page_source)
+        except Exception as e:
+            logging.warning(f"Could not archive page source: {e}")
+
+    def _first_review(self):
+        """Text of the first review in the ratings list, looked up afresh so a re-rendered list is never stale."""
+        containers = self.driver.find_elements(*READY_LOCATORS['reviews'])
+        return self.driver.execute_script(FIRST_REVIEW_JS, containers[0]) if containers else None
+
+    def _wait_for_new_reviews(self, previous, settle=False):
+        """
+        After a click, wait until the first review on the list changes; False on timeout.
+        With settle=True (star filters) also stop once the review request has settled: the
+        filtered list may start with the same review, which should not cost the whole timeout.
+        """
+        settled = self._network_idle(0.5) if settle else None
+
+        def changed(driver):
+            return self._first_review() != previous or (settled is not None and settled(driver))
+        try:
+            WebDriverWait(self.driver, self.timeouts['paging'], poll_frequency=0.1,
+                          ignored_exceptions=(StaleElementReferenceException,)).until(changed)
+            return True
+        except TimeoutException:
+            return False
 
     def _scrape_page(self):
         logging.info("Loading Shopee search page...")
         base_url = "https://shopee.vn/search?keyword="
         kw_encoded = re.sub(r'\s+', '%20', self.search_term.strip())
         url = f"{base_url}{kw_encoded}&page=0&sortBy=sales"
-        self._safe_get(url)
-        self._load_cookies()
-        self._safe_get(url)
-        self.driver.implicitly_wait(5)
+        if not self._safe_get(url, page='search'):
+            return []
         return self._retrieve_products()
 
     def _parse_star_text(self, text):
@@ -239,22 +354,23 @@ class ShopeeScraper:
 
     def _scrape_details(self, product):
         try:
-            self._safe_get(product["link"])
-            self.driver.implicitly_wait(3)
+            self._safe_get(product["link"], page='product')
+            # The sections below the main container render after it, so each one gets its own wait
+            timeout = self.timeouts['details']
 
             # Category
             try:
                 cat_xpath = '//*[@id="sll2-normal-pdp-main"]/div/div[1]/div/div[2]/div[2]/div/div[1]/div[1]/section[1]/div'
-                cat_div = self.driver.find_element(By.XPATH, cat_xpath)
-                product["category"] = cat_div.text
+                cat_div = self._wait_for((By.XPATH, cat_xpath), timeout)
+                product["category"] = cat_div.text if cat_div is not None else ""
             except:
                 product["category"] = ""
 
             # Description
             try:
                 desc_xpath = '//*[@id="sll2-normal-pdp-main"]/div/div[1]/div/div[2]/div[2]/div/div[1]/div[1]/section[2]/div/div'
-                desc_div = self.driver.find_element(By.XPATH, desc_xpath)
-                product["description"] = desc_div.text
+                desc_div = self._wait_for((By.XPATH, desc_xpath), timeout)
+                product["description"] = desc_div.text if desc_div is not None else ""
             except:
                 product["description"] = ""
 
@@ -264,7 +380,10 @@ class ShopeeScraper:
             try:
                 self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
                 overview_xpath = '//*[@id="sll2-normal-pdp-main"]/div/div/div/div[2]/div[3]/div/div[1]/div[2]/div/div/div[2]/div[2]'
-                overview_elem = self.driver.find_element(By.XPATH, overview_xpath)
+                # The ratings section renders lazily once scrolled into view
+                overview_elem = self._wait_for((By.XPATH, overview_xpath), self.timeouts['reviews'])
+                if overview_elem is None:
+                    raise NoSuchElementException("rating overview")
                 filters = overview_elem.find_elements(By.XPATH, './/div[contains(@class,"product-rating-overview__filter")]')
                 for f in filters:
                     text = f.text.strip()
@@ -311,93 +430,62 @@ class ShopeeScraper:
                             star_count = self._parse_star_text(star_count_text)
                             # click star filter only if there's a nonzero count
                             if star_count > 0:
+                                previous = self._first_review()
                                 filter_div.click()
-                                time.sleep(1)
+                                # An unchanged first review once the request settles means the list is ready
+                                self._wait_for_new_reviews(previous, settle=True)
                                 all_reviews += self._collect_reviews(min(star_count, self.star_limit_per_type))
-                    product["comments"] = all_reviews
+                    self._store_comments(product, all_reviews)
                 except Exception as e:
                     logging.warning(f"Unable to collect star-based reviews: {e}")
             else:
                 # Old approach: collect all in one pass
                 all_reviews = self._collect_reviews(min(product["total_rating"], self.review_limit))
-                product["comments"] = all_reviews
+                self._store_comments(product, all_reviews)
             
         except Exception as e:
             logging.warning(f"Detail scrape failed for {product.get('link')}: {e}")
 
+    def _store_comments(self, product, reviews):
+        """
+        Append the reviews not seen before to product["comments"]; saved comments are kept.
+        Their index keys are committed by _periodic_save after the JSON is written.
+        comments_scraped marks a product whose reviews were collected even if none were new,
+        so _scrape_missing_comments does not revisit it on every run.
+        """
+        saved = product.get("comments") or []
+        saved_keys = {review_key(product["link"], c) for c in saved if isinstance(c, dict)}
+        unsaved = [r for r in reviews if isinstance(r, dict) and review_key(product["link"], r) not in saved_keys]
+        new_reviews, keys = self.review_index.select_new(product["link"], unsaved)
+        product["comments"] = saved + new_reviews
+        self.review_index.add_keys(keys, commit=False)
+        if reviews or not product.get("total_rating"):
+            product["comments_scraped"] = True
+
     def _collect_reviews(self, max_reviews):
         """Helper to collect up to max_reviews from the current filtered view."""
         collected_reviews = []
-        try:
-            # Wait up to 2 seconds for rating list to appear
-            start_time = time.time()
-            rating_container = None
-            while time.time() - start_time < 5:
-                try:
-                    rating_container = self.driver.find_element(By.CLASS_NAME, 'product-ratings__list')
-                    break
-                except:
-                    time.sleep(0.1)
-            if not rating_container:
-                return collected_reviews
-        except:
+        rating_container = self._wait_for(READY_LOCATORS['reviews'], self.timeouts['reviews'])
+        if rating_container is None:
             return collected_reviews
 
         with tqdm(total=max_reviews, desc="Collecting reviews") as pbar:
             while len(collected_reviews) < max_reviews:
-                rating_items = rating_container.find_elements(By.XPATH, './/div[contains(@class,"shopee-product-rating__main")]')
-                for item in rating_items:
-                    if len(collected_reviews) >= max_reviews:
-                        break
-                    review_data = {}
-                    # Author
-                    try:
-                        auth_elem = item.find_element(By.CLASS_NAME,'shopee-product-rating__author-name')
-                        review_data["author"] = auth_elem.text.strip()
-                    except:
-                        review_data["author"] = ""
-
-                    # Rating
-                    try:
-                        star_elems = item.find_element(By.XPATH, './/div[@class="shopee-product-rating__rating"]').find_elements(By.XPATH, '*')
-                        solid_stars = [s for s in star_elems if 'shopee-svg-icon icon-rating-solid--active icon-rating-solid' in s.get_attribute('class')]
-                        review_data["rating"] = len(solid_stars)
-                    except:
-                        review_data["rating"] = 0
-
-                    # Time
-                    try:
-                        time_elem = item.find_element(By.XPATH, './/div[@class="shopee-product-rating__time"]')
-                        review_data["time"] = time_elem.text.strip()
-                    except:
-                        review_data["time"] = ""
-
-                    # Content
-                    try:
-                        content_elem = item.find_element(By.XPATH, './/div[@style="position: relative; box-sizing: border-box; margin: 15px 0px; font-size: 14px; line-height: 20px; color: rgba(0, 0, 0, 0.87); word-break: break-word; white-space: pre-wrap;"]')
-                        review_data["content"] = content_elem.text.strip()
-                    except:
-                        review_data["content"] = ""
-
-                    # Seller respond
-                    try:
-                        seller_respond = item.find_element(By.XPATH, './/div[@class="TQTPT9"]//div[@class="qiTixQ"]')
-                        review_data["seller_respond"] = seller_respond.text.strip()
-                    except:
-                        review_data["seller_respond"] = ""
-
-                    # Like count
-                    try:
-                        like_elem = item.find_element(By.XPATH, './/div[@class="shopee-product-rating__like-count"]')
-                        like_text = like_elem.text.strip()
-                        review_data["like_count"] = int(like_text) if like_text.isdigit() else 0
-                    except:
-                        review_data["like_count"] = 0
-
+                try:
+                    page_reviews = self.driver.execute_script(REVIEW_ITEMS_JS, rating_container)
+                except Exception as e:
+                    logging.warning(f"Review extraction script failed: {e}")
+                    break
+                if not page_reviews:
+                    break
+                previous = self.driver.execute_script(FIRST_REVIEW_JS, rating_container)
+                for review_data in page_reviews[:max_reviews - len(collected_reviews)]:
                     print(f'{review_data["author"]} - {review_data["rating"]} - {review_data["time"]} - {review_data["content"]} - {review_data["seller_respond"]} - {review_data["like_count"]}')
 
                     collected_reviews.append(review_data)
                     pbar.update(1)
+                if len(collected_reviews) >= max_reviews:
+                    break
                 # Try to click next page if available
                 elements_to_try = [ (By.CLASS_NAME, 'shopee-svg-icon icon-arrow-right'), 
                                     (By.XPATH, '//*[@id="sll2-normal-pdp-main"]/div/div/div/div[2]/div[3]/div/div[1]/div[2]/div/div/div[3]/nav/button[8]/svg'),
@@ -407,15 +495,23 @@ class ShopeeScraper:
                                     (By.CLASS_NAME, 'shopee-svg-icon icon-arrow-right'),
                                       ]
 
+                clicked = False
                 for by, value in elements_to_try:
                     try:
                         next_button = self.driver.find_element(by, value)
                         next_button.click()
                         print('click next page')
-                        time.sleep(1)
+                        clicked = True
                         break
                     except:
                         continue
+                # Stop when there is no next page or it never loads
+                if not (clicked and self._wait_for_new_reviews(previous)):
+                    break
+                # The list may have been re-rendered: extract the next page from a fresh container
+                rating_container = self._wait_for(READY_LOCATORS['reviews'], self.timeouts['reviews'])
+                if rating_container is None:
+                    break
         return collected_reviews
 
     def execute(self):
@@ -425,6 +521,11 @@ class ShopeeScraper:
         else:
             self.driver = uc.Chrome(options=self.options, enable_cdp_events=False, headless=False)
         self.driver.maximize_window()
+        # Cookies go in before the first navigation, so each page is loaded only once
+        try:
+            self._load_cookies()
+        except Exception as e:
+            logging.warning(f"Could not restore cookies: {e}")
 
         # Run the missing comments scraper if we have existing data
         if self.output_data:
@@ -468,7 +569,15 @@ if __name__ == "__main__":
     parser.add_argument("--all-star-types", action="store_true", default=False, help="Retrieve comments by filtering each star rating.")
     parser.add_argument("--star-limit-per-type", type=int, default=10, help="Number of reviews to retrieve per star type.")
     parser.add_argument("--chrome-user-data-dir", default=None, help="User data directory for Chrome")
+    parser.add_argument("--review-index", default=None, help="Persistent review index file; reviews seen in earlier runs are dropped")
+    parser.add_argument("--page-timeout", type=float, default=DEFAULT_TIMEOUTS['page'], help="Seconds to wait for a page to be ready")
+    parser.add_argument("--review-timeout", type=float, default=DEFAULT_TIMEOUTS['reviews'], help="Seconds to wait for the ratings list and each review page")
+    parser.add_argument("--raw-archive", default=None, help="Directory to archive the raw HTML of every loaded page")
     args = parser.parse_args()
+    raw_archive = None
+    if args.raw_archive:
+        from raw_archive import RawArchive
+        raw_archive = RawArchive(args.raw_archive)
     scraper = ShopeeScraper(
         args.keyword, 
         args.num, 
@@ -476,6 +585,13 @@ if __name__ == "__main__":
         args.review_limit,
         all_star_types=args.all_star_types,
         star_limit_per_type=args.star_limit_per_type,
-        chrome_user_data_dir=args.chrome_user_data_dir
+        chrome_user_data_dir=args.chrome_user_data_dir,
+        review_index_file=args.review_index,
+        timeouts={'page': args.page_timeout, 'reviews': args.review_timeout, 'paging': args.review_timeout},
+        raw_archive=raw_archive
     )
-    scraper.execute()
\ No newline at end of file
+    try:
+        scraper.execute()
+    finally:
+        if raw_archive is not None:
+            raw_archive.close()
\ No newline at end of file
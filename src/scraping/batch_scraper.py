@@ -1,8 +1,12 @@
 import asyncio
 import json
 import logging
+import argparse
 from pathlib import Path
 from tiki_data import TikiPlaywrightScraper
+from keyword_stats import KeywordStats
+from product_index import ProductIndex
+from review_index import ReviewIndex
 
 # Setup logging
 logging.basicConfig(
@@ -14,8 +18,24 @@ logging.basicConfig(
     ]
 )
 
-async def run_batch_scraping():
-    """Chạy thu thập dữ liệu hàng loạt theo keywords dạng brand+type"""
+async def run_batch_scraping(request_budget=None, stats_file=None, index_file=None, parquet_dir=None,
+                             sqlite_path=None, history_path=None, jsonl_path=None, blob_path=None,
+                             review_index_file=None, raw_archive_dir=None):
+    """
+    Chạy thu thập dữ liệu hàng loạt theo keywords dạng brand+type
+
+    Args:
+        request_budget: Tổng số request tối đa cho cả batch (None = không giới hạn)
+        stats_file: File lưu thống kê yield của từng keyword
+        index_file: File index sản phẩm dùng chung giữa các keyword và các lần chạy
+        parquet_dir: Nếu có, ghi products/reviews/specifications ra Parquet trong thư mục này
+        sqlite_path: Nếu có, upsert products/reviews/specifications vào file SQLite này
+        history_path: Nếu có, ghi lịch sử thay đổi giá/tồn kho vào file SQLite này
+        jsonl_path: Nếu có, ghi sản phẩm ra JSONL (nén gzip/zstd nếu đuôi .gz/.zst)
+        blob_path: Nếu có, lưu description/warranty... vào blob store SQLite này, product chỉ giữ hash
+        review_index_file: File index review đã lưu, review trùng giữa các keyword và các lần chạy bị bỏ
+        raw_archive_dir: Nếu có, lưu response JSON/HTML thô vào thư mục này để parse lại offline
+    """
     
     # Đọc file keywords
     keywords_file = Path(__file__).parent / 'search_keywork.json'
@@ -129,6 +149,46 @@ async def run_batch_scraping():
         if category_keywords:
             logging.info(f"   - {category}: {', '.join(category_keywords)}")
     
+    # Sắp xếp keywords theo yield lịch sử và điều chỉnh max_products
+    if stats_file is None:
+        stats_file = Path(__file__).parent / 'keyword_stats.json'
+    keyword_stats = KeywordStats(stats_file)
+    all_keywords = keyword_stats.prioritize(all_keywords, request_budget=request_budget)
+    logging.info(f"🎯 Sẽ chạy {len(all_keywords)} keywords theo thứ tự yield (ngân sách: {request_budget or 'không giới hạn'} requests)")
+    
+    # Index sản phẩm dùng chung: sản phẩm đã thu thập sẽ không bị lấy lại chi tiết/reviews
+    if index_file is None:
+        index_file = Path(__file__).parent / 'product_index.jsonl'
+    product_index = ProductIndex(index_file)
+    
+    # Index review dùng chung: review trùng (theo id hoặc fingerprint nội dung) không được lưu lại
+    if review_index_file is None:
+        review_index_file = Path(__file__).parent / 'review_index.txt'
+    review_index = ReviewIndex(review_index_file)
+    
+    # Các sink dùng chung cho cả batch
+    sinks = []
+    if parquet_dir:
+        from parquet_sink import ParquetSink
+        sinks.append(ParquetSink(parquet_dir))
+    if sqlite_path:
+        from sql_store import SQLStore
+        sinks.append(SQLStore(sqlite_path))
+    if history_path:
+        from price_history import PriceHistory
+        sinks.append(PriceHistory(history_path))
+    if jsonl_path:
+        from streams import JsonlSink
+        sinks.append(JsonlSink(jsonl_path))
+    raw_archive = None
+    if raw_archive_dir:
+        from raw_archive import RawArchive
+        raw_archive = RawArchive(raw_archive_dir)
+    blob_store = None
+    if blob_path:
+        from blob_store import BlobStore
+        blob_store = BlobStore(blob_path)
+    
     # Chạy scraping cho từng keyword
     all_products = []
     
@@ -150,20 +210,29 @@ async def run_batch_scraping():
                 search_term=keyword,
                 max_products=max_products,
                 max_reviews=20,  # Giữ nguyên 20 reviews mỗi sản phẩm
-                headless=True  # Chạy ẩn để nhanh hơn
+                headless=True,  # Chạy ẩn để nhanh hơn
+                product_index=product_index,
+                search_category=category,
+                sinks=sinks,
+                blob_store=blob_store,
+                review_index=review_index,
+                raw_archive=raw_archive
             )
             
             # Chạy scraper
             products = await scraper.scrape()
             
-            # Thêm metadata cho mỗi sản phẩm
+            # Scraper đã gắn search_keyword/search_category cho mỗi sản phẩm
             if products:
-                for product in products:
-                    product['search_keyword'] = keyword
-                    product['search_category'] = category
                 all_products.extend(products)
             
+            # Ghi nhận yield của keyword cho các lần chạy sau
+            run_yield = keyword_stats.record(keyword, products, scraper.request_count,
+                                             known_products=scraper.known_products)
+            keyword_stats.save()
+            
             logging.info(f"✅ Hoàn thành thu thập cho '{keyword}' - Thu được {len(products) if products else 0} sản phẩm")
+            logging.info(f"   └─ Yield: {run_yield['new_products']} sản phẩm mới, {run_yield['new_reviews']} reviews mới, {run_yield['requests']} requests")
             
         except Exception as e:
             logging.error(f"❌ Lỗi khi thu thập '{keyword}': {e}")
@@ -173,6 +242,17 @@ async def run_batch_scraping():
         if idx < len(all_keywords):
             logging.info(f"⏳ Đang chờ {sleep_time} giây trước khi thu thập keyword tiếp theo...")
     
+    for sink in sinks:
+        sink.close()
+    if blob_store is not None:
+        blob_store.close()
+    if raw_archive is not None:
+        raw_archive.close()
+    
+    # Index chỉ được ghi ra đĩa sau khi sink đã đóng (dữ liệu đã lưu bền vững)
+    product_index.commit()
+    review_index.commit()
+    
     logging.info(f"\n{'='*80}")
     logging.info(f"🎉 HOÀN THÀNH! Đã thu thập xong {len(all_keywords)} keywords")
     logging.info(f"📊 Tổng số sản phẩm: {len(all_products)}")
@@ -181,4 +261,21 @@ async def run_batch_scraping():
     return all_products
 
 if __name__ == "__main__":
-    asyncio.run(run_batch_scraping())
+    parser = argparse.ArgumentParser(description='Thu thập dữ liệu Tiki hàng loạt theo keywords')
+    parser.add_argument('-b', '--budget', type=int, default=None, help='Tổng số request tối đa cho cả batch')
+    parser.add_argument('--stats-file', default=None, help='File thống kê yield của keywords')
+    parser.add_argument('--index-file', default=None, help='File index sản phẩm đã thu thập')
+    parser.add_argument('--parquet-dir', default=None, help='Thư mục ghi Parquet (products/reviews/specifications)')
+    parser.add_argument('--sqlite', default=None, help='File SQLite để upsert products/reviews/specifications')
+    parser.add_argument('--history', default=None, help='File SQLite lưu lịch sử thay đổi giá/tồn kho')
+    parser.add_argument('--jsonl', default=None, help='File JSONL output, nén nếu đuôi .gz/.zst (vd: tiki.jsonl.zst)')
+    parser.add_argument('--review-index', default=None, help='File index review đã lưu')
+    parser.add_argument('--raw-archive', default=None, help='Thư mục lưu response thô để parse lại offline')
+    parser.add_argument('--blob-store', default=None, help='File SQLite lưu description/warranty... theo hash')
+    args = parser.parse_args()
+    
+    asyncio.run(run_batch_scraping(request_budget=args.budget, stats_file=args.stats_file,
+                                   index_file=args.index_file, parquet_dir=args.parquet_dir,
+                                   sqlite_path=args.sqlite, history_path=args.history,
+                                   jsonl_path=args.jsonl, blob_path=args.blob_store,
+                                   review_index_file=args.review_index, raw_archive_dir=args.raw_archive))
@@ -0,0 +1,189 @@
+import hashlib
+import html
+import json
+import logging
+import re
+import sqlite3
+import zlib
+from collections.abc import Mapping
+from pathlib import Path
+
+try:
+    import zstandard
+except ImportError:  # không có zstandard thì nén bằng zlib
+    zstandard = None
+
+# Các trường HTML dài của sản phẩm được chuyển sang blob store
+BLOB_FIELDS = ['description', 'short_description', 'warranty_info', 'return_and_exchange_policy']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    hash TEXT PRIMARY KEY,
+    codec TEXT NOT NULL,
+    raw_size INTEGER NOT NULL,
+    data BLOB NOT NULL,
+    text BLOB
+) WITHOUT ROWID;
+"""
+
+_TAG_RE = re.compile(r'<(script|style)\b.*?</\1>|<[^>]+>', re.S | re.I)
+_SPACE_RE = re.compile(r'\s+')
+
+
+def strip_html(value):
+    """Bỏ thẻ HTML, giải mã entity và gộp khoảng trắng"""
+    if not value:
+        return ''
+    text = _TAG_RE.sub(' ', value)
+    return _SPACE_RE.sub(' ', html.unescape(text)).strip()
+
+
+def blob_key(field):
+    """Tên trường chứa hash trong product record, vd: description → description_hash"""
+    return f"{field}_hash"
+
+
+class BlobStore:
+    def __init__(self, db_path="tiki_blobs.db", level=3, store_text=False):
+        """
+        Kho nội dung theo hash (content-addressed) cho các trường HTML dài.
+
+        Mỗi nội dung chỉ được lưu một lần (nén zstd, hoặc zlib nếu thiếu zstandard),
+        product record chỉ giữ hash. Nội dung chỉ được giải nén khi truy cập.
+
+        Args:
+            db_path: File SQLite chứa blobs
+            level: Mức nén
+            store_text: Lưu sẵn bản text đã bỏ HTML để phân tích
+        """
+        self.db_path = Path(db_path)
+        self.level = level
+        self.store_text = store_text
+        self.conn = sqlite3.connect(self.db_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        self.blobs_written = 0
+        self.duplicates = 0
+        self.raw_bytes = 0
+        self.stored_bytes = 0
+
+    def _compress(self, data):
+        if zstandard is not None:
+            return 'zstd', zstandard.ZstdCompressor(level=self.level).compress(data)
+        return 'zlib', zlib.compress(data, min(self.level * 2, 9))
+
+    @staticmethod
+    def _decompress(codec, data):
+        if codec == 'zstd':
+            if zstandard is None:
+                raise ImportError("Blob nén zstd cần zstandard: pip install zstandard")
+            return zstandard.ZstdDecompressor().decompress(data)
+        return zlib.decompress(data)
+
+    def put(self, value):
+        """
+        Lưu nội dung và trả về hash của nó (None nếu nội dung rỗng).
+
+        Giá trị không phải chuỗi (vd: return_and_exchange_policy dạng list/dict) được
+        lưu dưới dạng JSON với key đã sắp xếp, nên get() trả về chuỗi JSON đó.
+        """
+        if not value:
+            return None
+        if not isinstance(value, str):
+            value = json.dumps(value, ensure_ascii=False, sort_keys=True)
+        raw = value.encode('utf-8')
+        content_hash = hashlib.sha256(raw).hexdigest()
+        exists = self.conn.execute("SELECT 1 FROM blobs WHERE hash = ?", (content_hash,)).fetchone()
+        if exists:
+            self.duplicates += 1
+            return content_hash
+        codec, data = self._compress(raw)
+        text = None
+        if self.store_text:
+            text = self._compress(strip_html(value).encode('utf-8'))[1]
+        self.conn.execute(
+            "INSERT INTO blobs (hash, codec, raw_size, data, text) VALUES (?, ?, ?, ?, ?)",
+            (content_hash, codec, len(raw), data, text)
+        )
+        self.blobs_written += 1
+        self.raw_bytes += len(raw)
+        self.stored_bytes += len(data)
+        return content_hash
+
+    def get(self, content_hash):
+        """Giải nén và trả về nội dung gốc, None nếu không có"""
+        if not content_hash:
+            return None
+        row = self.conn.execute("SELECT codec, data FROM blobs WHERE hash = ?", (content_hash,)).fetchone()
+        if row is None:
+            return None
+        return self._decompress(row[0], row[1]).decode('utf-8')
+
+    def get_text(self, content_hash):
+        """Trả về bản text đã bỏ HTML, tính và lưu lại nếu chưa có"""
+        if not content_hash:
+            return None
+        row = self.conn.execute("SELECT codec, data, text FROM blobs WHERE hash = ?", (content_hash,)).fetchone()
+        if row is None:
+            return None
+        codec, data, text = row
+        if text is not None:
+            return self._decompress(codec, text).decode('utf-8')
+        stripped = strip_html(self._decompress(codec, data).decode('utf-8'))
+        with self.conn:
+            self.conn.execute("UPDATE blobs SET text = ? WHERE hash = ?",
+                              (self._compress(stripped.encode('utf-8'))[1], content_hash))
+        return stripped
+
+    def offload(self, product, fields=None):
+        """
+        Chuyển các trường HTML dài của product vào store, thay bằng <field>_hash.
+
+        Returns:
+            dict: Chính product đã được sửa
+        """
+        for field in fields or BLOB_FIELDS:
+            if field in product:
+                product[blob_key(field)] = self.put(product.pop(field))
+        self.conn.commit()
+        return product
+
+    def fields(self, product, text=False):
+        """Mapping chỉ đọc field → nội dung, giải nén khi truy cập"""
+        return LazyBlobs(self, product, text=text)
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+        saved = f", nén {self.raw_bytes:,} → {self.stored_bytes:,} bytes" if self.raw_bytes else ""
+        logging.info(f"🗃️  Blob store: {self.blobs_written} blobs mới, {self.duplicates} trùng lặp{saved} → {self.db_path}")
+
+
+class LazyBlobs(Mapping):
+    def __init__(self, store, product, text=False):
+        """
+        Truy cập các trường đã offload của một sản phẩm như dict thường.
+
+        Args:
+            store: BlobStore chứa nội dung
+            product: Product record có các trường <field>_hash
+            text: Trả về bản text đã bỏ HTML thay vì HTML gốc
+        """
+        self.store = store
+        self.hashes = {field: product[blob_key(field)] for field in BLOB_FIELDS
+                       if product.get(blob_key(field))}
+        self.text = text
+        self.cache = {}
+
+    def __getitem__(self, field):
+        if field not in self.cache:
+            content_hash = self.hashes[field]
+            getter = self.store.get_text if self.text else self.store.get
+            self.cache[field] = getter(content_hash)
+        return self.cache[field]
+
+    def __iter__(self):
+        return iter(self.hashes)
+
+    def __len__(self):
+        return len(self.hashes)
@@ -0,0 +1,110 @@
+import logging
+from pathlib import Path
+
+import pandas as pd
+
+try:
+    import pyarrow.feather as feather
+except ImportError:  # không có pyarrow thì bỏ qua cache Feather
+    feather = None
+
+ARROW_STRING = 'string[pyarrow]'
+
+# Kiểu dữ liệu tường minh cho extracted_products.csv
+PRODUCT_SCHEMA = {
+    'id': 'int64',
+    'name': ARROW_STRING,
+    'price': 'Int64',
+    'original_price': 'Int64',
+    'discount': 'float32',
+    'rating': 'float32',
+    'quantity_sold': 'Int32',
+    'brand_name': 'category',
+    'specifications': ARROW_STRING,
+    'stock_item': ARROW_STRING,
+}
+
+# Kiểu dữ liệu tường minh cho product_reviews.csv ('time' được parse riêng từ epoch)
+REVIEW_SCHEMA = {
+    'product_id': 'int64',
+    'review_id': 'Int64',
+    'title': 'category',
+    'content': ARROW_STRING,
+    'rating': 'Int8',
+    'author': ARROW_STRING,
+    'time': 'datetime64[s]',
+    'helpful_count': 'Int32',
+}
+
+
+def _parse_time(values):
+    """Cột time là epoch giây (review từ API) hoặc rỗng/chuỗi (review từ HTML)"""
+    return pd.to_datetime(pd.to_numeric(values, errors='coerce'), unit='s').astype('datetime64[s]')
+
+
+def apply_schema(df, schema):
+    """Ép các cột có trong schema về kiểu tường minh"""
+    for column, dtype in schema.items():
+        if column not in df.columns or str(df[column].dtype) == dtype:
+            continue
+        if column == 'time':
+            df[column] = _parse_time(df[column])
+        elif dtype in ('Int8', 'Int32', 'Int64', 'int64', 'float32'):
+            numbers = pd.to_numeric(df[column], errors='coerce')
+            df[column] = numbers.astype(dtype if dtype != 'int64' or numbers.notna().all() else 'Int64')
+        else:
+            df[column] = df[column].astype(dtype)
+    return df
+
+
+def load_typed_csv(path, schema, columns=None, cache=True, memory_map=True):
+    """
+    Đọc CSV với schema tường minh, có cache Feather cạnh file CSV.
+
+    Cache <file>.feather (không nén) được tạo ở lần đọc đầu và dùng lại khi
+    mới hơn file CSV; đọc qua memory map nên chỉ các cột được chọn bị đọc lên RAM.
+
+    Args:
+        path: File CSV
+        schema: dict cột → dtype
+        columns: Chỉ đọc các cột này (None = tất cả)
+        cache: Dùng/tạo cache Feather
+        memory_map: Memory-map file cache khi đọc
+
+    Returns:
+        DataFrame: Dữ liệu đã ép kiểu
+    """
+    path = Path(path)
+    cache_path = path.with_suffix(path.suffix + '.feather')
+    use_cache = cache and feather is not None
+
+    if use_cache and cache_path.exists() and cache_path.stat().st_mtime >= path.stat().st_mtime:
+        table = feather.read_table(cache_path, columns=columns, memory_map=memory_map)
+        return apply_schema(table.to_pandas(), schema)
+
+    if use_cache:
+        # Cache luôn chứa đủ cột để các lần đọc sau có thể chọn cột khác
+        df = _read_csv(path, schema, None)
+        try:
+            feather.write_feather(df, cache_path, compression='uncompressed')
+        except Exception as e:
+            logging.warning(f"Không ghi được cache {cache_path}: {e}")
+        return df[columns].copy() if columns else df
+    return _read_csv(path, schema, columns)
+
+
+def _read_csv(path, schema, columns):
+    dtype = {c: t for c, t in schema.items()
+             if t in ('category', ARROW_STRING) and (columns is None or c in columns)}
+    df = pd.read_csv(path, usecols=columns, dtype=dtype, encoding='utf-8-sig')
+    return apply_schema(df, schema)
+
+
+def load_products(path='extracted_products.csv', columns=None, cache=True, memory_map=True):
+    """Đọc extracted_products.csv với PRODUCT_SCHEMA"""
+    return load_typed_csv(path, PRODUCT_SCHEMA, columns=columns, cache=cache, memory_map=memory_map)
+
+
+def load_reviews(path='product_reviews.csv', columns=None, cache=True, memory_map=True):
+    """Đọc product_reviews.csv với REVIEW_SCHEMA"""
+    return load_typed_csv(path, REVIEW_SCHEMA, columns=columns, cache=cache, memory_map=memory_map)
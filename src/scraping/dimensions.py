@@ -0,0 +1,153 @@
+import json
+import re
+import unicodedata
+from pathlib import Path
+
+import pandas as pd
+
+from records import to_int
+
+# Trường lồng nhau của product → (bảng dimension, cột khóa trong bảng products)
+FIELD_DIMENSIONS = {
+    'brand': ('brands', 'brand_key'),
+    'current_seller': ('sellers', 'current_seller_key'),
+    'seller': ('sellers', 'seller_key'),
+    'categories': ('categories', 'category_key'),
+}
+
+DIMENSION_COLUMNS = ['key', 'id', 'name', 'raw']
+
+# Id tự nhiên của brand/seller/category, theo thứ tự ưu tiên
+ID_FIELDS = ['id', 'seller_id', 'brand_id', 'category_id']
+# Trường của từng listing (giá, sku của seller cho một sản phẩm), không thuộc về entity
+LISTING_FIELDS = ['price', 'sku', 'product_id', 'is_best_store']
+
+_SPACE_RE = re.compile(r'\s+')
+
+
+def _canonical(value):
+    """Chuỗi JSON chuẩn của giá trị, None nếu rỗng"""
+    if value is None or value == '' or value == {} or (isinstance(value, float) and pd.isna(value)):
+        return None
+    return json.dumps(value, ensure_ascii=False, sort_keys=True)
+
+
+def _normalize_name(name):
+    """Tên chuẩn hóa để so khớp: NFC, chữ thường, gộp khoảng trắng"""
+    return _SPACE_RE.sub(' ', unicodedata.normalize('NFC', str(name)).casefold()).strip()
+
+
+def _entity(value):
+    """
+    Tách (id, name, entity) từ giá trị brand/seller/category.
+
+    entity là giá trị đã bỏ các trường theo listing, dùng làm cột raw.
+    """
+    if not isinstance(value, dict):
+        return None, str(value), value
+    entity = {k: v for k, v in value.items() if k not in LISTING_FIELDS}
+    natural_id = next((to_int(entity[f]) for f in ID_FIELDS if entity.get(f) not in (None, '')), None)
+    return natural_id, entity.get('name') or None, entity
+
+
+class Dimensions:
+    def __init__(self):
+        """
+        Các bảng dimension brands/sellers/categories với khóa thay thế (surrogate key) kiểu int.
+
+        Mỗi entity được lưu một lần theo khóa tự nhiên: id (id/seller_id/brand_id...)
+        nếu có, không thì tên đã chuẩn hóa, nên chuỗi 'Tiki Trading' và dict
+        {'name': 'Tiki Trading'} là cùng một dòng; trường theo listing (price, sku,
+        product_id) không tạo dòng mới. Product chỉ giữ brand_key, current_seller_key,
+        seller_key, category_key. Cột raw giữ entity gốc để dựng lại cấu trúc lồng nhau.
+        """
+        self.rows = {table: [] for table, _ in FIELD_DIMENSIONS.values()}
+        # 'id:<id>' / 'name:<tên chuẩn hóa>' → key
+        self.aliases = {table: {} for table in self.rows}
+
+    def _intern(self, table, raw):
+        natural_id, name, entity = _entity(json.loads(raw))
+        rows, aliases = self.rows[table], self.aliases[table]
+        id_alias = f"id:{natural_id}" if natural_id is not None else None
+        name_alias = f"name:{_normalize_name(name)}" if name else None
+        if id_alias is None and name_alias is None:
+            name_alias = 'raw:' + json.dumps(entity, ensure_ascii=False, sort_keys=True)
+
+        key = aliases.get(id_alias)
+        if key is None and name_alias in aliases:
+            row = rows[aliases[name_alias] - 1]
+            # Cùng tên nhưng khác id là hai entity khác nhau
+            if natural_id is None or row['id'] is None:
+                key = row['key']
+        entity_raw = json.dumps(entity, ensure_ascii=False, sort_keys=True)
+        if key is None:
+            # Khóa bắt đầu từ 1, NA nghĩa là sản phẩm không có giá trị
+            key = len(rows) + 1
+            rows.append({'key': key, 'id': natural_id, 'name': name, 'raw': entity_raw})
+        elif natural_id is not None and rows[key - 1]['id'] is None:
+            # Trước đó chỉ biết tên, nay có id: bổ sung cho dòng đã có
+            rows[key - 1].update(id=natural_id, name=name or rows[key - 1]['name'], raw=entity_raw)
+        for alias in (id_alias, name_alias):
+            if alias is not None:
+                aliases.setdefault(alias, key)
+        return key
+
+    def encode(self, df):
+        """
+        Thay các cột lồng nhau bằng cột khóa int.
+
+        Args:
+            df: DataFrame sản phẩm thô (mỗi dòng một product dict)
+
+        Returns:
+            DataFrame: Bản sao với brand/current_seller/seller/categories đổi thành *_key
+        """
+        df = df.copy()
+        for field, (table, key_column) in FIELD_DIMENSIONS.items():
+            if field not in df.columns:
+                continue
+            raws = df[field].map(_canonical)
+            mapping = {raw: self._intern(table, raw) for raw in raws.dropna().unique()}
+            df[key_column] = raws.map(mapping).astype('Int32')
+            df = df.drop(columns=field)
+        return df
+
+    def decode(self, df):
+        """Dựng lại các cột lồng nhau từ cột khóa (giá trị entity, không gồm trường theo listing)"""
+        df = df.copy()
+        for field, (table, key_column) in FIELD_DIMENSIONS.items():
+            if key_column not in df.columns:
+                continue
+            values = {row['key']: json.loads(row['raw']) for row in self.rows[table]}
+            df[field] = df[key_column].map(lambda key: values.get(key) if pd.notna(key) else None)
+            df = df.drop(columns=key_column)
+        return df
+
+    def to_frames(self):
+        """Các bảng dimension dạng DataFrame: {'brands', 'sellers', 'categories'}"""
+        frames = {}
+        for table, rows in self.rows.items():
+            frame = pd.DataFrame(rows, columns=DIMENSION_COLUMNS)
+            frame['key'] = frame['key'].astype('int32')
+            frame['id'] = pd.to_numeric(frame['id'], errors='coerce').astype('Int64')
+            frames[table] = frame
+        return frames
+
+    def save(self, output_dir='.'):
+        """Ghi dim_brands.csv, dim_sellers.csv, dim_categories.csv"""
+        output_dir = Path(output_dir)
+        for table, frame in self.to_frames().items():
+            frame.to_csv(output_dir / f'dim_{table}.csv', index=False, encoding='utf-8-sig')
+
+    @classmethod
+    def load(cls, output_dir='.'):
+        """Đọc lại các bảng dimension đã lưu để khóa ổn định giữa các lần export"""
+        dims = cls()
+        for table in dims.rows:
+            path = Path(output_dir) / f'dim_{table}.csv'
+            if not path.exists():
+                continue
+            frame = pd.read_csv(path, encoding='utf-8-sig', dtype={'raw': str})
+            for raw in frame.sort_values('key')['raw']:
+                dims._intern(table, raw)
+        return dims
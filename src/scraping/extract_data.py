@@ -1,128 +1,620 @@
 import pandas as pd
 import json
+import argparse
+import hashlib
+import os
+from pathlib import Path
 
-def extract_scraping_data(file_path):
+from records import product_row, review_rows, specification_rows, to_int
+from review_index import ReviewIndex
+from streams import open_stream
+
+PRODUCT_COLUMNS = ['id', 'name', 'price', 'original_price', 'discount',
+                   'rating', 'quantity_sold', 'brand', 'specifications', 'stock_item']
+# Thứ tự cột cố định của extracted_products.csv (brand được thay bằng brand_name)
+PRODUCT_EXPORT_COLUMNS = [col for col in PRODUCT_COLUMNS if col != 'brand'] + ['brand_name']
+REVIEW_COLUMNS = ['product_id', 'review_id', 'title', 'content',
+                  'rating', 'author', 'time', 'helpful_count']
+
+
+def iter_products(file_path, read_size=1 << 20, max_object_bytes=64 << 20, start_offset=0):
+    """
+    Đọc từng sản phẩm một từ file scrape mà không load cả file vào RAM.
+
+    Hỗ trợ mảng JSON, JSON Lines và file gồm nhiều mảng nối tiếp nhau
+    (định dạng mà _save_data ghi ra khi mở file ở chế độ 'a'). File .gz/.zst
+    được giải nén streaming.
+
+    Parameters:
+    file_path (str): Đường dẫn file JSON/JSONL
+    read_size (int): Số ký tự đọc mỗi lần
+    max_object_bytes (int): Kích thước tối đa của một sản phẩm trước khi báo lỗi
+    start_offset (int): Vị trí byte trên đĩa bắt đầu đọc (phải nằm giữa hai sản phẩm,
+        với file nén là ranh giới giữa hai lần ghi)
+
+    Yields:
+    dict: Từng sản phẩm
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    pos = 0
+    eof = False
+    encoding = 'utf-8-sig' if start_offset == 0 else 'utf-8'
+    with open_stream(file_path, 'rt', start_offset=start_offset, encoding=encoding) as f:
+        while True:
+            # Bỏ qua khoảng trắng và các ký tự phân tách giữa các sản phẩm
+            while pos < len(buffer) and buffer[pos] in ' \t\r\n,[]':
+                pos += 1
+            if pos >= len(buffer):
+                if eof:
+                    return
+                buffer = f.read(read_size)
+                pos = 0
+                eof = not buffer
+                continue
+            try:
+                obj, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # Sản phẩm chưa đọc đủ: đọc thêm rồi thử lại
+                if eof or len(buffer) - pos > max_object_bytes:
+                    raise
+                chunk = f.read(read_size)
+                eof = not chunk
+                buffer = buffer[pos:] + chunk
+                pos = 0
+                continue
+            pos = end
+            if isinstance(obj, dict):
+                yield obj
+
+
+def _select_product_columns(df):
+    """Chọn các columns cần thiết và tách brand name"""
+    # Lưu ý: 'brand' là dict/object nên cần extract 'name' từ nó
+    # Chỉ giữ các columns tồn tại trong dataframe
+    available_columns = [col for col in PRODUCT_COLUMNS if col in df.columns]
+    products_df = df[available_columns].copy()
+    
+    # Extract brand name nếu brand là dict
+    if 'brand' in products_df.columns:
+        products_df['brand_name'] = products_df['brand'].apply(
+            lambda x: x.get('name', '') if isinstance(x, dict) else str(x) if x else ''
+        )
+        # Drop column brand gốc sau khi đã extract
+        products_df = products_df.drop(columns=['brand'])
+    return products_df
+
+
+def _explode_reviews(df):
+    """Explode cột reviews thành DataFrame các review thô, kèm product_id"""
+    if 'reviews' not in df.columns or df.empty:
+        return pd.DataFrame(columns=['product_id'])
+    exploded = df.set_index('id')['reviews'].explode()
+    exploded = exploded[exploded.map(lambda r: isinstance(r, dict))]
+    if exploded.empty:
+        return pd.DataFrame(columns=['product_id'])
+    # product_id được giữ nhờ index sau explode
+    records = pd.DataFrame.from_records(exploded.tolist())
+    records.insert(0, 'product_id', exploded.index.to_numpy())
+    return records
+
+
+def _column(records, name, default):
+    if name in records.columns:
+        return records[name].fillna(default)
+    return pd.Series(default, index=records.index)
+
+
+def _side_table(records, column, explode):
+    """Flatten cột images/timeline của review thành bảng riêng theo review_id"""
+    if column not in records.columns or records.empty:
+        return pd.DataFrame(columns=['review_id', 'product_id'])
+    nested = records.set_index(['id', 'product_id'])[column]
+    if explode:
+        nested = nested.explode()
+    nested = nested[nested.map(lambda x: isinstance(x, dict) and len(x) > 0)]
+    if nested.empty:
+        return pd.DataFrame(columns=['review_id', 'product_id'])
+    table = pd.json_normalize(nested.tolist())
+    table.insert(0, 'review_id', nested.index.get_level_values(0).to_numpy())
+    table.insert(1, 'product_id', nested.index.get_level_values(1).to_numpy())
+    return table
+
+
+def flatten_reviews(df, side_tables=False):
+    """
+    Tạo DataFrame reviews (mỗi dòng một review) từ DataFrame sản phẩm bằng explode.
+
+    Parameters:
+    df (DataFrame): DataFrame sản phẩm có cột 'id' và 'reviews'
+    side_tables (bool): Nếu True, flatten thêm images và timeline thành bảng riêng
+
+    Returns:
+    DataFrame: reviews_df, hoặc tuple (reviews_df, {'review_images', 'review_timeline'})
+               khi side_tables=True
+    """
+    records = _explode_reviews(df)
+    reviews_df = pd.DataFrame({
+        'product_id': records['product_id'],
+        'review_id': _column(records, 'id', None),
+        'title': _column(records, 'title', ''),
+        'content': _column(records, 'content', ''),
+        'rating': _column(records, 'rating', 0),
+        'author': _column(records, 'author', 'Anonymous'),
+        'time': _column(records, 'time', ''),
+        'helpful_count': _column(records, 'helpful_count', 0),
+    }, columns=REVIEW_COLUMNS)
+    
+    if not side_tables:
+        return reviews_df
+    return reviews_df, {
+        'review_images': _side_table(records, 'images', explode=True),
+        'review_timeline': _side_table(records, 'timeline', explode=False),
+    }
+
+
+def extract_scraping_data(file_path, side_tables=False, review_index=None):
     """
     Extracts data from a JSON file and returns two pandas DataFrames.
 
     Parameters:
-    file_path (str): The path to the JSON file.
+    file_path (str): The path to the JSON file (JSON array, JSONL or concatenated arrays).
+    side_tables (bool): Also flatten review images and timeline into side tables.
+    review_index (ReviewIndex): Persistent review index; duplicate reviews (by id or
+        content fingerprint) are dropped. Defaults to an in-memory index for this file.
+        New keys are not written until the caller saves reviews_df and calls review_index.commit().
 
     Returns:
-    tuple: (products_df, reviews_df) - Two separate DataFrames for products and reviews
+    tuple: (products_df, reviews_df) - Two separate DataFrames for products and reviews,
+           plus a dict of side tables as third element when side_tables=True
     """
     try:
-        # Method 1: Try reading with json module first (more robust)
         print(f"📂 Đang đọc file: {file_path}")
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        # Convert to DataFrame
-        df = pd.DataFrame(data)
+        df = pd.DataFrame(list(iter_products(file_path)))
         print(f"✅ Đã đọc thành công {len(df)} sản phẩm")
         print(f"📊 Columns: {list(df.columns)}")
         
-        # Chọn các columns cần thiết
-        # Lưu ý: 'brand' là dict/object nên cần extract 'name' từ nó
-        columns_to_keep = ['id', 'name', 'price', 'original_price', 'discount', 
-                          'rating', 'quantity_sold', 'brand', 'specifications', 'stock_item']
-        
-        # Chỉ giữ các columns tồn tại trong dataframe
-        available_columns = [col for col in columns_to_keep if col in df.columns]
-        products_df = df[available_columns].copy()
-        
-        # Extract brand name nếu brand là dict
-        if 'brand' in products_df.columns:
-            products_df['brand_name'] = products_df['brand'].apply(
-                lambda x: x.get('name', '') if isinstance(x, dict) else str(x) if x else ''
-            )
-            # Drop column brand gốc sau khi đã extract
-            products_df = products_df.drop(columns=['brand'])
+        products_df = _select_product_columns(df)
         
         # Tạo DataFrame riêng cho reviews
         reviews_df = None
+        tables = {}
         if 'reviews' in df.columns:
             print("🔄 Đang extract reviews...")
-            reviews_data = []
-            
-            for _, row in df.iterrows():
-                product_id = row['id']
-                reviews = row.get('reviews', [])
-                
-                # Chỉ thêm nếu product có reviews
-                if reviews and isinstance(reviews, list) and len(reviews) > 0:
-                    for review in reviews:
-                        if isinstance(review, dict):
-                            review_data = {
-                                'product_id': product_id,
-                                'review_id': review.get('id'),
-                                'title': review.get('title', ''),
-                                'content': review.get('content', ''),
-                                'rating': review.get('rating', 0),
-                                'author': review.get('author', 'Anonymous'),
-                                'time': review.get('time', ''),
-                                'helpful_count': review.get('helpful_count', 0)
-                            }
-                            reviews_data.append(review_data)
-            
-            if reviews_data:
-                reviews_df = pd.DataFrame(reviews_data)
+            if side_tables:
+                reviews_df, tables = flatten_reviews(df, side_tables=True)
+            else:
+                reviews_df = flatten_reviews(df)
+            total = len(reviews_df)
+            if review_index is None:
+                review_index = ReviewIndex(None)
+            reviews_df = review_index.filter_frame(reviews_df, commit=False)
+            if total > len(reviews_df):
+                print(f"♻️  Bỏ {total - len(reviews_df)} reviews trùng lặp")
+            if len(reviews_df) > 0:
                 print(f"✅ Đã tạo reviews DataFrame với {len(reviews_df)} reviews")
             else:
                 print("⚠️  Không tìm thấy reviews nào")
-                reviews_df = pd.DataFrame(columns=['product_id', 'review_id', 'title', 'content', 
-                                                   'rating', 'author', 'time', 'helpful_count'])
         
+        if side_tables:
+            return products_df, reviews_df, tables
         return products_df, reviews_df
         
     except json.JSONDecodeError as e:
         print(f"❌ Lỗi JSON format: {e}")
         print(f"   Vị trí lỗi: line {e.lineno}, column {e.colno}")
-        
-        # Try alternative method: read line by line (for JSONL format)
-        try:
-            print("🔄 Thử đọc dạng JSON Lines (mỗi dòng 1 object)...")
-            data = []
-            with open(file_path, 'r', encoding='utf-8') as f:
-                for line_num, line in enumerate(f, 1):
-                    line = line.strip()
-                    if line:
-                        try:
-                            data.append(json.loads(line))
-                        except json.JSONDecodeError:
-                            print(f"⚠️  Skip dòng {line_num}: không parse được")
-                            continue
-            
-            if data:
-                df = pd.DataFrame(data)
-                print(f"✅ Đã đọc thành công {len(df)} sản phẩm (JSONL format)")
-                return df, None
-            else:
-                print("❌ Không có dữ liệu hợp lệ")
-                return None, None
-                
-        except Exception as e2:
-            print(f"❌ Lỗi khi đọc JSONL: {e2}")
-            return None
+        return (None, None, {}) if side_tables else (None, None)
     
     except Exception as e:
         print(f"❌ Lỗi khi đọc file: {e}")
-        
-        # Try pandas read_json with different parameters
+        return (None, None, {}) if side_tables else (None, None)
+
+
+def iter_scraping_chunks(file_path, chunk_size=5000):
+    """
+    Đọc file scrape theo từng khối sản phẩm với bộ nhớ giới hạn.
+
+    Parameters:
+    file_path (str): Đường dẫn file JSON/JSONL
+    chunk_size (int): Số sản phẩm mỗi khối
+
+    Yields:
+    tuple: (products_df, reviews_df) cho từng khối
+    """
+    chunk = []
+    for product in iter_products(file_path):
+        chunk.append(product)
+        if len(chunk) >= chunk_size:
+            df = pd.DataFrame(chunk)
+            yield _select_product_columns(df), flatten_reviews(df)
+            chunk = []
+    if chunk:
+        df = pd.DataFrame(chunk)
+        yield _select_product_columns(df), flatten_reviews(df)
+
+
+def _dedup_product_reviews(products, review_index):
+    """Bỏ review trùng khỏi từng sản phẩm trước khi ghi ra sink"""
+    for product in products:
+        if product.get('reviews'):
+            product['reviews'] = review_index.filter_new(product.get('id'), product['reviews'], commit=False)
+        yield product
+
+
+def export_scraping_data(file_path, output_dir='.', fmt='csv', chunk_size=5000, review_index=None):
+    """
+    Đọc streaming file scrape và ghi ra CSV hoặc Parquet theo từng khối.
+
+    Parameters:
+    file_path (str): Đường dẫn file JSON/JSONL
+    output_dir (str): Thư mục output
+    fmt (str): 'csv' (extracted_products.csv, product_reviews.csv),
+               'parquet' (các bảng products/reviews/specifications của ParquetSink) hoặc
+               'sqlite' (upsert vào output_dir/tiki_data.db qua SQLStore)
+    chunk_size (int): Số sản phẩm mỗi khối (CSV) hoặc mỗi row group (Parquet)
+    review_index (ReviewIndex): Index review đã lưu; mặc định chỉ dedup trong lần export này.
+        Khóa review chỉ được ghi vào index sau khi output đã ghi xong. Với index lưu
+        trên file, product_reviews.csv được nối thêm thay vì ghi lại từ đầu
+
+    Returns:
+    dict: Số products và reviews đã ghi
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    counts = {'products': 0, 'reviews': 0}
+    if review_index is None:
+        review_index = ReviewIndex(None)
+    
+    if fmt == 'parquet':
+        from parquet_sink import ParquetSink
+        sink = ParquetSink(output_dir, row_group_size=chunk_size)
         try:
-            print("🔄 Thử với pandas.read_json và lines=True...")
-            df = pd.read_json(file_path, lines=True)
-            print(f"✅ Đã đọc thành công {len(df)} sản phẩm")
-            return df, None
-        except Exception as e3:
-            print(f"❌ Pandas cũng không đọc được: {e3}")
-            return None, None
+            for product in _dedup_product_reviews(iter_products(file_path), review_index):
+                sink.write_product(product)
+        finally:
+            sink.close()
+        review_index.commit()
+        counts['products'] = sink.rows_written['products']
+        counts['reviews'] = sink.rows_written['reviews']
+        return counts
     
-if __name__ == "__main__":
-    # Example usage
-    file_path = "tiki_product.json"
-    products_df, reviews_df = extract_scraping_data(file_path)
+    if fmt == 'sqlite':
+        from sql_store import SQLStore
+        store = SQLStore(output_dir / 'tiki_data.db', batch_size=chunk_size)
+        try:
+            for product in _dedup_product_reviews(iter_products(file_path), review_index):
+                store.write_product(product)
+        finally:
+            store.close()
+        review_index.commit()
+        counts['products'] = store.products_written
+        counts['reviews'] = store.reviews_written
+        return counts
+    
+    products_csv = output_dir / 'extracted_products.csv'
+    reviews_csv = output_dir / 'product_reviews.csv'
+    # Index bền vững bỏ mọi review của các lần chạy trước nên phải nối thêm, không ghi đè
+    append_reviews = review_index.index_file is not None
+    for i, (products_df, reviews_df) in enumerate(iter_scraping_chunks(file_path, chunk_size)):
+        reviews_df = review_index.filter_frame(reviews_df, commit=False)
+        # Khối đầu tiên ghi header (kèm BOM), các khối sau ghi nối tiếp
+        mode, header, encoding = ('w', True, 'utf-8-sig') if i == 0 else ('a', False, 'utf-8')
+        products_df.reindex(columns=PRODUCT_EXPORT_COLUMNS).to_csv(
+            products_csv, mode=mode, header=header, index=False, encoding=encoding
+        )
+        if append_reviews:
+            _append_csv(reviews_df.reindex(columns=REVIEW_COLUMNS), reviews_csv)
+        else:
+            reviews_df.reindex(columns=REVIEW_COLUMNS).to_csv(
+                reviews_csv, mode=mode, header=header, index=False, encoding=encoding
+            )
+        review_index.commit()
+        counts['products'] += len(products_df)
+        counts['reviews'] += len(reviews_df)
+        print(f"💾 Đã ghi {counts['products']} sản phẩm, {counts['reviews']} reviews")
+    return counts
+
+
+EXPORT_KEYS = {'extracted_products.csv': 'id', 'product_reviews.csv': 'review_id'}
+
+
+def _load_export_state(state_file):
+    if state_file.exists():
+        with open(state_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return {'sources': {}, 'products': {}, 'reviews': {}}
+
+
+def _source_tail_hash(file_path, offset, size=4096):
+    """Hash của đoạn cuối trước offset, dùng để kiểm tra file chỉ được ghi nối thêm"""
+    with open(file_path, 'rb') as f:
+        f.seek(max(0, offset - size))
+        return hashlib.sha1(f.read(min(offset, size))).hexdigest()
+
+
+def _canonical(value):
+    """
+    Dạng chuẩn của một giá trị để hash, không phụ thuộc dtype của khối.
+
+    Một giá trị None trong cột số làm pandas đổi cả cột sang float (100 → 100.0),
+    nên NaN được đưa về None và float nguyên về int.
+    """
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    if hasattr(value, 'item') and not isinstance(value, str):  # numpy scalar
+        value = value.item()
+    if value is None or value is pd.NA or value is pd.NaT or (isinstance(value, float) and value != value):
+        return None
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def _changed_mask(records, key, seen):
+    """Đánh dấu các dòng (dict) có key mới hoặc nội dung thay đổi, đồng thời cập nhật seen"""
+    keep = []
+    for record in records:
+        record = {name: _canonical(value) for name, value in record.items()}
+        row_hash = hashlib.blake2b(
+            json.dumps(record, ensure_ascii=False, sort_keys=True, default=str).encode('utf-8'), digest_size=8
+        ).hexdigest()
+        key_value = record.get(key)
+        # Review không có id (scrape từ HTML) dùng chính hash làm key
+        state_key = str(key_value) if key_value is not None else f"h{row_hash}"
+        if seen.get(state_key) == row_hash:
+            keep.append(False)
+        else:
+            seen[state_key] = row_hash
+            keep.append(True)
+    return keep
+
+
+def _new_or_changed(df, key, seen):
+    """Giữ các dòng có key mới hoặc nội dung thay đổi, đồng thời cập nhật seen"""
+    if df.empty:
+        return df
+    return df[_changed_mask(df.to_dict('records'), key, seen)]
+
+
+def _new_or_changed_rows(rows, key, seen):
+    """Như _new_or_changed nhưng cho list các dòng dict"""
+    return [row for row, keep in zip(rows, _changed_mask(rows, key, seen)) if keep]
+
+
+def _append_csv(df, csv_path):
+    if df.empty:
+        return
+    if csv_path.exists():
+        df.to_csv(csv_path, mode='a', header=False, index=False, encoding='utf-8')
+    else:
+        df.to_csv(csv_path, index=False, encoding='utf-8-sig')
+
+
+def incremental_export(file_path, output_dir='.', chunk_size=5000, state_file=None, fmt='csv'):
+    """
+    Xuất CSV/Parquet tăng dần: chỉ nối thêm products/reviews mới hoặc đã thay đổi.
+
+    File state lưu high-water mark (vị trí byte đã đọc) của từng file nguồn và hash
+    của các dòng đã xuất. Lần chạy sau chỉ đọc phần được ghi thêm vào file nguồn;
+    nếu file nguồn bị ghi lại từ đầu thì đọc lại toàn bộ nhưng vẫn chỉ xuất dòng
+    mới/thay đổi. Dòng thay đổi được nối thêm (bản cũ vẫn còn cho tới khi compact_export
+    với CSV; với Parquet giữ bản cuối theo id khi đọc).
+
+    Parameters:
+    file_path (str): File JSON/JSONL nguồn
+    output_dir (str): Thư mục chứa extracted_products.csv và product_reviews.csv, hoặc
+        các bảng products/reviews/specifications của ParquetSink (mỗi lần chạy một file part mới)
+    chunk_size (int): Số sản phẩm mỗi khối
+    state_file (str): File state (mặc định: output_dir/export_state.json)
+    fmt (str): 'csv' hoặc 'parquet'
+
+    Returns:
+    dict: Số products và reviews đã nối thêm
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    state_file = Path(state_file) if state_file else output_dir / 'export_state.json'
+    state = _load_export_state(state_file)
     
+    source_key = str(Path(file_path).resolve())
+    source = state['sources'].get(source_key, {})
+    size = os.path.getsize(file_path)
+    start_offset = 0
+    if source and source['offset'] <= size and \
+            _source_tail_hash(file_path, source['offset']) == source['tail']:
+        start_offset = source['offset']
+    elif source:
+        print("⚠️  File nguồn đã bị ghi lại, đọc lại từ đầu")
+    print(f"📂 Đọc {file_path} từ byte {start_offset:,}/{size:,}")
+    
+    counts = {'products': 0, 'reviews': 0}
+    chunk = []
+    sink = None
+    if fmt == 'parquet':
+        from parquet_sink import ParquetSink
+        sink = ParquetSink(output_dir, row_group_size=chunk_size)
+    
+    def export_parquet_chunk(products):
+        # Dùng đúng các dòng mà ParquetSink ghi để hash khớp với dữ liệu trong file
+        product_rows = _new_or_changed_rows([product_row(p) for p in products], 'id', state['products'])
+        review_data = _new_or_changed_rows([r for p in products for r in review_rows(p)],
+                                           'review_id', state['reviews'])
+        exported = {row['id'] for row in product_rows}
+        sink.write_rows('products', product_rows)
+        sink.write_rows('reviews', review_data)
+        sink.write_rows('specifications', [row for p in products if to_int(p.get('id')) in exported
+                                           for row in specification_rows(p)])
+        counts['products'] += len(product_rows)
+        counts['reviews'] += len(review_data)
+    
+    def export_chunk(products):
+        if sink is not None:
+            export_parquet_chunk(products)
+            return
+        df = pd.DataFrame(products)
+        products_df = _select_product_columns(df).reindex(columns=PRODUCT_EXPORT_COLUMNS)
+        products_df = _new_or_changed(products_df, 'id', state['products'])
+        reviews_df = _new_or_changed(flatten_reviews(df), 'review_id', state['reviews'])
+        _append_csv(products_df, output_dir / 'extracted_products.csv')
+        _append_csv(reviews_df, output_dir / 'product_reviews.csv')
+        counts['products'] += len(products_df)
+        counts['reviews'] += len(reviews_df)
+    
+    try:
+        for product in iter_products(file_path, start_offset=start_offset):
+            chunk.append(product)
+            if len(chunk) >= chunk_size:
+                export_chunk(chunk)
+                chunk = []
+        if chunk:
+            export_chunk(chunk)
+    finally:
+        if sink is not None:
+            sink.close()
+    
+    state['sources'][source_key] = {'offset': size, 'tail': _source_tail_hash(file_path, size)}
+    with open(state_file, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+    print(f"✅ Đã nối thêm {counts['products']} sản phẩm, {counts['reviews']} reviews")
+    return counts
+
+
+def compact_export(output_dir='.'):
+    """
+    Gộp các bản ghi trùng trong CSV xuất tăng dần, giữ bản mới nhất theo id/review_id.
+
+    Returns:
+    dict: Số dòng còn lại của từng file
+    """
+    output_dir = Path(output_dir)
+    result = {}
+    for name, key in EXPORT_KEYS.items():
+        csv_path = output_dir / name
+        if not csv_path.exists():
+            continue
+        df = pd.read_csv(csv_path, encoding='utf-8-sig')
+        before = len(df)
+        with_key = df[df[key].notna()].drop_duplicates(subset=[key], keep='last')
+        df = pd.concat([with_key, df[df[key].isna()]]).sort_index()
+        tmp_path = csv_path.with_name(csv_path.name + '.tmp')
+        df.to_csv(tmp_path, index=False, encoding='utf-8-sig')
+        os.replace(tmp_path, csv_path)
+        print(f"🧹 {name}: {before:,} → {len(df):,} dòng")
+        result[name] = len(df)
+    return result
+
+
+FACT_PRODUCT_COLUMNS = ['id', 'name', 'price', 'original_price', 'discount', 'rating', 'review_count',
+                        'quantity_sold', 'brand_key', 'current_seller_key', 'seller_key', 'category_key']
+
+
+def export_dimensions(file_path, output_dir='.', chunk_size=5000):
+    """
+    Tách brand/seller/categories thành bảng dimension với khóa int, streaming theo khối.
+
+    Output: fact_products.csv (chỉ giữ *_key) và dim_brands.csv, dim_sellers.csv,
+    dim_categories.csv. Dimension đã có trong output_dir được đọc lại nên khóa
+    ổn định giữa các lần chạy.
+
+    Returns:
+    Dimensions: Các bảng dimension (dùng Dimensions.decode để dựng lại sản phẩm)
+    """
+    from dimensions import Dimensions
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    dims = Dimensions.load(output_dir)
+    fact_csv = output_dir / 'fact_products.csv'
+    chunk = []
+    written = 0
+
+    def write_chunk(products, first):
+        mode, header, encoding = ('w', True, 'utf-8-sig') if first else ('a', False, 'utf-8')
+        dims.encode(pd.DataFrame(products)).reindex(columns=FACT_PRODUCT_COLUMNS).to_csv(
+            fact_csv, mode=mode, header=header, index=False, encoding=encoding
+        )
+
+    for product in iter_products(file_path):
+        chunk.append(product)
+        if len(chunk) >= chunk_size:
+            write_chunk(chunk, written == 0)
+            written += len(chunk)
+            chunk = []
+    if chunk or written == 0:
+        write_chunk(chunk, written == 0)
+        written += len(chunk)
+    dims.save(output_dir)
+    sizes = ', '.join(f"{len(rows)} {table}" for table, rows in dims.rows.items())
+    print(f"✅ Dimensions: {written} sản phẩm, {sizes} → {output_dir}")
+    return dims
+
+
+def export_specifications(products_df, output_dir='.'):
+    """
+    Ghi specifications dạng bảng thuộc tính (EAV) và bảng pivot các thuộc tính chính.
+
+    Output: spec_keys.csv (attr_key_id, name), spec_attributes.csv
+    (product_id, attr_key_id, value), spec_pivot.csv (product_id, ram_gb, storage_gb, screen_inch)
+
+    Returns:
+    tuple: (attributes_df, keys, pivot_df)
+    """
+    from specifications import normalize_specifications, pivot_specifications
+    output_dir = Path(output_dir)
+    attributes, keys = normalize_specifications(products_df)
+    pivot = pivot_specifications(attributes, keys)
+    keys.to_frame().to_csv(output_dir / 'spec_keys.csv', index=False, encoding='utf-8-sig')
+    attributes.to_csv(output_dir / 'spec_attributes.csv', index=False, encoding='utf-8-sig')
+    pivot.to_csv(output_dir / 'spec_pivot.csv', index=False, encoding='utf-8-sig')
+    print(f"✅ Specifications: {len(attributes)} thuộc tính, {len(keys.names)} tên thuộc tính → {output_dir}")
+    return attributes, keys, pivot
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Extract products và reviews từ file scrape')
+    parser.add_argument('-f', '--file', default='tiki_product.json', help='File JSON/JSONL cần extract')
+    parser.add_argument('-o', '--output-dir', default='.', help='Thư mục output')
+    parser.add_argument('--stream', action='store_true', help='Đọc streaming theo khối, bộ nhớ giới hạn')
+    parser.add_argument('--format', choices=['csv', 'parquet', 'sqlite'], default='csv', help='Định dạng output khi --stream/--incremental')
+    parser.add_argument('--chunk-size', type=int, default=5000, help='Số sản phẩm mỗi khối khi --stream')
+    parser.add_argument('--side-tables', action='store_true', help='Ghi thêm review_images.csv và review_timeline.csv')
+    parser.add_argument('--incremental', action='store_true', help='Chỉ nối thêm products/reviews mới hoặc thay đổi vào CSV/Parquet')
+    parser.add_argument('--compact', action='store_true', help='Gộp bản ghi trùng trong CSV xuất tăng dần rồi thoát')
+    parser.add_argument('--specs', action='store_true', help='Ghi thêm specifications dạng bảng thuộc tính và pivot')
+    parser.add_argument('--review-index', default=None, help='File index review đã lưu, review trùng qua các lần chạy bị bỏ')
+    parser.add_argument('--dimensions', action='store_true', help='Ghi fact_products.csv và bảng dimension brands/sellers/categories rồi thoát')
+    args = parser.parse_args()
+
+    if args.compact:
+        compact_export(args.output_dir)
+        return
+
+    if args.dimensions:
+        export_dimensions(args.file, args.output_dir, chunk_size=args.chunk_size)
+        return
+
+    if args.incremental:
+        if args.format == 'sqlite':
+            parser.error('--format sqlite đã upsert theo id, không cần --incremental')
+        incremental_export(args.file, args.output_dir, chunk_size=args.chunk_size, fmt=args.format)
+        return
+
+    review_index = ReviewIndex(args.review_index) if args.review_index else None
+
+    if args.stream:
+        counts = export_scraping_data(args.file, args.output_dir, fmt=args.format, chunk_size=args.chunk_size,
+                                      review_index=review_index)
+        print(f"\n✅ Đã ghi {counts['products']} sản phẩm và {counts['reviews']} reviews vào {args.output_dir}")
+        return
+
+    file_path = args.file
+    tables = {}
+    if args.side_tables:
+        products_df, reviews_df, tables = extract_scraping_data(file_path, side_tables=True, review_index=review_index)
+    else:
+        products_df, reviews_df = extract_scraping_data(file_path, review_index=review_index)
+
     if products_df is not None:
         print("\n" + "="*80)
         print(f"📊 THỐNG KÊ DỮ LIỆU PRODUCTS")
@@ -136,7 +628,7 @@ if __name__ == "__main__":
         print("🔍 XEM MỘT VÀI SẢN PHẨM ĐẦU TIÊN:")
         print("="*80)
         print(products_df.head())
-        
+    
         # Show info about data types
         print("\n" + "="*80)
         print("📈 THÔNG TIN CHI TIẾT PRODUCTS:")
@@ -144,10 +636,13 @@ if __name__ == "__main__":
         print(products_df.info())
 
         # Write products to csv
-        output_csv = "extracted_products.csv"
+        output_csv = Path(args.output_dir) / "extracted_products.csv"
         products_df.to_csv(output_csv, index=False, encoding='utf-8-sig')
         print(f"\n✅ Products đã được lưu vào file: {output_csv}")
-    
+
+        if args.specs:
+            export_specifications(products_df, args.output_dir)
+
     if reviews_df is not None and len(reviews_df) > 0:
         print("\n" + "="*80)
         print(f"📊 THỐNG KÊ DỮ LIỆU REVIEWS")
@@ -161,16 +656,31 @@ if __name__ == "__main__":
         print("🔍 XEM MỘT VÀI REVIEWS ĐẦU TIÊN:")
         print("="*80)
         print(reviews_df.head())
-        
+    
         # Show info about data types
         print("\n" + "="*80)
         print("📈 THÔNG TIN CHI TIẾT REVIEWS:")
         print("="*80)
         print(reviews_df.info())
-        
-        # Write reviews to csv
-        reviews_csv = "product_reviews.csv"
-        reviews_df.to_csv(reviews_csv, index=False, encoding='utf-8-sig')
+    
+        # Write reviews to csv; với --review-index chỉ có review mới nên nối thêm vào file cũ
+        reviews_csv = Path(args.output_dir) / "product_reviews.csv"
+        if review_index is not None:
+            _append_csv(reviews_df, reviews_csv)
+        else:
+            reviews_df.to_csv(reviews_csv, index=False, encoding='utf-8-sig')
         print(f"\n✅ Reviews đã được lưu vào file: {reviews_csv}")
     else:
-        print("\n⚠️  Không có reviews để lưu")
\ No newline at end of file
+        print("\n⚠️  Không có reviews để lưu")
+    if review_index is not None:
+        review_index.commit()
+
+    # Write side tables (review images, timeline) to csv
+    for name, table in tables.items():
+        table_csv = Path(args.output_dir) / f"{name}.csv"
+        table.to_csv(table_csv, index=False, encoding='utf-8-sig')
+        print(f"✅ {name}: {len(table)} dòng → {table_csv}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+import json
+import logging
+import time
+from pathlib import Path
+
+
+class KeywordStats:
+    def __init__(self, stats_file="keyword_stats.json", smoothing=0.5, min_products=5):
+        """
+        Lưu thống kê hiệu quả (yield) của từng keyword qua các lần chạy batch.
+
+        Args:
+            stats_file: File JSON lưu thống kê
+            smoothing: Hệ số EMA cho lần chạy mới nhất (0-1)
+            min_products: Số sản phẩm tối thiểu khi giảm max_products
+        """
+        self.stats_file = Path(stats_file)
+        self.smoothing = smoothing
+        self.min_products = min_products
+        self.keywords = {}
+        self._load()
+
+    def _load(self):
+        """Đọc thống kê cũ nếu có"""
+        if not self.stats_file.exists():
+            return
+        try:
+            with open(self.stats_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.keywords = data.get('keywords', {})
+        except Exception as e:
+            logging.warning(f"Không đọc được {self.stats_file}: {e}")
+
+    def save(self):
+        """Ghi thống kê ra file"""
+        try:
+            with open(self.stats_file, 'w', encoding='utf-8') as f:
+                json.dump({'keywords': self.keywords}, f, ensure_ascii=False, indent=2)
+        except Exception as e:
+            logging.error(f"Lỗi khi lưu {self.stats_file}: {e}")
+
+    def _ema(self, old, new):
+        if old is None:
+            return new
+        return self.smoothing * new + (1 - self.smoothing) * old
+
+    def record(self, keyword, products, requests, known_products=0):
+        """
+        Ghi nhận kết quả một lần chạy keyword.
+
+        Sản phẩm mới đã được ProductIndex lọc trong scraper, nên mọi sản phẩm
+        trong products đều là mới; new_ratio tính trên toàn bộ kết quả tìm kiếm
+        (mới + đã có trong index).
+
+        Args:
+            keyword: Từ khóa đã chạy
+            products: Danh sách sản phẩm mới thu được
+            requests: Số request đã tiêu tốn
+            known_products: Số kết quả tìm kiếm đã có trong index (bị bỏ qua)
+
+        Returns:
+            dict: {'new_products', 'new_reviews', 'requests'} của lần chạy này
+        """
+        products = products or []
+        new_products = len(products)
+        new_reviews = sum(len(product.get('reviews') or []) for product in products)
+        search_hits = new_products + known_products
+
+        stats = self.keywords.setdefault(keyword, {
+            'runs': 0,
+            'requests': 0,
+            'new_products': 0,
+            'new_reviews': 0,
+            'yield_per_request': None,
+            'new_ratio': None,
+            'requests_per_product': None
+        })
+        # 'products' của file cũ luôn bằng new_products
+        stats.pop('products', None)
+        stats['runs'] += 1
+        stats['requests'] += requests
+        stats['new_products'] += new_products
+        stats['new_reviews'] += new_reviews
+        stats['last_run'] = int(time.time())
+        stats['yield_per_request'] = self._ema(
+            stats['yield_per_request'], (new_products + new_reviews) / max(requests, 1)
+        )
+        stats['new_ratio'] = self._ema(stats['new_ratio'], new_products / search_hits if search_hits else 0.0)
+        if new_products:
+            stats['requests_per_product'] = self._ema(
+                stats['requests_per_product'], requests / new_products
+            )
+
+        return {'new_products': new_products, 'new_reviews': new_reviews, 'requests': requests}
+
+    def _estimate_requests(self, kw_info, default_per_product):
+        stats = self.keywords.get(kw_info['keyword'], {})
+        per_product = stats.get('requests_per_product') or default_per_product
+        # 1 request tìm kiếm + chi tiết/reviews cho từng sản phẩm
+        return 1 + int(round(per_product * kw_info['max_products']))
+
+    def prioritize(self, all_keywords, request_budget=None, default_requests_per_product=2):
+        """
+        Sắp xếp keywords theo yield lịch sử và gán lại max_products.
+
+        Keyword chưa từng chạy được ưu tiên trước (cần thăm dò). Keyword có tỉ lệ
+        sản phẩm mới thấp bị giảm max_products. Nếu có request_budget, các keyword
+        yield thấp không vừa ngân sách sẽ bị bỏ qua.
+
+        Returns:
+            list: Danh sách keywords đã sắp xếp (các dict mới, không sửa input)
+        """
+        planned = []
+        for kw_info in all_keywords:
+            kw_info = dict(kw_info)
+            stats = self.keywords.get(kw_info['keyword'])
+            if stats and stats.get('new_ratio') is not None:
+                base = kw_info['max_products']
+                # Giữ nguyên max_products nếu >= 50% sản phẩm là mới
+                scaled = int(round(base * min(stats['new_ratio'] / 0.5, 1.0)))
+                kw_info['max_products'] = max(min(self.min_products, base), scaled)
+                score = stats.get('yield_per_request') or 0.0
+            else:
+                score = float('inf')
+            planned.append((score, kw_info))
+
+        # sorted() ổn định nên keyword cùng điểm giữ thứ tự gốc
+        planned.sort(key=lambda item: -item[0])
+
+        result = []
+        spent = 0
+        skipped = []
+        for score, kw_info in planned:
+            if request_budget is not None:
+                cost = self._estimate_requests(kw_info, default_requests_per_product)
+                if spent + cost > request_budget:
+                    skipped.append(kw_info['keyword'])
+                    continue
+                spent += cost
+            result.append(kw_info)
+
+        if skipped:
+            logging.info(f"⏭️  Bỏ qua {len(skipped)} keywords yield thấp do vượt ngân sách {request_budget} requests")
+        return result
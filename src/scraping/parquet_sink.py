@@ -0,0 +1,136 @@
+import logging
+import os
+import time
+from pathlib import Path
+
+from records import product_row, review_rows, specification_rows
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow là tùy chọn, chỉ cần khi dùng ParquetSink
+    pa = None
+    pq = None
+
+
+def _input_schema(schema):
+    """Schema của dòng trước khi ghi: cột thời gian nhận epoch giây như records.review_rows trả về"""
+    return pa.schema([
+        pa.field(field.name, pa.timestamp('s')) if pa.types.is_timestamp(field.type) else field
+        for field in schema
+    ])
+
+
+def _build_schemas():
+    """Schema tường minh cho 3 bảng products, reviews, specifications"""
+    dict_string = pa.dictionary(pa.int32(), pa.string())
+    return {
+        'products': pa.schema([
+            ('id', pa.int64()),
+            ('name', pa.string()),
+            ('link', pa.string()),
+            ('price', pa.float64()),
+            ('original_price', pa.float64()),
+            ('discount', pa.float64()),
+            ('rating', pa.float64()),
+            ('review_count', pa.int64()),
+            ('quantity_sold', pa.int64()),
+            ('stock_qty', pa.int64()),
+            ('brand_id', pa.int64()),
+            ('brand', dict_string),
+            ('seller_id', pa.int64()),
+            ('seller', dict_string),
+            ('category_id', pa.int64()),
+            ('category', dict_string),
+            ('search_keyword', dict_string),
+            ('search_category', dict_string),
+            ('image', pa.string()),
+        ]),
+        'reviews': pa.schema([
+            ('review_id', pa.int64()),
+            ('product_id', pa.int64()),
+            ('title', dict_string),
+            ('content', pa.string()),
+            ('rating', pa.int8()),
+            ('author', pa.string()),
+            ('time', pa.timestamp('ms')),  # Parquet không lưu được đơn vị giây
+            ('helpful_count', pa.int32()),
+        ]),
+        'specifications': pa.schema([
+            ('product_id', pa.int64()),
+            ('name', dict_string),
+            ('value', pa.string()),
+        ]),
+    }
+
+
+class ParquetSink:
+    def __init__(self, output_dir, row_group_size=10000, compression='zstd'):
+        """
+        Ghi trực tiếp products/reviews/specifications ra Parquet theo từng row group.
+
+        Mỗi bảng là một thư mục dataset (output_dir/products, output_dir/reviews, ...),
+        mỗi lần chạy ghi thêm một file part mới nên có thể đọc bằng
+        pd.read_parquet(thư_mục, columns=[...]).
+
+        Args:
+            output_dir: Thư mục gốc chứa các bảng
+            row_group_size: Số dòng buffer trước khi ghi một row group
+            compression: Codec nén của Parquet
+        """
+        if pa is None:
+            raise ImportError("ParquetSink cần pyarrow: pip install pyarrow")
+        self.output_dir = Path(output_dir)
+        self.row_group_size = row_group_size
+        self.compression = compression
+        self.schemas = _build_schemas()
+        self.buffers = {table: [] for table in self.schemas}
+        self.writers = {}
+        self.rows_written = {table: 0 for table in self.schemas}
+        # Có phần nano giây: hai lần chạy trong cùng một giây không ghi đè nhau và tên part vẫn theo thứ tự thời gian
+        now = time.time_ns()
+        self.part_name = (f"part-{time.strftime('%Y%m%d-%H%M%S', time.localtime(now // 10**9))}"
+                          f"-{now % 10**9:09d}-{os.getpid()}.parquet")
+
+    def write_product(self, product):
+        """Thêm một sản phẩm (kèm reviews và specifications) vào buffer"""
+        self.write_rows('products', [product_row(product)])
+        self.write_rows('reviews', review_rows(product))
+        self.write_rows('specifications', specification_rows(product))
+
+    def write_rows(self, table, rows):
+        """Thêm các dòng đã dựng sẵn (như records.product_row) vào buffer của một bảng"""
+        self.buffers[table].extend(rows)
+        if len(self.buffers[table]) >= self.row_group_size:
+            self._write_row_group(table)
+
+    def _write_row_group(self, table):
+        rows = self.buffers[table]
+        if not rows:
+            return
+        schema = self.schemas[table]
+        if table not in self.writers:
+            table_dir = self.output_dir / table
+            table_dir.mkdir(parents=True, exist_ok=True)
+            self.writers[table] = pq.ParquetWriter(
+                table_dir / self.part_name, schema, compression=self.compression
+            )
+        arrow_table = pa.Table.from_pylist(rows, schema=_input_schema(schema)).cast(schema)
+        self.writers[table].write_table(arrow_table)
+        self.rows_written[table] += len(rows)
+        self.buffers[table] = []
+
+    def flush(self):
+        """Ghi mọi dòng đang buffer thành row group"""
+        for table in self.buffers:
+            self._write_row_group(table)
+
+    def close(self):
+        """Flush và đóng các file Parquet"""
+        self.flush()
+        for writer in self.writers.values():
+            writer.close()
+        self.writers = {}
+        logging.info(f"💾 Parquet: {self.rows_written['products']} products, "
+                     f"{self.rows_written['reviews']} reviews, "
+                     f"{self.rows_written['specifications']} specifications → {self.output_dir}")
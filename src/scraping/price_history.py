@@ -0,0 +1,155 @@
+import logging
+import sqlite3
+import time
+from pathlib import Path
+
+from records import product_row
+
+TRACKED_FIELDS = ['price', 'original_price', 'discount', 'quantity_sold', 'stock_qty']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS product_latest (
+    product_id INTEGER NOT NULL,
+    field TEXT NOT NULL,
+    value REAL,
+    run_ts INTEGER,
+    PRIMARY KEY (product_id, field)
+);
+CREATE TABLE IF NOT EXISTS product_history (
+    product_id INTEGER NOT NULL,
+    field TEXT NOT NULL,
+    run_ts INTEGER NOT NULL,
+    delta REAL NOT NULL,
+    PRIMARY KEY (product_id, field, run_ts)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_history_field_run ON product_history(field, run_ts);
+"""
+
+# Giá trị tại mỗi lần thay đổi = tổng dồn các delta
+SERIES_SQL = """
+SELECT product_id, field, run_ts, delta,
+       SUM(delta) OVER (PARTITION BY product_id, field ORDER BY run_ts) AS value,
+       ROW_NUMBER() OVER (PARTITION BY product_id, field ORDER BY run_ts) AS seq
+FROM product_history
+"""
+
+
+class PriceHistory:
+    def __init__(self, db_path="tiki_data.db", fields=None, run_ts=None, batch_size=500):
+        """
+        Lịch sử giá/tồn kho theo từng sản phẩm, chỉ ghi khi giá trị thay đổi.
+
+        Mỗi lần thay đổi được lưu dưới dạng delta so với giá trị trước đó (lần đầu
+        delta = giá trị), nên dung lượng tăng theo số thay đổi chứ không theo
+        số lần chạy × số sản phẩm. Có thể dùng chung file với SQLStore.
+
+        Args:
+            db_path: File SQLite
+            fields: Các trường cần theo dõi (mặc định: TRACKED_FIELDS)
+            run_ts: Mốc thời gian của lần chạy (mặc định: thời điểm khởi tạo)
+            batch_size: Số sản phẩm buffer trước khi ghi một transaction
+        """
+        self.db_path = Path(db_path)
+        self.fields = fields or TRACKED_FIELDS
+        self.run_ts = int(run_ts if run_ts is not None else time.time())
+        self.batch_size = batch_size
+        self.conn = sqlite3.connect(self.db_path)
+        self.conn.executescript(SCHEMA)
+        self.pending = []
+        self.changes_written = 0
+
+    def record(self, products):
+        """
+        Ghi các giá trị đã thay đổi của danh sách sản phẩm.
+
+        Returns:
+            int: Số (sản phẩm, trường) có thay đổi
+        """
+        changes = 0
+        with self.conn:
+            for product in products:
+                row = product_row(product)
+                product_id = row['id']
+                if product_id is None:
+                    continue
+                for field in self.fields:
+                    value = row.get(field)
+                    if value is None:
+                        continue
+                    latest = self.conn.execute(
+                        "SELECT value FROM product_latest WHERE product_id = ? AND field = ?",
+                        (product_id, field)
+                    ).fetchone()
+                    previous = latest[0] if latest else None
+                    if previous is not None and previous == value:
+                        continue
+                    delta = value - (previous or 0)
+                    self.conn.execute(
+                        "INSERT INTO product_history (product_id, field, run_ts, delta) VALUES (?, ?, ?, ?) "
+                        "ON CONFLICT(product_id, field, run_ts) DO UPDATE SET delta = delta + excluded.delta",
+                        (product_id, field, self.run_ts, delta)
+                    )
+                    self.conn.execute(
+                        "INSERT OR REPLACE INTO product_latest (product_id, field, value, run_ts) VALUES (?, ?, ?, ?)",
+                        (product_id, field, value, self.run_ts)
+                    )
+                    changes += 1
+        self.changes_written += changes
+        return changes
+
+    def write_product(self, product):
+        """Interface sink: buffer sản phẩm, ghi khi đủ batch_size"""
+        self.pending.append(product)
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def write_observation(self, product):
+        """
+        Ghi nhận giá/số lượng đã bán của sản phẩm đã biết, lấy từ kết quả tìm kiếm.
+
+        Scraper bỏ qua chi tiết của sản phẩm đã có trong ProductIndex, nhưng kết quả
+        tìm kiếm vẫn có price/original_price/discount/quantity_sold nên lịch sử giá
+        không bị ngắt. Trường không có trong kết quả tìm kiếm (stock_qty) giữ nguyên.
+        """
+        self.write_product(product)
+
+    def flush(self):
+        if self.pending:
+            self.record(self.pending)
+            self.pending = []
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+        logging.info(f"📈 Lịch sử giá: ghi {self.changes_written} thay đổi → {self.db_path}")
+
+    def series(self, product_id, field='price'):
+        """Chuỗi giá trị của một trường theo thời gian (chỉ các mốc có thay đổi)"""
+        import pandas as pd
+        df = pd.read_sql_query(
+            f"SELECT run_ts, value FROM ({SERIES_SQL}) WHERE product_id = ? AND field = ? ORDER BY run_ts",
+            self.conn, params=(product_id, field)
+        )
+        df['run_ts'] = pd.to_datetime(df['run_ts'], unit='s')
+        return df
+
+    def price_series(self, product_id):
+        return self.series(product_id, 'price')
+
+    def changed_products(self, field='discount', days=7, now=None):
+        """
+        Các sản phẩm có `field` thay đổi trong `days` ngày gần nhất.
+
+        Returns:
+            DataFrame: product_id, run_ts, old_value, new_value
+        """
+        import pandas as pd
+        since = int(now if now is not None else time.time()) - days * 86400
+        df = pd.read_sql_query(
+            f"SELECT product_id, run_ts, value - delta AS old_value, value AS new_value "
+            f"FROM ({SERIES_SQL}) WHERE field = ? AND run_ts >= ? AND seq > 1 "
+            f"ORDER BY run_ts, product_id",
+            self.conn, params=(field, since)
+        )
+        df['run_ts'] = pd.to_datetime(df['run_ts'], unit='s')
+        return df
@@ -0,0 +1,90 @@
+import json
+import logging
+from pathlib import Path
+
+
+class ProductIndex:
+    def __init__(self, index_file="product_index.jsonl"):
+        """
+        Index product_id dùng chung giữa các scraper để tránh lấy lại chi tiết/reviews.
+
+        File index là JSONL append-only, mỗi dòng là một membership
+        {"id", "keyword", "category"}. Membership thêm với commit=False chỉ nằm
+        trong bộ nhớ cho tới khi gọi commit().
+
+        Args:
+            index_file: File JSONL lưu index
+        """
+        self.index_file = Path(index_file)
+        self.memberships = {}
+        self.pending = []
+        self._load()
+
+    def _load(self):
+        """Đọc index cũ nếu có"""
+        if not self.index_file.exists():
+            return
+        with open(self.index_file, 'r', encoding='utf-8') as f:
+            for line_num, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    logging.warning(f"⚠️  Skip dòng {line_num} trong {self.index_file}: không parse được")
+                    continue
+                self._apply(entry['id'], entry.get('keyword'), entry.get('category'))
+        logging.info(f"📚 Đã load {len(self.memberships)} sản phẩm từ {self.index_file}")
+
+    def _apply(self, product_id, keyword, category):
+        """Cập nhật index trong bộ nhớ, trả về True nếu có thông tin mới"""
+        if product_id not in self:
+            self.memberships[product_id] = {'keywords': [], 'categories': []}
+        entry = self.memberships[product_id]
+        changed = False
+        if keyword and keyword not in entry['keywords']:
+            entry['keywords'].append(keyword)
+            changed = True
+        if category and category not in entry['categories']:
+            entry['categories'].append(category)
+            changed = True
+        return changed
+
+    def __contains__(self, product_id):
+        return product_id in self.memberships
+
+    def __len__(self):
+        return len(self.memberships)
+
+    def add(self, product_id, keyword=None, category=None, commit=True):
+        """
+        Thêm sản phẩm (hoặc membership keyword/category mới) vào index.
+
+        Args:
+            commit: False để chỉ cập nhật bộ nhớ, ghi ra file ở lần commit() sau
+
+        Returns:
+            bool: True nếu sản phẩm chưa có trong index trước đó
+        """
+        is_new = product_id not in self
+        changed = self._apply(product_id, keyword, category)
+        if is_new or changed:
+            self.pending.append({'id': product_id, 'keyword': keyword, 'category': category})
+            if commit:
+                self.commit()
+        return is_new
+
+    def commit(self):
+        """Ghi các membership đang chờ ra file index"""
+        if not self.pending:
+            return
+        with open(self.index_file, 'a', encoding='utf-8') as f:
+            f.writelines(json.dumps(entry, ensure_ascii=False) + '\n' for entry in self.pending)
+        self.pending = []
+
+    def get(self, product_id):
+        """Trả về {'keywords': [...], 'categories': [...]} hoặc None"""
+        if product_id not in self:
+            return None
+        return self.memberships[product_id]
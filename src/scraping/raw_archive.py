@@ -0,0 +1,148 @@
+import gzip
+import json
+import logging
+import os
+import time
+from pathlib import Path
+
+try:
+    import zstandard
+except ImportError:  # không có zstandard thì nén gzip
+    zstandard = None
+
+
+class RawArchive:
+    def __init__(self, archive_dir="raw_archive", segment_bytes=64 << 20, level=3):
+        """
+        Lưu response thô (JSON API, HTML) vào các segment nén, append-only.
+
+        Mỗi bản ghi là một zstd frame (hoặc gzip member) độc lập nên có thể đọc
+        ngẫu nhiên theo offset, hoặc đọc liền cả segment bằng streams.open_stream.
+        index.jsonl ghi {segment, offset, length, kind, url, product_id, ts} cho từng bản ghi.
+
+        Args:
+            archive_dir: Thư mục chứa segment và index
+            segment_bytes: Kích thước tối đa của một segment trước khi mở segment mới
+            level: Mức nén
+        """
+        self.archive_dir = Path(archive_dir)
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        self.index_file = self.archive_dir / 'index.jsonl'
+        self.segment_bytes = segment_bytes
+        self.level = level
+        self.suffix = '.jsonl.zst' if zstandard is not None else '.jsonl.gz'
+        self.segment_prefix = f"segment-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+        self.segment_num = 0
+        self.segment = None
+        self.index = None
+        self.records_written = 0
+        self.raw_bytes = 0
+        self.stored_bytes = 0
+
+    def _compress(self, data):
+        if zstandard is not None:
+            return zstandard.ZstdCompressor(level=self.level).compress(data)
+        return gzip.compress(data, compresslevel=min(self.level * 2, 9))
+
+    def _open_segment(self):
+        if self.segment is not None:
+            self.segment.close()
+        self.segment_num += 1
+        self.segment_name = f"{self.segment_prefix}-{self.segment_num:04d}{self.suffix}"
+        self.segment = open(self.archive_dir / self.segment_name, 'ab')
+
+    def write(self, kind, url, body, product_id=None, status=None):
+        """
+        Ghi một response thô.
+
+        Args:
+            kind: Loại response: 'search_api', 'product_api', 'reviews_api', 'search_html', 'product_html'...
+            url: URL đầy đủ (kèm query)
+            body: JSON đã parse (dict/list) hoặc text HTML
+            product_id: Id sản phẩm nếu có
+            status: HTTP status
+        """
+        ts = int(time.time())
+        record = {'kind': kind, 'url': url, 'product_id': product_id, 'ts': ts, 'status': status, 'body': body}
+        raw = (json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8')
+        data = self._compress(raw)
+
+        if self.segment is None or self.segment.tell() + len(data) > self.segment_bytes:
+            self._open_segment()
+        offset = self.segment.tell()
+        self.segment.write(data)
+
+        if self.index is None:
+            self.index = open(self.index_file, 'a', encoding='utf-8')
+        self.index.write(json.dumps({
+            'segment': self.segment_name, 'offset': offset, 'length': len(data),
+            'kind': kind, 'url': url, 'product_id': product_id, 'ts': ts
+        }, ensure_ascii=False) + '\n')
+
+        self.records_written += 1
+        self.raw_bytes += len(raw)
+        self.stored_bytes += len(data)
+
+    def flush(self):
+        for f in (self.segment, self.index):
+            if f is not None:
+                f.flush()
+
+    def close(self):
+        for f in (self.segment, self.index):
+            if f is not None:
+                f.close()
+        self.segment = None
+        self.index = None
+        if self.records_written:
+            logging.info(f"🗄️  Raw archive: {self.records_written} responses, "
+                         f"{self.raw_bytes:,} → {self.stored_bytes:,} bytes → {self.archive_dir}")
+
+
+def iter_index(archive_dir, kind=None, product_id=None):
+    """Đọc index.jsonl của archive, lọc theo kind/product_id"""
+    index_file = Path(archive_dir) / 'index.jsonl'
+    if not index_file.exists():
+        return
+    with open(index_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # Dòng cuối có thể bị cắt nếu tiến trình bị dừng giữa chừng
+                continue
+            if kind is not None and entry['kind'] != kind:
+                continue
+            if product_id is not None and entry['product_id'] != product_id:
+                continue
+            yield entry
+
+
+def _decompress(segment_name, data):
+    if segment_name.endswith('.zst'):
+        if zstandard is None:
+            raise ImportError("Đọc segment .zst cần zstandard: pip install zstandard")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+def read_record(archive_dir, entry):
+    """Đọc một bản ghi theo entry của index (segment, offset, length)"""
+    with open(Path(archive_dir) / entry['segment'], 'rb') as f:
+        f.seek(entry['offset'])
+        data = f.read(entry['length'])
+    return json.loads(_decompress(entry['segment'], data))
+
+
+def iter_segment(archive_dir, entries):
+    """Đọc tuần tự các bản ghi của cùng một segment theo thứ tự offset"""
+    entries = sorted(entries, key=lambda e: e['offset'])
+    if not entries:
+        return
+    with open(Path(archive_dir) / entries[0]['segment'], 'rb') as f:
+        for entry in entries:
+            f.seek(entry['offset'])
+            yield json.loads(_decompress(entry['segment'], f.read(entry['length'])))
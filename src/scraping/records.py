@@ -0,0 +1,112 @@
+import re
+
+_NUMBER_RE = re.compile(r'[-+]?\d[\d.,]*')
+# Nhóm 3 chữ số sau cùng một dấu phân cách: '1.299.000', '1,299,000', '15.000'
+_THOUSANDS_RE = re.compile(r'^[-+]?\d{1,3}([.,])\d{3}(?:\1\d{3})*$')
+
+
+def to_int(value):
+    """Chuyển về int, chấp nhận chuỗi kiểu '1.290.000 ₫'; trả về None nếu không được"""
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    digits = re.sub(r'[^\d]', '', str(value))
+    return int(digits) if digits else None
+
+
+def to_float(value):
+    """
+    Chuyển về float, trả về None nếu không được.
+
+    '4.5' và '4,5' là số thập phân; '1.299.000 ₫' (dấu chấm phân cách hàng nghìn
+    kiểu Việt Nam) hay '1,299,000' là số nguyên. Nếu có cả hai dấu thì dấu đứng
+    sau cùng là dấu thập phân ('1.299,5', '1,299.5').
+    """
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = _NUMBER_RE.search(str(value))
+    if not match:
+        return None
+    number = match.group().rstrip('.,')
+    if '.' in number and ',' in number:
+        decimal = '.' if number.rfind('.') > number.rfind(',') else ','
+        number = number.replace(',' if decimal == '.' else '.', '').replace(decimal, '.')
+    elif _THOUSANDS_RE.match(number):
+        number = re.sub(r'[.,]', '', number)
+    else:
+        number = number.replace(',', '.')
+    try:
+        return float(number)
+    except ValueError:  # vd: '1.2.3'
+        return None
+
+
+def _name_and_id(value):
+    """brand/seller có thể là dict {'id', 'name'} (API chi tiết) hoặc chuỗi (API tìm kiếm)"""
+    if isinstance(value, dict):
+        return value.get('name') or None, to_int(value.get('id'))
+    return (str(value) if value else None), None
+
+
+def product_row(product):
+    """Một dòng của bảng products"""
+    brand, brand_id = _name_and_id(product.get('brand'))
+    seller, seller_id = _name_and_id(product.get('current_seller') or product.get('seller'))
+    category, category_id = _name_and_id(product.get('categories'))
+    stock_item = product.get('stock_item')
+    return {
+        'id': to_int(product.get('id')),
+        'name': product.get('name'),
+        'link': product.get('link'),
+        'price': to_float(product.get('price')),
+        'original_price': to_float(product.get('original_price')),
+        'discount': to_float(product.get('discount')),
+        'rating': to_float(product.get('rating')),
+        'review_count': to_int(product.get('review_count')),
+        'quantity_sold': to_int(product.get('quantity_sold')),
+        'stock_qty': to_int(stock_item.get('qty')) if isinstance(stock_item, dict) else None,
+        'brand_id': brand_id,
+        'brand': brand,
+        'seller_id': seller_id,
+        'seller': seller,
+        'category_id': category_id,
+        'category': category,
+        'search_keyword': product.get('search_keyword'),
+        'search_category': product.get('search_category'),
+        'image': product.get('image'),
+    }
+
+
+def review_rows(product):
+    """Các dòng của bảng reviews cho một sản phẩm"""
+    product_id = to_int(product.get('id'))
+    rows = []
+    for review in product.get('reviews') or []:
+        if not isinstance(review, dict):
+            continue
+        created_at = review.get('time')
+        rows.append({
+            'review_id': to_int(review.get('id')),
+            'product_id': product_id,
+            'title': review.get('title') or None,
+            'content': review.get('content', ''),
+            'rating': to_int(review.get('rating')),
+            'author': review.get('author', 'Anonymous'),
+            # Review từ API có created_at là epoch giây, review từ HTML là chuỗi
+            'time': created_at if isinstance(created_at, int) else None,
+            'helpful_count': to_int(review.get('helpful_count')),
+        })
+    return rows
+
+
+def specification_rows(product):
+    """Các dòng của bảng specifications cho một sản phẩm"""
+    product_id = to_int(product.get('id'))
+    return [
+        {'product_id': product_id, 'name': spec.get('name'), 'value': spec.get('value')}
+        for spec in product.get('specifications') or []
+        if isinstance(spec, dict)
+    ]
@@ -0,0 +1,116 @@
+import argparse
+import logging
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import parse_qs, urlparse
+
+from raw_archive import iter_index, iter_segment
+from streams import JsonlSink
+from tiki_parse import parse_product_details, parse_reviews_response, parse_search_response
+
+
+def _empty_partial():
+    return {'search': None, 'search_ts': -1, 'details': None, 'details_ts': -1, 'reviews': {}}
+
+
+def parse_segment(archive_dir, entries):
+    """
+    Parse lại các bản ghi của một segment (chạy trong process con).
+
+    Returns:
+        tuple: ({product_id: partial}, số bản ghi bỏ qua)
+    """
+    partials = defaultdict(_empty_partial)
+    skipped = 0
+    for record in iter_segment(archive_dir, entries):
+        kind, body, ts = record['kind'], record['body'], record['ts']
+        if kind == 'search_api':
+            keyword = parse_qs(urlparse(record['url']).query).get('q', [None])[0]
+            for product in parse_search_response(body):
+                partial = partials[product['id']]
+                if ts >= partial['search_ts']:
+                    if keyword:
+                        product['search_keyword'] = keyword
+                    partial['search'], partial['search_ts'] = product, ts
+        elif kind == 'product_api':
+            partial = partials[record['product_id']]
+            if ts >= partial['details_ts']:
+                partial['details'], partial['details_ts'] = parse_product_details(body), ts
+        elif kind == 'reviews_api':
+            partial = partials[record['product_id']]
+            for review in parse_reviews_response(body):
+                partial['reviews'][review['id']] = review
+        else:
+            # HTML cần DOM của trình duyệt để parse, chỉ được lưu trữ
+            skipped += 1
+    return dict(partials), skipped
+
+
+def _merge(target, partial):
+    for part in ('search', 'details'):
+        if partial[part] is not None and partial[f'{part}_ts'] >= target[f'{part}_ts']:
+            target[part], target[f'{part}_ts'] = partial[part], partial[f'{part}_ts']
+    target['reviews'].update(partial['reviews'])
+
+
+def reparse_archive(archive_dir, output_file, workers=None, kinds=('search_api', 'product_api', 'reviews_api')):
+    """
+    Dựng lại sản phẩm từ raw archive bằng logic parse hiện tại, song song theo segment.
+
+    Bản search/chi tiết mới nhất của mỗi sản phẩm được giữ, reviews được gộp theo id.
+
+    Args:
+        archive_dir: Thư mục RawArchive
+        output_file: File JSONL output (nén nếu đuôi .gz/.zst)
+        workers: Số process (mặc định: số CPU)
+        kinds: Các loại response cần parse
+
+    Returns:
+        int: Số sản phẩm đã ghi
+    """
+    by_segment = defaultdict(list)
+    for entry in iter_index(archive_dir):
+        if entry['kind'] in kinds:
+            by_segment[entry['segment']].append(entry)
+    logging.info(f"🔁 Parse lại {sum(len(e) for e in by_segment.values())} responses "
+                 f"trong {len(by_segment)} segments")
+
+    merged = defaultdict(_empty_partial)
+    skipped = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(parse_segment, archive_dir, entries) for entries in by_segment.values()]
+        for future in futures:
+            partials, segment_skipped = future.result()
+            skipped += segment_skipped
+            for product_id, partial in partials.items():
+                _merge(merged[product_id], partial)
+
+    sink = JsonlSink(output_file)
+    try:
+        for product_id, partial in merged.items():
+            product = dict(partial['search'] or {'id': product_id})
+            if partial['details']:
+                product.update(partial['details'])
+            product['reviews'] = list(partial['reviews'].values())
+            sink.write_product(product)
+    finally:
+        sink.close()
+    if skipped:
+        logging.info(f"⏭️  Bỏ qua {skipped} bản ghi không parse được offline")
+    return sink.products_written
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description='Parse lại dữ liệu Tiki từ raw archive')
+    parser.add_argument('-a', '--archive', default='raw_archive', help='Thư mục raw archive')
+    parser.add_argument('-o', '--output', default='tiki_reparsed.jsonl.zst', help='File JSONL output (.gz/.zst để nén)')
+    parser.add_argument('-w', '--workers', type=int, default=None, help='Số process (mặc định: số CPU)')
+    args = parser.parse_args()
+
+    count = reparse_archive(args.archive, args.output, workers=args.workers)
+    logging.info(f"✅ Đã ghi {count} sản phẩm vào {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+import hashlib
+import logging
+import re
+import unicodedata
+from pathlib import Path
+
+_SPACE_RE = re.compile(r'\s+')
+
+
+def _normalize(value):
+    """Chuẩn hóa text cho fingerprint: NFC, chữ thường, gộp khoảng trắng"""
+    if _missing(value):
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        # product_id/time đọc từ DataFrame có thể thành float
+        value = int(value)
+    text = unicodedata.normalize('NFC', str(value)).casefold()
+    return _SPACE_RE.sub(' ', text).strip()
+
+
+def _missing(value):
+    try:
+        return value is None or value != value or value == ''
+    except TypeError:  # pd.NA
+        return True
+
+
+def review_key(product_id, review):
+    """
+    Khóa dedup của một review.
+
+    Review có id (API Tiki) dùng "id:<review_id>"; review không có id (HTML Tiki,
+    Shopee) dùng fingerprint của (sản phẩm, tác giả, thời gian, hash nội dung).
+    """
+    review_id = review.get('review_id', review.get('id'))
+    if not _missing(review_id):
+        try:
+            return f"id:{int(review_id)}"
+        except (TypeError, ValueError):
+            return f"id:{review_id}"
+    content_hash = hashlib.blake2b(_normalize(review.get('content')).encode('utf-8'), digest_size=8).hexdigest()
+    parts = '\x1f'.join([_normalize(product_id), _normalize(review.get('author')),
+                         _normalize(review.get('time')), content_hash])
+    return 'fp:' + hashlib.blake2b(parts.encode('utf-8'), digest_size=12).hexdigest()
+
+
+class ReviewIndex:
+    def __init__(self, index_file="review_index.txt"):
+        """
+        Index các review đã lưu để loại bỏ review trùng ngay khi ingest.
+
+        File index là text append-only, mỗi dòng một khóa từ review_key. Chi phí
+        mỗi lần lọc tỉ lệ với số review mới đưa vào, không phụ thuộc dữ liệu cũ.
+        Khóa thêm với commit=False chỉ nằm trong bộ nhớ cho tới khi gọi commit(),
+        để caller chỉ ghi index sau khi review đã được lưu bền vững.
+
+        Args:
+            index_file: File lưu khóa (None = chỉ dedup trong bộ nhớ)
+        """
+        self.index_file = Path(index_file) if index_file else None
+        self.keys = set()
+        self.pending = []
+        self.duplicates = 0
+        self._load()
+
+    def _load(self):
+        if self.index_file is None or not self.index_file.exists():
+            return
+        with open(self.index_file, 'r', encoding='utf-8') as f:
+            self.keys.update(line.strip() for line in f if line.strip())
+        logging.info(f"📚 Đã load {len(self.keys)} khóa review từ {self.index_file}")
+
+    def __contains__(self, key):
+        return key in self.keys
+
+    def __len__(self):
+        return len(self.keys)
+
+    def add_keys(self, keys, commit=True):
+        """
+        Thêm các khóa, trả về list bool cho biết khóa nào là mới.
+
+        Khóa trùng trong cùng lô chỉ được tính là mới ở lần xuất hiện đầu.
+        commit=False giữ khóa mới trong bộ nhớ, chưa ghi ra file.
+        """
+        is_new = []
+        for key in keys:
+            if key in self.keys:
+                self.duplicates += 1
+                is_new.append(False)
+            else:
+                self.keys.add(key)
+                self.pending.append(key)
+                is_new.append(True)
+        if commit:
+            self.commit()
+        return is_new
+
+    def commit(self):
+        """Ghi các khóa đang chờ ra file index"""
+        if self.pending and self.index_file is not None:
+            with open(self.index_file, 'a', encoding='utf-8') as f:
+                f.write('\n'.join(self.pending) + '\n')
+        self.pending = []
+
+    def select_new(self, product_id, reviews):
+        """
+        Tách các review (dict) chưa từng thấy của một sản phẩm, chưa đánh dấu là đã thấy.
+
+        Returns:
+            tuple: (reviews mới, khóa của chúng) - truyền khóa cho add_keys() sau khi đã lưu review
+        """
+        kept, keys, batch = [], [], set()
+        for review in reviews or []:
+            if not isinstance(review, dict):
+                continue
+            key = review_key(product_id, review)
+            if key in self.keys or key in batch:
+                self.duplicates += 1
+                continue
+            batch.add(key)
+            kept.append(review)
+            keys.append(key)
+        return kept, keys
+
+    def filter_new(self, product_id, reviews, commit=True):
+        """Giữ các review (dict) chưa từng thấy của một sản phẩm"""
+        kept, keys = self.select_new(product_id, reviews)
+        self.add_keys(keys, commit=commit)
+        return kept
+
+    def filter_frame(self, reviews_df, commit=True):
+        """Giữ các dòng chưa từng thấy của DataFrame reviews (cột như flatten_reviews)"""
+        if reviews_df.empty:
+            return reviews_df
+        records = reviews_df.to_dict('records')
+        is_new = self.add_keys((review_key(r.get('product_id'), r) for r in records), commit=commit)
+        return reviews_df[is_new]
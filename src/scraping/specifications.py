@@ -0,0 +1,123 @@
+import re
+
+import pandas as pd
+
+# Thuộc tính cần pivot thành cột có kiểu: tên cột → (các tên thuộc tính trên Tiki, đơn vị)
+PIVOT_ATTRIBUTES = {
+    'ram_gb': (['ram', 'dung lượng ram', 'bộ nhớ ram'], 'gb'),
+    'storage_gb': (['rom', 'bộ nhớ trong', 'dung lượng lưu trữ', 'dung lượng ổ cứng', 'ổ cứng'], 'gb'),
+    'screen_inch': (['kích thước màn hình', 'màn hình'], 'inch'),
+}
+
+# Hệ số quy đổi về GB
+_UNIT_TO_GB = {'tb': 1024.0, 'gb': 1.0, 'mb': 1 / 1024}
+_NUMBER_RE = r'(\d+(?:[.,]\d+)?)'
+
+
+def normalize_attr_name(names):
+    """Chuẩn hóa tên thuộc tính (vectorized): bỏ khoảng trắng thừa, chữ thường"""
+    return names.astype('string').str.strip().str.replace(r'\s+', ' ', regex=True).str.lower()
+
+
+class AttributeKeys:
+    def __init__(self, names=None):
+        """
+        Từ điển intern tên thuộc tính → attr_key_id, ổn định giữa các khối dữ liệu.
+
+        Args:
+            names: Danh sách tên đã có (vd: đọc lại từ spec_keys.csv), id theo thứ tự
+        """
+        self.ids = {}
+        self.names = []
+        for name in names or []:
+            self._add(name)
+
+    def _add(self, name):
+        if name not in self.ids:
+            self.ids[name] = len(self.names)
+            self.names.append(name)
+
+    def intern(self, names):
+        """Trả về Series attr_key_id (int32) cho Series tên đã chuẩn hóa"""
+        for name in names.dropna().unique():
+            self._add(name)
+        return names.map(self.ids).astype('int32')
+
+    def to_frame(self):
+        return pd.DataFrame({'attr_key_id': pd.Series(range(len(self.names)), dtype='int32'),
+                             'name': pd.Series(self.names, dtype='string')})
+
+    def lookup(self, names):
+        """attr_key_id của các tên (đã chuẩn hóa) có trong từ điển"""
+        return [self.ids[name] for name in names if name in self.ids]
+
+
+def normalize_specifications(df, keys=None):
+    """
+    Chuyển cột specifications (list {name, value}) thành bảng thuộc tính dạng cột.
+
+    Args:
+        df: DataFrame sản phẩm có cột 'id' và 'specifications'
+        keys: AttributeKeys dùng chung (tạo mới nếu None)
+
+    Returns:
+        tuple: (attributes_df [product_id, attr_key_id, value], keys)
+    """
+    keys = keys if keys is not None else AttributeKeys()
+    empty = pd.DataFrame({'product_id': pd.Series(dtype='int64'),
+                          'attr_key_id': pd.Series(dtype='int32'),
+                          'value': pd.Series(dtype='string')})
+    if 'specifications' not in df.columns or df.empty:
+        return empty, keys
+    exploded = df.set_index('id')['specifications'].explode()
+    exploded = exploded[exploded.map(lambda s: isinstance(s, dict) and bool(s.get('name')))]
+    if exploded.empty:
+        return empty, keys
+    records = pd.DataFrame.from_records(exploded.tolist(), columns=['name', 'value'])
+    attributes = pd.DataFrame({
+        'product_id': pd.to_numeric(exploded.index.to_numpy(), errors='coerce'),
+        'attr_key_id': keys.intern(normalize_attr_name(records['name'])).to_numpy(),
+        'value': records['value'].astype('string').str.strip().to_numpy(),
+    })
+    attributes = attributes.dropna(subset=['product_id'])
+    attributes['product_id'] = attributes['product_id'].astype('int64')
+    # Một sản phẩm có thể lặp thuộc tính giữa các nhóm thông số, giữ giá trị đầu
+    attributes = attributes.drop_duplicates(['product_id', 'attr_key_id']).reset_index(drop=True)
+    return attributes, keys
+
+
+def _parse_values(values, unit):
+    """Tách số và đơn vị từ chuỗi giá trị (vectorized), trả về float theo đơn vị đích"""
+    extracted = values.str.lower().str.extract(_NUMBER_RE + r'\s*(tb|gb|mb|inch|"|”|\'\')?')
+    numbers = pd.to_numeric(extracted[0].str.replace(',', '.', regex=False), errors='coerce')
+    if unit == 'gb':
+        # Không ghi đơn vị thì mặc định là GB
+        factor = extracted[1].map(_UNIT_TO_GB).astype('float64').fillna(1.0)
+        return numbers * factor
+    return numbers
+
+
+def pivot_specifications(attributes, keys, columns=None):
+    """
+    Pivot các thuộc tính chọn lọc (RAM, bộ nhớ, màn hình...) thành cột số.
+
+    Args:
+        attributes: Bảng thuộc tính từ normalize_specifications
+        keys: AttributeKeys tương ứng
+        columns: dict tên cột → (tên thuộc tính, đơn vị), mặc định PIVOT_ATTRIBUTES
+
+    Returns:
+        DataFrame: Mỗi dòng một product_id, mỗi cột một thuộc tính (float64, NaN nếu thiếu)
+    """
+    columns = columns or PIVOT_ATTRIBUTES
+    product_ids = pd.Index(attributes['product_id'].unique(), name='product_id')
+    pivot = pd.DataFrame(index=product_ids)
+    for column, (names, unit) in columns.items():
+        key_ids = keys.lookup([re.sub(r'\s+', ' ', n.strip().lower()) for n in names])
+        subset = attributes[attributes['attr_key_id'].isin(key_ids)]
+        # Ưu tiên tên thuộc tính đứng trước trong danh sách
+        order = subset['attr_key_id'].map({key_id: i for i, key_id in enumerate(key_ids)})
+        subset = subset.assign(_order=order).sort_values('_order').drop_duplicates('product_id')
+        values = _parse_values(subset['value'], unit)
+        pivot[column] = pd.Series(values.to_numpy(), index=subset['product_id'].to_numpy()).reindex(product_ids)
+    return pivot.reset_index()
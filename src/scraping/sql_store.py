@@ -0,0 +1,169 @@
+import logging
+import sqlite3
+import time
+from pathlib import Path
+
+from records import product_row, review_rows, specification_rows
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    id INTEGER PRIMARY KEY,
+    name TEXT,
+    link TEXT,
+    price REAL,
+    original_price REAL,
+    discount REAL,
+    rating REAL,
+    review_count INTEGER,
+    quantity_sold INTEGER,
+    stock_qty INTEGER,
+    brand_id INTEGER,
+    brand TEXT,
+    seller_id INTEGER,
+    seller TEXT,
+    category_id INTEGER,
+    category TEXT,
+    search_keyword TEXT,
+    search_category TEXT,
+    image TEXT,
+    updated_at INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_products_search_category ON products(search_category);
+
+CREATE TABLE IF NOT EXISTS reviews (
+    review_id INTEGER PRIMARY KEY,
+    product_id INTEGER NOT NULL,
+    title TEXT,
+    content TEXT,
+    rating INTEGER,
+    author TEXT,
+    time INTEGER,
+    helpful_count INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_reviews_product_id ON reviews(product_id);
+
+CREATE TABLE IF NOT EXISTS specifications (
+    product_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    value TEXT,
+    PRIMARY KEY (product_id, name)
+);
+"""
+
+PRODUCT_COLUMNS = ['id', 'name', 'link', 'price', 'original_price', 'discount', 'rating',
+                   'review_count', 'quantity_sold', 'stock_qty', 'brand_id', 'brand',
+                   'seller_id', 'seller', 'category_id', 'category', 'search_keyword',
+                   'search_category', 'image', 'updated_at']
+REVIEW_COLUMNS = ['review_id', 'product_id', 'title', 'content', 'rating', 'author',
+                  'time', 'helpful_count']
+
+
+def _upsert_sql(table, columns, keys):
+    """INSERT ... ON CONFLICT DO UPDATE, giữ giá trị cũ nếu giá trị mới là NULL"""
+    placeholders = ', '.join(f':{col}' for col in columns)
+    updates = ', '.join(
+        f'{col} = COALESCE(excluded.{col}, {table}.{col})' for col in columns if col not in keys
+    )
+    return (f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders}) "
+            f"ON CONFLICT({', '.join(keys)}) DO UPDATE SET {updates}")
+
+
+class SQLStore:
+    def __init__(self, db_path="tiki_data.db", batch_size=500):
+        """
+        Lưu products/reviews/specifications vào SQLite với khóa chính và upsert.
+
+        Có thể dùng như một sink của TikiPlaywrightScraper (write_product/flush/close)
+        hoặc nạp trực tiếp từ extract_data.
+
+        Args:
+            db_path: File SQLite
+            batch_size: Số sản phẩm buffer trước khi ghi một transaction
+        """
+        self.db_path = Path(db_path)
+        self.batch_size = batch_size
+        self.conn = sqlite3.connect(self.db_path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(SCHEMA)
+        self.pending = []
+        self.products_written = 0
+        self.reviews_written = 0
+
+    def write_product(self, product):
+        """Thêm một sản phẩm vào buffer, ghi khi đủ batch_size"""
+        self.pending.append(product)
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def upsert_products(self, products):
+        """Upsert danh sách sản phẩm (kèm reviews, specifications) trong một transaction"""
+        now = int(time.time())
+        product_rows = []
+        review_data = []
+        spec_data = []
+        for product in products:
+            row = product_row(product)
+            if row['id'] is None:
+                continue
+            row['updated_at'] = now
+            product_rows.append(row)
+            review_data.extend(r for r in review_rows(product) if r['review_id'] is not None)
+            spec_data.extend(s for s in specification_rows(product) if s['name'])
+
+        with self.conn:
+            self.conn.executemany(_upsert_sql('products', PRODUCT_COLUMNS, ['id']), product_rows)
+            self.conn.executemany(_upsert_sql('reviews', REVIEW_COLUMNS, ['review_id']), review_data)
+            self.conn.executemany(
+                _upsert_sql('specifications', ['product_id', 'name', 'value'], ['product_id', 'name']),
+                spec_data
+            )
+        self.products_written += len(product_rows)
+        self.reviews_written += len(review_data)
+
+    def flush(self):
+        """Ghi các sản phẩm đang buffer"""
+        if self.pending:
+            self.upsert_products(self.pending)
+            self.pending = []
+
+    def close(self):
+        """Flush và đóng kết nối"""
+        self.flush()
+        self.conn.close()
+        logging.info(f"💾 SQLite: upsert {self.products_written} products, "
+                     f"{self.reviews_written} reviews → {self.db_path}")
+
+    def load_products(self, columns=None, search_category=None):
+        """
+        Đọc bảng products thành DataFrame.
+
+        Args:
+            columns: Danh sách cột cần lấy (mặc định: tất cả)
+            search_category: Lọc theo nhóm keyword (dùng index idx_products_search_category)
+        """
+        import pandas as pd
+        selected = ', '.join(columns) if columns else '*'
+        query = f"SELECT {selected} FROM products"
+        params = ()
+        if search_category:
+            query += " WHERE search_category = ?"
+            params = (search_category,)
+        return pd.read_sql_query(query, self.conn, params=params)
+
+    def load_reviews(self, columns=None, clean=True):
+        """
+        Đọc bảng reviews thành DataFrame.
+
+        Args:
+            columns: Danh sách cột cần lấy (mặc định: tất cả)
+            clean: Áp dụng các bộ lọc của notebook ngay trong SQL: bỏ review không có
+                   nội dung, review mồ côi (không có sản phẩm) và review của sản phẩm rating = 0
+        """
+        import pandas as pd
+        selected = ', '.join(f'r.{col}' for col in columns) if columns else 'r.*'
+        query = f"SELECT {selected} FROM reviews r"
+        if clean:
+            query += (" JOIN products p ON p.id = r.product_id"
+                      " WHERE r.content IS NOT NULL AND r.content != '' AND (p.rating IS NULL OR p.rating != 0)")
+        return pd.read_sql_query(query, self.conn)
@@ -0,0 +1,108 @@
+import gzip
+import io
+import json
+import logging
+import os
+from pathlib import Path
+
+try:
+    import zstandard
+except ImportError:  # zstandard là tùy chọn, chỉ cần cho file .zst
+    zstandard = None
+
+
+def compression_of(path):
+    """Trả về 'gzip', 'zstd' hoặc None dựa trên phần mở rộng của file"""
+    suffix = Path(path).suffix.lower()
+    if suffix in ('.gz', '.gzip'):
+        return 'gzip'
+    if suffix in ('.zst', '.zstd'):
+        return 'zstd'
+    return None
+
+
+def open_stream(path, mode='rt', start_offset=0, level=None, encoding='utf-8'):
+    """
+    Mở file thường, .gz hoặc .zst với nén/giải nén streaming.
+
+    Chế độ ghi nối ('a') tạo thêm một gzip member / zstd frame mới, chế độ đọc
+    đọc liền qua mọi member/frame. start_offset là vị trí byte trong file trên đĩa
+    (không phải dữ liệu đã giải nén), phải nằm ở ranh giới giữa hai lần ghi.
+
+    Args:
+        path: Đường dẫn file
+        mode: 'rt', 'wt', 'at' (text) hoặc 'rb', 'wb', 'ab' (binary)
+        start_offset: Vị trí byte bắt đầu đọc
+        level: Mức nén (mặc định: gzip 6, zstd 3)
+        encoding: Encoding cho chế độ text
+    """
+    codec = compression_of(path)
+    action = mode.replace('t', '').replace('b', '')
+    raw = open(path, action + 'b')
+    if start_offset:
+        raw.seek(start_offset)
+
+    if codec == 'gzip':
+        stream = gzip.GzipFile(fileobj=raw, mode=action + 'b',
+                               compresslevel=level if level is not None else 6)
+        # Để close() đóng luôn file gốc, giống gzip.open(path)
+        stream.myfileobj = raw
+    elif codec == 'zstd':
+        if zstandard is None:
+            raw.close()
+            raise ImportError("Đọc/ghi file .zst cần zstandard: pip install zstandard")
+        if action == 'r':
+            stream = zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True, closefd=True)
+        else:
+            compressor = zstandard.ZstdCompressor(level=level if level is not None else 3)
+            stream = compressor.stream_writer(raw, closefd=True)
+    else:
+        stream = raw
+
+    if 'b' in mode:
+        return stream
+    return io.TextIOWrapper(stream, encoding=encoding)
+
+
+class JsonlSink:
+    def __init__(self, output_file, level=None):
+        """
+        Ghi mỗi sản phẩm thành một dòng JSON, nén gzip/zstd theo phần mở rộng file.
+
+        Mỗi lần chạy ghi nối thêm một member/frame mới nên file có thể đọc liền
+        bằng extract_data.iter_products.
+
+        Args:
+            output_file: File output, vd: tiki_products.jsonl.zst
+            level: Mức nén
+        """
+        self.output_file = Path(output_file)
+        self.start_size = os.path.getsize(self.output_file) if self.output_file.exists() else 0
+        self.stream = open_stream(self.output_file, 'ab', level=level)
+        self.raw_bytes = 0
+        self.products_written = 0
+        self.metrics = {}
+
+    def write_product(self, product):
+        line = (json.dumps(product, ensure_ascii=False) + '\n').encode('utf-8')
+        self.stream.write(line)
+        self.raw_bytes += len(line)
+        self.products_written += 1
+
+    def flush(self):
+        self.stream.flush()
+
+    def close(self):
+        """Đóng file và ghi nhận tỉ lệ nén của lần chạy này"""
+        self.stream.close()
+        written = os.path.getsize(self.output_file) - self.start_size
+        self.metrics = {
+            'file': str(self.output_file),
+            'products': self.products_written,
+            'raw_bytes': self.raw_bytes,
+            'written_bytes': written,
+            'compression_ratio': self.raw_bytes / written if written else None,
+        }
+        ratio = f"x{self.metrics['compression_ratio']:.1f}" if written else "-"
+        logging.info(f"📦 JSONL: {self.products_written} sản phẩm, {self.raw_bytes:,} → {written:,} bytes "
+                     f"(nén {ratio}) → {self.output_file}")
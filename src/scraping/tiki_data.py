@@ -9,6 +9,9 @@ from playwright.async_api import async_playwright, TimeoutError as PlaywrightTim
 from tqdm.asyncio import tqdm
 import aiohttp
 
+from streams import JsonlSink
+from tiki_parse import parse_product_details, parse_reviews_response, parse_search_response
+
 # Setup logging
 import sys
 if sys.stdout.encoding != 'utf-8':
@@ -26,7 +29,9 @@ logging.basicConfig(
 )
 
 class TikiPlaywrightScraper:
-    def __init__(self, search_term, max_products=10, max_reviews=30, headless=False, max_concurrent=10):
+    def __init__(self, search_term, max_products=10, max_reviews=30, headless=False, max_concurrent=10,
+                 product_index=None, search_category=None, sinks=None, blob_store=None, review_index=None,
+                 raw_archive=None):
         """
         Scraper sử dụng Playwright để lấy dữ liệu từ Tiki.
         
@@ -36,6 +41,15 @@ class TikiPlaywrightScraper:
             max_reviews: Số lượng review tối đa cho mỗi sản phẩm
             headless: Chạy browser ẩn hay không
             max_concurrent: Số lượng request đồng thời tối đa (mặc định: 5)
+            product_index: ProductIndex dùng chung, sản phẩm đã có sẽ không bị lấy lại.
+                Scraper chỉ cập nhật index trong bộ nhớ; caller gọi commit() sau khi đã đóng sinks
+            search_category: Nhóm keyword (phone, laptop...) để ghi vào index
+            sinks: Danh sách sink (vd: ParquetSink, JsonlSink) nhận từng sản phẩm ngay khi scrape xong.
+                Có JsonlSink thì không ghi thêm output_file JSON
+            blob_store: BlobStore lưu description/warranty... theo hash, product chỉ giữ <field>_hash
+            review_index: ReviewIndex dùng chung, review đã lưu trước đó bị bỏ khỏi kết quả.
+                Giống product_index, caller gọi commit() sau khi đã đóng sinks
+            raw_archive: RawArchive lưu response JSON/HTML thô để parse lại offline (reparse.py)
         """
         self.search_term = search_term
         self.max_products = max_products
@@ -46,6 +60,16 @@ class TikiPlaywrightScraper:
         self.products_data = []
         self.state_file = "tiki_state.json"
         self.semaphore = None  # Sẽ được khởi tạo trong async context
+        self.request_count = 0  # Tổng số request đã gửi (dùng cho thống kê yield)
+        self.known_products = 0  # Số kết quả tìm kiếm đã có trong index (dùng cho thống kê yield)
+        self.product_index = product_index
+        self.search_category = search_category
+        self.sinks = sinks or []
+        # JsonlSink đã ghi từng sản phẩm ra đĩa, không cần dump JSON indent=2 định kỳ
+        self.save_json = not any(isinstance(sink, JsonlSink) for sink in self.sinks)
+        self.blob_store = blob_store
+        self.review_index = review_index
+        self.raw_archive = raw_archive
         
     async def _save_cookies(self, context):
         """Lưu cookies và storage state để duy trì session"""
@@ -55,6 +79,24 @@ class TikiPlaywrightScraper:
         except Exception as e:
             logging.warning(f"Không thể lưu session: {e}")
     
+    def _archive(self, kind, response, data, product_id=None):
+        """Lưu response API thô vào raw archive (nếu có)"""
+        if self.raw_archive is None:
+            return
+        try:
+            self.raw_archive.write(kind, str(response.url), data, product_id=product_id, status=response.status)
+        except Exception as e:
+            logging.warning(f"Không lưu được response vào raw archive: {e}")
+    
+    async def _archive_page(self, kind, page, product_id=None):
+        """Lưu HTML của trang hiện tại vào raw archive (nếu có)"""
+        if self.raw_archive is None:
+            return
+        try:
+            self.raw_archive.write(kind, page.url, await page.content(), product_id=product_id)
+        except Exception as e:
+            logging.warning(f"Không lưu được HTML vào raw archive: {e}")
+    
     async def _load_cookies(self):
         """Kiểm tra xem có file state đã lưu không"""
         return Path(self.state_file).exists()
@@ -152,6 +194,13 @@ class TikiPlaywrightScraper:
                 
                 await self._save_cookies(context)
                 
+                # Bỏ qua sản phẩm đã có trong index, chỉ gắn thêm keyword/category
+                if self.product_index is not None:
+                    products = self._filter_known_products(products)
+                    if not products:
+                        logging.info("♻️  Tất cả sản phẩm đã có trong index, không cần lấy lại")
+                        return self.products_data
+                
                 # 2. Lấy chi tiết và reviews cho từng sản phẩm SONG SONG
                 logging.info(f"🚀 Đang lấy chi tiết {len(products)} sản phẩm (song song {self.max_concurrent} requests)...")
                 
@@ -167,8 +216,24 @@ class TikiPlaywrightScraper:
                     try:
                         result = await coro
                         if result:
+                            result['search_keyword'] = self.search_term
+                            if self.search_category:
+                                result['search_category'] = self.search_category
+                            review_keys = []
+                            if self.review_index is not None:
+                                result['reviews'], review_keys = self.review_index.select_new(
+                                    result.get('id'), result.get('reviews'))
+                            for sink in self.sinks:
+                                sink.write_product(result)
                             results.append(result)
                             self.products_data.append(result)
+                            # Chỉ đánh dấu đã biết sau khi sink nhận sản phẩm; index được ghi
+                            # ra đĩa khi caller commit() sau khi sink đã lưu bền vững
+                            if self.review_index is not None:
+                                self.review_index.add_keys(review_keys, commit=False)
+                            if self.product_index is not None and result.get('id') is not None:
+                                self.product_index.add(result['id'], self.search_term, self.search_category,
+                                                       commit=False)
                             
                             # Lưu định kỳ mỗi 5 sản phẩm
                             if len(results) % 5 == 0:
@@ -178,8 +243,11 @@ class TikiPlaywrightScraper:
                         logging.error(f"Lỗi khi xử lý task: {e}")
                         continue
                 
-                # Lưu lần cuối
+                # Lưu lần cuối. Sink tự ghi khi đủ buffer và khi caller close(), không flush
+                # theo từng keyword để ParquetSink không sinh row group nhỏ
                 self._save_data()
+                if self.raw_archive is not None:
+                    self.raw_archive.flush()
                 logging.info(f"✅ Hoàn thành! Đã lấy được {len(self.products_data)} sản phẩm")
                 
                 # return last value for calling function
@@ -188,6 +256,30 @@ class TikiPlaywrightScraper:
             finally:
                 await browser.close()
     
+    def _filter_known_products(self, products):
+        """
+        Tách sản phẩm đã có trong index, chỉ ghi thêm membership cho chúng.
+
+        Giá trong kết quả tìm kiếm của sản phẩm đã biết vẫn được gửi tới các sink
+        có write_observation (PriceHistory) để lịch sử giá không bị bỏ sót.
+        """
+        new_products = []
+        known = 0
+        for product in products:
+            product_id = product.get('id')
+            if product_id is not None and product_id in self.product_index:
+                self.product_index.add(product_id, self.search_term, self.search_category, commit=False)
+                for sink in self.sinks:
+                    if hasattr(sink, 'write_observation'):
+                        sink.write_observation(product)
+                known += 1
+            else:
+                new_products.append(product)
+        self.known_products += known
+        if known:
+            logging.info(f"♻️  {known} sản phẩm đã có trong index, chỉ cập nhật keyword/category")
+        return new_products
+    
     async def _scrape_product_with_semaphore(self, page, product):
         """Wrapper để scrape product với semaphore control"""
         async with self.semaphore:
@@ -231,38 +323,17 @@ class TikiPlaywrightScraper:
                 # Sử dụng timeout để tránh treo
                 timeout = aiohttp.ClientTimeout(total=30)
                 async with aiohttp.ClientSession(timeout=timeout) as session:
+                    self.request_count += 1
                     async with session.get(api_url, params=params, headers=headers) as response:
                         if response.status == 200:
                             data = await response.json()
                             
-                            # Parse dữ liệu từ API
-                            items = data.get('data', [])
+                            self._archive('search_api', response, data)
                             
-                            for item in items[:self.max_products]:
-                                try:
-                                    product = {
-                                        'id': item.get('id'),
-                                        'name': item.get('name', ''),
-                                        'link': f"https://tiki.vn/{item.get('url_path', '')}" if item.get('url_path') else f"https://tiki.vn/product-p{item.get('id')}.html",
-                                        'price': item.get('price', 0),
-                                        'original_price': item.get('original_price', 0),
-                                        'discount': item.get('discount_rate', 0),
-                                        'rating': item.get('rating_average', 0),
-                                        'review_count': item.get('review_count', 0),
-                                        'quantity_sold': item.get('quantity_sold', {}).get('value', 0),
-                                        'image': item.get('thumbnail_url', ''),
-                                        'badges': item.get('badges_new', []),
-                                        'seller': item.get('seller', {}).get('name', ''),
-                                        'brand': item.get('brand_name', ''),
-                                        'specifications': item.get('specifications', [])
-                                    }
-                                    
-                                    products.append(product)
-                                    logging.info(f"✅ Tìm thấy: {product['name'][:50]}...")
-                                    
-                                except Exception as e:
-                                    logging.warning(f"Lỗi khi parse sản phẩm: {e}")
-                                    continue
+                            # Parse dữ liệu từ API
+                            products = parse_search_response(data, self.max_products)
+                            for product in products:
+                                logging.info(f"✅ Tìm thấy: {product['name'][:50]}...")
                             
                             return products  # Thành công, return ngay
                         else:
@@ -290,6 +361,7 @@ class TikiPlaywrightScraper:
         # Fallback: scrape HTML nếu API fail
         logging.warning("API không hoạt động, chuyển sang scrape HTML...")
         search_url = f"https://tiki.vn/search?q={self.search_term.replace(' ', '+')}"
+        self.request_count += 1
         
         try:
             await page.goto(search_url, wait_until='networkidle', timeout=60000)
@@ -297,6 +369,7 @@ class TikiPlaywrightScraper:
             await page.goto(search_url, wait_until='domcontentloaded', timeout=60000)
         
         await self._human_like_delay(2, 4)
+        await self._archive_page('search_html', page)
         
         products = []
         try:
@@ -351,41 +424,17 @@ class TikiPlaywrightScraper:
         }
         
         try:
+            self.request_count += 1
             async with session.get(api_url, params=params, headers=headers) as response:
                 if response.status == 200:
                     data = await response.json()
                     
-                    details = {
-                        'description': data.get('description', ''),
-                        'short_description': data.get('short_description', ''),
-                        'specifications': [],
-                        'brand': {},
-                        'categories': data.get('categories', {}),
-                        'images': data.get('images', []),
-                        'current_seller': data.get('current_seller', {}),
-                        'stock_item': data.get('stock_item', {}),
-                        'warranty_info': data.get('warranty_info', ''),
-                        'return_and_exchange_policy': data.get('return_and_exchange_policy', '')
-                    }
-                    
-                    # Parse specifications
-                    specs_list = data.get('specifications', [])
-                    if specs_list:
-                        for spec_group in specs_list:
-                            attributes = spec_group.get('attributes', [])
-                            for attr in attributes:
-                                details['specifications'].append({
-                                    'name': attr.get('name', ''),
-                                    'value': attr.get('value', '')
-                                })
+                    self._archive('product_api', response, data, product_id)
+                    details = parse_product_details(data)
                     
-                    # Brand info
-                    brand_data = data.get('brand', {})
-                    if brand_data:
-                        details['brand'] = {
-                            'id': brand_data.get('id'),
-                            'name': brand_data.get('name', '')
-                        }
+                    # HTML dài (thường trùng giữa các biến thể) chuyển vào blob store
+                    if self.blob_store is not None:
+                        self.blob_store.offload(details)
                     
                     return details
                 else:
@@ -438,8 +487,10 @@ class TikiPlaywrightScraper:
         logging.warning(f"⚠️ API không hoạt động, scrape HTML cho {product.get('name', 'Unknown')[:50]}...")
         
         try:
+            self.request_count += 1
             await page.goto(product['link'], wait_until='networkidle', timeout=60000)
             await self._human_like_delay(2, 4)
+            await self._archive_page('product_html', page, product.get('id'))
             
             # Lấy mô tả
             try:
@@ -506,6 +557,7 @@ class TikiPlaywrightScraper:
                     }
                     task = session.get(api_url, params=params, headers=headers)
                     tasks.append(task)
+                self.request_count += len(tasks)
                 
                 # Lấy tất cả các trang song song
                 responses = await asyncio.gather(*tasks, return_exceptions=True)
@@ -518,28 +570,9 @@ class TikiPlaywrightScraper:
                     async with response:
                         if response.status == 200:
                             data = await response.json()
-                            review_data = data.get('data', [])
-                            
-                            for review_item in review_data:
-                                if len(reviews) >= self.max_reviews:
-                                    break
-                                try:
-                                    review = {
-                                        'id': review_item.get('id'),
-                                        'title': review_item.get('title', ''),
-                                        'content': review_item.get('content', ''),
-                                        'rating': review_item.get('rating', 0),
-                                        'author': review_item.get('created_by', {}).get('name', 'Anonymous'),
-                                        'time': review_item.get('created_at', ''),
-                                        'helpful_count': review_item.get('thank_count', 0),
-                                        'images': review_item.get('images', []),
-                                        'timeline': review_item.get('timeline', {}),
-                                        'customer_reviewed': review_item.get('customer_reviewed', {})
-                                    }
-                                    reviews.append(review)
-                                except Exception as e:
-                                    logging.warning(f"Lỗi parse review: {e}")
-                                    continue
+                            self._archive('reviews_api', response, data, product_id)
+                            if len(reviews) < self.max_reviews:
+                                reviews.extend(parse_reviews_response(data, self.max_reviews - len(reviews)))
             else:
                 # Chỉ cần 1 trang
                 params = {
@@ -549,29 +582,12 @@ class TikiPlaywrightScraper:
                     'page': 1
                 }
                 
+                self.request_count += 1
                 async with session.get(api_url, params=params, headers=headers) as response:
                     if response.status == 200:
                         data = await response.json()
-                        review_data = data.get('data', [])
-                        
-                        for review_item in review_data[:self.max_reviews]:
-                            try:
-                                review = {
-                                    'id': review_item.get('id'),
-                                    'title': review_item.get('title', ''),
-                                    'content': review_item.get('content', ''),
-                                    'rating': review_item.get('rating', 0),
-                                    'author': review_item.get('created_by', {}).get('name', 'Anonymous'),
-                                    'time': review_item.get('created_at', ''),
-                                    'helpful_count': review_item.get('thank_count', 0),
-                                    'images': review_item.get('images', []),
-                                    'timeline': review_item.get('timeline', {}),
-                                    'customer_reviewed': review_item.get('customer_reviewed', {})
-                                }
-                                reviews.append(review)
-                            except Exception as e:
-                                logging.warning(f"Lỗi parse review: {e}")
-                                continue
+                        self._archive('reviews_api', response, data, product_id)
+                        reviews.extend(parse_reviews_response(data, self.max_reviews))
                     else:
                         logging.warning(f"Review API trả về status {response.status}")
             
@@ -646,7 +662,9 @@ class TikiPlaywrightScraper:
         return reviews
     
     def _save_data(self):
-        """Lưu dữ liệu vào file JSON"""
+        """Lưu dữ liệu vào file JSON (bỏ qua nếu đã có JsonlSink)"""
+        if not self.save_json:
+            return
         try:
             with open(self.output_file, 'a', encoding='utf-8') as f:
                 json.dump(self.products_data, f, ensure_ascii=False, indent=2)
@@ -662,18 +680,79 @@ async def main():
     parser.add_argument('-r', '--reviews', type=int, default=20, help='Số lượng reviews tối đa mỗi sản phẩm')
     parser.add_argument('-c', '--concurrent', type=int, default=5, help='Số lượng request đồng thời (mặc định: 5)')
     parser.add_argument('--headless', action='store_true', help='Chạy browser ẩn')
+    parser.add_argument('--index-file', default=None, help='File index sản phẩm đã thu thập (bỏ qua sản phẩm đã có)')
+    parser.add_argument('--parquet-dir', default=None, help='Ghi thêm products/reviews/specifications ra Parquet trong thư mục này')
+    parser.add_argument('--sqlite', default=None, help='Upsert products/reviews/specifications vào file SQLite này')
+    parser.add_argument('--history', default=None, help='File SQLite lưu lịch sử thay đổi giá/tồn kho')
+    parser.add_argument('--jsonl', default=None, help='Ghi thêm sản phẩm ra JSONL, nén nếu đuôi .gz/.zst (vd: tiki.jsonl.zst)')
+    parser.add_argument('--review-index', default=None, help='File index review đã lưu (bỏ review trùng qua các lần chạy)')
+    parser.add_argument('--raw-archive', default=None, help='Thư mục lưu response JSON/HTML thô (parse lại bằng reparse.py)')
+    parser.add_argument('--blob-store', default=None, help='File SQLite lưu description/warranty... theo hash (product chỉ giữ hash)')
     
     args = parser.parse_args()
     
+    product_index = None
+    if args.index_file:
+        from product_index import ProductIndex
+        product_index = ProductIndex(args.index_file)
+    
+    sinks = []
+    if args.parquet_dir:
+        from parquet_sink import ParquetSink
+        sinks.append(ParquetSink(args.parquet_dir))
+    if args.sqlite:
+        from sql_store import SQLStore
+        sinks.append(SQLStore(args.sqlite))
+    if args.history:
+        from price_history import PriceHistory
+        sinks.append(PriceHistory(args.history))
+    if args.jsonl:
+        from streams import JsonlSink
+        sinks.append(JsonlSink(args.jsonl))
+    
+    review_index = None
+    if args.review_index:
+        from review_index import ReviewIndex
+        review_index = ReviewIndex(args.review_index)
+    
+    raw_archive = None
+    if args.raw_archive:
+        from raw_archive import RawArchive
+        raw_archive = RawArchive(args.raw_archive)
+    
+    blob_store = None
+    if args.blob_store:
+        from blob_store import BlobStore
+        blob_store = BlobStore(args.blob_store)
+    
     scraper = TikiPlaywrightScraper(
         search_term=args.keyword,
         max_products=args.num,
         max_reviews=args.reviews,
         headless=args.headless,
-        max_concurrent=args.concurrent
+        max_concurrent=args.concurrent,
+        product_index=product_index,
+        sinks=sinks,
+        blob_store=blob_store,
+        review_index=review_index,
+        raw_archive=raw_archive
     )
     
-    await scraper.scrape()
+    try:
+        await scraper.scrape()
+    finally:
+        for sink in sinks:
+            sink.close()
+        if blob_store is not None:
+            blob_store.close()
+        if raw_archive is not None:
+            raw_archive.close()
+    
+    # Chỉ ghi index khi scrape xong và sink đã đóng, để index không đánh dấu dữ liệu chưa lưu
+    if product_index is not None:
+        product_index.commit()
+    if review_index is not None:
+        review_index.commit()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,94 @@
+import logging
+
+
+def parse_search_item(item):
+    """Một sản phẩm từ kết quả API tìm kiếm /api/v2/products"""
+    return {
+        'id': item.get('id'),
+        'name': item.get('name', ''),
+        'link': f"https://tiki.vn/{item.get('url_path', '')}" if item.get('url_path') else f"https://tiki.vn/product-p{item.get('id')}.html",
+        'price': item.get('price', 0),
+        'original_price': item.get('original_price', 0),
+        'discount': item.get('discount_rate', 0),
+        'rating': item.get('rating_average', 0),
+        'review_count': item.get('review_count', 0),
+        'quantity_sold': item.get('quantity_sold', {}).get('value', 0),
+        'image': item.get('thumbnail_url', ''),
+        'badges': item.get('badges_new', []),
+        'seller': item.get('seller', {}).get('name', ''),
+        'brand': item.get('brand_name', ''),
+        'specifications': item.get('specifications', [])
+    }
+
+
+def parse_search_response(data, max_products=None):
+    """Danh sách sản phẩm từ response JSON của API tìm kiếm"""
+    products = []
+    for item in data.get('data', [])[:max_products]:
+        try:
+            products.append(parse_search_item(item))
+        except Exception as e:
+            logging.warning(f"Lỗi khi parse sản phẩm: {e}")
+            continue
+    return products
+
+
+def parse_product_details(data):
+    """Chi tiết sản phẩm từ response JSON của API /api/v2/products/{id}"""
+    details = {
+        'description': data.get('description', ''),
+        'short_description': data.get('short_description', ''),
+        'specifications': [],
+        'brand': {},
+        'categories': data.get('categories', {}),
+        'images': data.get('images', []),
+        'current_seller': data.get('current_seller', {}),
+        'stock_item': data.get('stock_item', {}),
+        'warranty_info': data.get('warranty_info', ''),
+        'return_and_exchange_policy': data.get('return_and_exchange_policy', '')
+    }
+
+    # Parse specifications
+    for spec_group in data.get('specifications', []) or []:
+        for attr in spec_group.get('attributes', []):
+            details['specifications'].append({
+                'name': attr.get('name', ''),
+                'value': attr.get('value', '')
+            })
+
+    # Brand info
+    brand_data = data.get('brand', {})
+    if brand_data:
+        details['brand'] = {
+            'id': brand_data.get('id'),
+            'name': brand_data.get('name', '')
+        }
+    return details
+
+
+def parse_review_item(review_item):
+    """Một review từ response JSON của API /api/v2/reviews"""
+    return {
+        'id': review_item.get('id'),
+        'title': review_item.get('title', ''),
+        'content': review_item.get('content', ''),
+        'rating': review_item.get('rating', 0),
+        'author': review_item.get('created_by', {}).get('name', 'Anonymous'),
+        'time': review_item.get('created_at', ''),
+        'helpful_count': review_item.get('thank_count', 0),
+        'images': review_item.get('images', []),
+        'timeline': review_item.get('timeline', {}),
+        'customer_reviewed': review_item.get('customer_reviewed', {})
+    }
+
+
+def parse_reviews_response(data, limit=None):
+    """Danh sách review từ một trang response của API reviews"""
+    reviews = []
+    for review_item in data.get('data', [])[:limit]:
+        try:
+            reviews.append(parse_review_item(review_item))
+        except Exception as e:
+            logging.warning(f"Lỗi parse review: {e}")
+            continue
+    return reviews
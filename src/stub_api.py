@@ -0,0 +1,209 @@
+import re
+import json
+import time
+import zlib
+import random
+import asyncio
+import logging
+import argparse
+from collections import deque
+
+from aiohttp import web
+
+from json_labeling import classify_async, estimate_tokens
+from local_classifier import LABELS
+
+_COMMENT_RE = re.compile(r"^Comment (\d+): (.*)$")
+
+
+def stub_label(text):
+    """Deterministic label the stub gives a comment text."""
+    return LABELS[zlib.crc32(text.strip().encode("utf-8")) % len(LABELS)]
+
+
+class StubConfig:
+    """
+    Behaviour of the stub endpoint. Rates are probabilities per request
+    (error_rate) or per answer line (drop_rate, malformed_rate).
+    rate_limit requests are allowed per rate_window seconds; more get HTTP 429.
+    """
+    def __init__(self, latency=0.0, jitter=0.0, rate_limit=None, rate_window=60.0, error_rate=0.0,
+                 drop_rate=0.0, malformed_rate=0.0, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        self.error_rate = error_rate
+        self.drop_rate = drop_rate
+        self.malformed_rate = malformed_rate
+        self.seed = seed
+
+
+class StubServer:
+    """Local stand-in for POST /v1/chat/completions that labels 'Comment N: text' prompt lines."""
+    def __init__(self, config=None):
+        self.config = config or StubConfig()
+        self.rng = random.Random(self.config.seed)
+        self.window = deque()
+        self.counters = {"requests": 0, "rate_limited": 0, "errors": 0, "dropped": 0, "malformed": 0, "lines": 0}
+        self.runner = None
+        self.url = None
+
+    def _error(self, status, message, kind, headers=None):
+        return web.json_response({"error": {"message": message, "type": kind}}, status=status, headers=headers)
+
+    def _rate_limited(self):
+        if self.config.rate_limit is None:
+            return None
+        now = time.monotonic()
+        while self.window and now - self.window[0] >= self.config.rate_window:
+            self.window.popleft()
+        if len(self.window) >= self.config.rate_limit:
+            return self.config.rate_window - (now - self.window[0])
+        self.window.append(now)
+        return None
+
+    def answer(self, prompt):
+        """Reply text for a prompt, with configured drops and malformed lines."""
+        lines = []
+        for line in prompt.splitlines():
+            match = _COMMENT_RE.match(line)
+            if not match:
+                continue
+            self.counters["lines"] += 1
+            index, text = match.groups()
+            roll = self.rng.random()
+            if roll < self.config.drop_rate:
+                self.counters["dropped"] += 1
+            elif roll < self.config.drop_rate + self.config.malformed_rate:
+                self.counters["malformed"] += 1
+                lines.append(f"Comment {index} is {stub_label(text)[1:-1].lower()}ish")
+            else:
+                lines.append(f"{index}: {stub_label(text)}")
+        return "\n".join(lines)
+
+    async def chat_completions(self, request):
+        self.counters["requests"] += 1
+        wait = self._rate_limited()
+        if wait is not None:
+            self.counters["rate_limited"] += 1
+            return self._error(429, "Rate limit reached", "rate_limit_exceeded",
+                               headers={"retry-after": f"{max(wait, 0.0):.3f}"})
+        body = await request.json()
+        delay = self.config.latency + self.rng.uniform(0, self.config.jitter)
+        if delay:
+            await asyncio.sleep(delay)
+        if self.rng.random() < self.config.error_rate:
+            self.counters["errors"] += 1
+            return self._error(500, "Stub server error", "server_error")
+
+        prompt = "\n".join(m.get("content") or "" for m in body.get("messages", []))
+        content = self.answer(body["messages"][-1].get("content") or "")
+        prompt_tokens, completion_tokens = estimate_tokens(prompt), estimate_tokens(content)
+        return web.json_response({
+            "id": f"chatcmpl-stub-{self.counters['requests']}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens},
+        })
+
+    async def start(self, host="127.0.0.1", port=0):
+        """Start serving; returns the base URL (…/v1) to give the OpenAI client."""
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", self.chat_completions)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, host, port)
+        await site.start()
+        port = self.runner.addresses[0][1]
+        self.url = f"http://{host}:{port}/v1"
+        return self.url
+
+    async def stop(self):
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
+
+
+def synthetic_comments(n, seed=0):
+    """Flattened items with varied Vietnamese-like comment lengths."""
+    rng = random.Random(seed)
+    words = ["hàng", "đẹp", "giao", "nhanh", "chất", "lượng", "tốt", "tệ", "shop", "ổn", "lỗi", "rẻ", "😍"]
+    return [{"global_index": i, "outer_idx": i, "comment_idx": 0,
+             "content": " ".join(rng.choice(words) for _ in range(rng.randint(2, 60)))}
+            for i in range(n)]
+
+
+async def benchmark(n=2000, config=None, concurrency=8, chunk_size=50, batch_tokens=2000, retry_delay=0.1,
+                    client_retries=0):
+    """
+    Label n synthetic comments against an in-process stub.
+    Returns throughput and latency (ClassificationStats), tokens as the cost proxy,
+    accuracy against the stub's labels, and the stub's counters of injected faults.
+    """
+    from openai import AsyncOpenAI
+    server = StubServer(config)
+    url = await server.start()
+    items = synthetic_comments(n)
+    try:
+        client = AsyncOpenAI(api_key="stub", base_url=url, max_retries=client_retries)
+        stats = await classify_async(items, client, chunk_size=chunk_size, concurrency=concurrency,
+                                     batch_tokens=batch_tokens, retry_delay=retry_delay)
+        await client.close()
+    finally:
+        await server.stop()
+    correct = sum(it.get("sentiment") == stub_label(it["content"]) for it in items)
+    result = stats.summary()
+    result["accuracy"] = correct / n if n else 0.0
+    result["server"] = dict(server.counters)
+    return result
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible stub for labeling tests and benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name in ("serve", "bench"):
+        cmd = sub.add_parser(name)
+        cmd.add_argument("--latency", type=float, default=0.2, help="Seconds per request")
+        cmd.add_argument("--jitter", type=float, default=0.1, help="Extra random seconds per request")
+        cmd.add_argument("--rate-limit", type=int, default=None, help="Requests allowed per --rate-window")
+        cmd.add_argument("--rate-window", type=float, default=60.0)
+        cmd.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with HTTP 500")
+        cmd.add_argument("--drop-rate", type=float, default=0.0, help="Fraction of answer lines left out")
+        cmd.add_argument("--malformed-rate", type=float, default=0.0, help="Fraction of answer lines garbled")
+        cmd.add_argument("--seed", type=int, default=0)
+    sub.choices["serve"].add_argument("--host", default="127.0.0.1")
+    sub.choices["serve"].add_argument("--port", type=int, default=8000)
+    bench = sub.choices["bench"]
+    bench.add_argument("-n", "--comments", type=int, default=2000)
+    bench.add_argument("--concurrency", type=int, default=8)
+    bench.add_argument("-c", "--chunk_size", type=int, default=50)
+    bench.add_argument("--batch-tokens", type=int, default=2000)
+    args = parser.parse_args()
+
+    config = StubConfig(latency=args.latency, jitter=args.jitter, rate_limit=args.rate_limit,
+                        rate_window=args.rate_window, error_rate=args.error_rate, drop_rate=args.drop_rate,
+                        malformed_rate=args.malformed_rate, seed=args.seed)
+    if args.command == "serve":
+        async def serve():
+            server = StubServer(config)
+            url = await server.start(args.host, args.port)
+            logging.info(f"Stub listening on {url} (use --base-url {url})")
+            await asyncio.Event().wait()
+        try:
+            asyncio.run(serve())
+        except KeyboardInterrupt:
+            pass
+    else:
+        result = asyncio.run(benchmark(args.comments, config, concurrency=args.concurrency,
+                                       chunk_size=args.chunk_size, batch_tokens=args.batch_tokens or None))
+        print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'scraping'))
+from blob_store import BlobStore, strip_html
+
+
+class TestBlobStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.store = BlobStore(os.path.join(self.tmpdir.name, 'blobs.db'))
+
+    def tearDown(self):
+        self.store.close()
+        self.tmpdir.cleanup()
+
+    def test_offload_deduplicates_identical_content(self):
+        description = '<div><p>Màn hình &amp; pin</p>' + '<p>Chi tiết</p>' * 200 + '</div>'
+        first = self.store.offload({'id': 1, 'description': description, 'warranty_info': ''})
+        second = self.store.offload({'id': 2, 'description': description})
+
+        self.assertNotIn('description', first)
+        self.assertEqual(first['description_hash'], second['description_hash'])
+        self.assertIsNone(first['warranty_info_hash'])
+        self.assertEqual(self.store.blobs_written, 1)
+        self.assertEqual(self.store.duplicates, 1)
+        self.assertLess(self.store.stored_bytes, self.store.raw_bytes)
+
+    def test_lazy_fields_decode_on_access(self):
+        product = self.store.offload({'id': 1, 'description': '<b>Điện thoại</b>  tốt',
+                                      'short_description': 'ngắn'})
+        blobs = self.store.fields(product)
+        self.assertEqual(sorted(blobs), ['description', 'short_description'])
+        self.assertEqual(blobs.cache, {})
+        self.assertEqual(blobs['description'], '<b>Điện thoại</b>  tốt')
+        self.assertEqual(self.store.fields(product, text=True)['description'], 'Điện thoại tốt')
+
+    def test_non_string_values_are_stored_as_json(self):
+        policy = [{'title': 'Đổi trả', 'days': 30}, {'title': 'Bảo hành'}]
+        first = self.store.offload({'id': 1, 'return_and_exchange_policy': policy})
+        second = self.store.offload({'id': 2, 'return_and_exchange_policy': [dict(reversed(list(policy[0].items()))),
+                                                                           policy[1]]})
+
+        content_hash = first['return_and_exchange_policy_hash']
+        self.assertEqual(content_hash, second['return_and_exchange_policy_hash'])
+        self.assertEqual(self.store.blobs_written, 1)
+        self.assertEqual(json.loads(self.store.get(content_hash)), policy)
+        self.assertIn('Đổi trả', self.store.get(content_hash))
+
+    def test_strip_html(self):
+        self.assertEqual(strip_html('<style>p{}</style><p>A&nbsp;B</p>\n<br/>C'), 'A B C')
+        self.assertEqual(strip_html(None), '')
+
+
+if __name__ == '__main__':
+    unittest.main()
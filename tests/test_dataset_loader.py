@@ -0,0 +1,59 @@
+import os
+import sys
+import tempfile
+import unittest
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'scraping'))
+from dataset_loader import load_products, load_reviews
+
+
+class TestDatasetLoader(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.reviews_csv = os.path.join(self.tmpdir.name, 'product_reviews.csv')
+        pd.DataFrame({
+            'product_id': [1, 1, 2],
+            'review_id': [10, 11, None],
+            'title': ['Cực kì hài lòng', 'Hài lòng', 'Cực kì hài lòng'],
+            'content': ['hàng đẹp', '', 'ok'],
+            'rating': [5, 4, 5],
+            'author': ['An', 'Bình', 'Anonymous'],
+            'time': [1758166281, 1758166282, ''],
+            'helpful_count': [0, 2, 0],
+        }).to_csv(self.reviews_csv, index=False, encoding='utf-8-sig')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_reviews_use_explicit_dtypes(self):
+        df = load_reviews(self.reviews_csv, cache=False)
+        self.assertEqual(str(df['product_id'].dtype), 'int64')
+        self.assertEqual(str(df['review_id'].dtype), 'Int64')
+        self.assertEqual(str(df['title'].dtype), 'category')
+        self.assertEqual(str(df['rating'].dtype), 'Int8')
+        self.assertEqual(df['time'].iloc[0], pd.Timestamp('2025-09-18 03:31:21'))
+        self.assertTrue(pd.isna(df['time'].iloc[2]))
+
+    def test_feather_cache_with_projection(self):
+        full = load_reviews(self.reviews_csv)
+        self.assertTrue(os.path.exists(self.reviews_csv + '.feather'))
+        cached = load_reviews(self.reviews_csv, columns=['product_id', 'title', 'time'])
+        self.assertEqual(list(cached.columns), ['product_id', 'title', 'time'])
+        self.assertEqual(str(cached['title'].dtype), 'category')
+        pd.testing.assert_series_equal(cached['time'], full['time'])
+
+    def test_products_projection_without_cache(self):
+        path = os.path.join(self.tmpdir.name, 'extracted_products.csv')
+        pd.DataFrame({'id': [1, 2], 'name': ['a', 'b'], 'price': [1290000, None],
+                      'brand_name': ['Samsung', 'Samsung']}).to_csv(path, index=False)
+        df = load_products(path, columns=['id', 'price', 'brand_name'], cache=False)
+        self.assertEqual(list(df.columns), ['id', 'price', 'brand_name'])
+        self.assertEqual(str(df['price'].dtype), 'Int64')
+        self.assertEqual(str(df['brand_name'].dtype), 'category')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import os
+import sys
+import tempfile
+import unittest
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'scraping'))
+from dimensions import Dimensions
+from extract_data import export_dimensions
+
+
+class TestDimensions(unittest.TestCase):
+
+    def _products(self):
+        samsung = {'id': 18802, 'name': 'Samsung'}
+        seller = {'id': 1, 'name': 'Tiki Trading', 'link': 'https://tiki.vn/cua-hang/tiki-trading'}
+        return [
+            {'id': 1, 'brand': samsung, 'current_seller': seller, 'categories': {'id': 1795, 'name': 'Điện thoại'}},
+            {'id': 2, 'brand': dict(samsung), 'current_seller': dict(seller), 'seller': 'Tiki Trading'},
+            {'id': 3, 'brand': 'Apple', 'seller': None},
+        ]
+
+    def test_encode_dedups_into_integer_keys(self):
+        dims = Dimensions()
+        encoded = dims.encode(pd.DataFrame(self._products()))
+        self.assertNotIn('brand', encoded.columns)
+        self.assertEqual(encoded['brand_key'].tolist(), [1, 1, 2])
+        self.assertEqual(encoded['current_seller_key'].tolist()[:2], [1, 1])
+        # Chuỗi 'Tiki Trading' là cùng seller với dict {'id': 1, 'name': 'Tiki Trading'}
+        self.assertEqual(encoded['seller_key'].tolist()[1], 1)
+        self.assertTrue(pd.isna(encoded['seller_key'].tolist()[2]))
+
+        frames = dims.to_frames()
+        self.assertEqual(frames['brands']['name'].tolist(), ['Samsung', 'Apple'])
+        self.assertEqual(frames['brands']['id'].tolist()[0], 18802)
+        self.assertEqual(len(frames['sellers']), 1)
+
+    def test_natural_key_ignores_listing_fields_and_name_form(self):
+        dims = Dimensions()
+        encoded = dims.encode(pd.DataFrame([
+            {'id': 1, 'current_seller': {'id': 1, 'name': 'Tiki Trading', 'price': 100, 'sku': 'A', 'product_id': 1}},
+            {'id': 2, 'current_seller': {'id': 1, 'name': 'Tiki Trading', 'price': 90, 'sku': 'B', 'product_id': 2}},
+            {'id': 3, 'current_seller': {'seller_id': 2, 'name': 'Shop A'}},
+            {'id': 4, 'current_seller': 'tiki  trading'},
+            {'id': 5, 'current_seller': {'id': 3, 'name': 'Tiki Trading'}},
+        ]))
+        self.assertEqual(encoded['current_seller_key'].tolist(), [1, 1, 2, 1, 3])
+        sellers = dims.to_frames()['sellers']
+        self.assertEqual(sellers['id'].tolist(), [1, 2, 3])
+        self.assertNotIn('price', sellers['raw'][0])
+
+    def test_name_only_entity_gets_id_when_seen(self):
+        dims = Dimensions()
+        encoded = dims.encode(pd.DataFrame([{'brand': 'Samsung'}, {'brand': {'name': 'samsung'}},
+                                            {'brand': {'id': 18802, 'name': 'Samsung'}}]))
+        self.assertEqual(encoded['brand_key'].tolist(), [1, 1, 1])
+        self.assertEqual(dims.to_frames()['brands']['id'].tolist(), [18802])
+
+    def test_decode_reconstructs_nested_shape(self):
+        dims = Dimensions()
+        products = self._products()
+        decoded = dims.decode(dims.encode(pd.DataFrame(products)))
+        self.assertEqual(decoded.loc[0, 'brand'], products[0]['brand'])
+        self.assertEqual(decoded.loc[1, 'current_seller'], products[1]['current_seller'])
+        self.assertEqual(decoded.loc[1, 'seller'], products[1]['current_seller'])
+        self.assertEqual(decoded.loc[2, 'brand'], 'Apple')
+        self.assertIsNone(decoded.loc[2, 'categories'])
+
+    def test_export_keeps_keys_stable_across_runs(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            source = os.path.join(tmpdir, 'products.jsonl')
+            pd.DataFrame(self._products()).to_json(source, orient='records', lines=True, force_ascii=False)
+            export_dimensions(source, tmpdir, chunk_size=2)
+            dims = export_dimensions(source, tmpdir, chunk_size=2)
+            self.assertEqual(len(dims.rows['brands']), 2)
+            fact = pd.read_csv(os.path.join(tmpdir, 'fact_products.csv'), encoding='utf-8-sig')
+            self.assertEqual(fact['brand_key'].tolist(), [1, 1, 2])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,160 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'scraping'))
+from extract_data import (compact_export, export_scraping_data, extract_scraping_data, flatten_reviews,
+                          incremental_export, iter_products, iter_scraping_chunks)
+from review_index import ReviewIndex
+
+
+def make_product(product_id, n_reviews=2):
+    return {
+        'id': product_id,
+        'name': f'Điện thoại {product_id}',
+        'price': 1290000,
+        'brand': {'id': 1, 'name': 'Samsung'},
+        'reviews': [
+            {'id': product_id * 100 + i, 'title': 'Cực kì hài lòng', 'content': 'hàng đẹp',
+             'rating': 5, 'author': 'An', 'time': 1758166281, 'helpful_count': 0}
+            for i in range(n_reviews)
+        ],
+    }
+
+
+class TestExtractData(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.products = [make_product(i) for i in range(1, 8)]
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _write(self, name, text):
+        path = os.path.join(self.tmpdir.name, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        return path
+
+    def test_iter_products_reads_all_formats(self):
+        array_path = self._write('array.json', json.dumps(self.products, ensure_ascii=False, indent=2))
+        jsonl_path = self._write('lines.jsonl', '\n'.join(json.dumps(p) for p in self.products))
+        # _save_data ghi nối tiếp nhiều mảng vào cùng một file
+        concat_path = self._write('concat.json', json.dumps(self.products[:3], indent=2)
+                                  + json.dumps(self.products[3:], indent=2))
+        for path in (array_path, jsonl_path, concat_path):
+            ids = [p['id'] for p in iter_products(path, read_size=64)]
+            self.assertEqual(ids, list(range(1, 8)), path)
+
+    def test_extract_scraping_data(self):
+        path = self._write('array.json', json.dumps(self.products))
+        products_df, reviews_df = extract_scraping_data(path)
+        self.assertEqual(len(products_df), 7)
+        self.assertIn('brand_name', products_df.columns)
+        self.assertEqual(len(reviews_df), 14)
+        self.assertEqual(set(reviews_df['product_id']), set(range(1, 8)))
+
+    def test_flatten_reviews_side_tables(self):
+        products = self.products[:2] + [{'id': 99, 'reviews': []}]
+        products[0]['reviews'][0]['images'] = [{'id': 5, 'full_path': 'a.jpg'}, {'id': 6, 'full_path': 'b.jpg'}]
+        products[0]['reviews'][0]['timeline'] = {'delivery_date': '2025-09-18'}
+        reviews_df, tables = flatten_reviews(pd.DataFrame(products), side_tables=True)
+
+        self.assertEqual(list(reviews_df.columns)[:2], ['product_id', 'review_id'])
+        self.assertEqual(list(reviews_df['product_id']), [1, 1, 2, 2])
+        self.assertEqual(list(tables['review_images']['full_path']), ['a.jpg', 'b.jpg'])
+        self.assertEqual(list(tables['review_images']['review_id']), [100, 100])
+        self.assertEqual(tables['review_timeline'].to_dict('records'),
+                         [{'review_id': 100, 'product_id': 1, 'delivery_date': '2025-09-18'}])
+
+    def test_iter_scraping_chunks(self):
+        path = self._write('lines.jsonl', '\n'.join(json.dumps(p) for p in self.products))
+        sizes = [(len(p), len(r)) for p, r in iter_scraping_chunks(path, chunk_size=3)]
+        self.assertEqual(sizes, [(3, 6), (3, 6), (1, 2)])
+
+    def test_export_csv_and_parquet(self):
+        path = self._write('array.json', json.dumps(self.products))
+        csv_dir = os.path.join(self.tmpdir.name, 'csv')
+        counts = export_scraping_data(path, csv_dir, fmt='csv', chunk_size=3)
+        self.assertEqual(counts, {'products': 7, 'reviews': 14})
+        reviews = pd.read_csv(os.path.join(csv_dir, 'product_reviews.csv'), encoding='utf-8-sig')
+        self.assertEqual(len(reviews), 14)
+        self.assertEqual(list(reviews.columns)[0], 'product_id')
+
+        parquet_dir = os.path.join(self.tmpdir.name, 'parquet')
+        counts = export_scraping_data(path, parquet_dir, fmt='parquet', chunk_size=3)
+        self.assertEqual(counts, {'products': 7, 'reviews': 14})
+        reviews = pd.read_parquet(os.path.join(parquet_dir, 'reviews'), columns=['review_id', 'time'])
+        self.assertEqual(len(reviews), 14)
+
+    def test_incremental_export_ignores_chunk_dtypes(self):
+        path = self._write('tiki_product.json', json.dumps(self.products[:3]))
+        out_dir = os.path.join(self.tmpdir.name, 'out')
+        self.assertEqual(incremental_export(path, out_dir), {'products': 3, 'reviews': 6})
+
+        # Giá null và review không có id làm cột thành float nhưng các dòng cũ không đổi
+        extra = make_product(4)
+        extra['price'] = None
+        extra['reviews'][0]['id'] = None
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(self.products[:3] + [extra]))
+        self.assertEqual(incremental_export(path, out_dir), {'products': 1, 'reviews': 2})
+
+    def test_incremental_export_parquet(self):
+        path = self._write('tiki_product.json', json.dumps(self.products[:3]))
+        out_dir = os.path.join(self.tmpdir.name, 'parquet')
+        self.assertEqual(incremental_export(path, out_dir, fmt='parquet'), {'products': 3, 'reviews': 6})
+        self.assertEqual(incremental_export(path, out_dir, fmt='parquet'), {'products': 0, 'reviews': 0})
+
+        updated = [dict(p) for p in self.products[:4]]
+        updated[0]['price'] = 990000
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(updated))
+        self.assertEqual(incremental_export(path, out_dir, fmt='parquet'), {'products': 2, 'reviews': 2})
+
+        products = pd.read_parquet(os.path.join(out_dir, 'products'), columns=['id', 'price'])
+        self.assertEqual(sorted(products['id']), [1, 1, 2, 3, 4])
+        latest = products.drop_duplicates(subset=['id'], keep='last').set_index('id')['price']
+        self.assertEqual(sorted(latest.tolist()), [990000.0, 1290000.0, 1290000.0, 1290000.0])
+
+    def test_export_with_review_index_appends_reviews(self):
+        csv_dir = os.path.join(self.tmpdir.name, 'csv')
+        index_file = os.path.join(self.tmpdir.name, 'review_index.txt')
+        path = self._write('first.json', json.dumps(self.products[:2]))
+        export_scraping_data(path, csv_dir, fmt='csv', review_index=ReviewIndex(index_file))
+
+        # Lần chạy sau chỉ còn review mới nhưng review đã xuất vẫn phải còn trong CSV
+        path = self._write('second.json', json.dumps(self.products[:3]))
+        counts = export_scraping_data(path, csv_dir, fmt='csv', review_index=ReviewIndex(index_file))
+        self.assertEqual(counts, {'products': 3, 'reviews': 2})
+        reviews = pd.read_csv(os.path.join(csv_dir, 'product_reviews.csv'), encoding='utf-8-sig')
+        self.assertEqual(list(reviews['review_id']), [100, 101, 200, 201, 300, 301])
+
+    def test_incremental_export_appends_only_new_or_changed_rows(self):
+        path = self._write('tiki_product.json', json.dumps(self.products[:3]))
+        out_dir = os.path.join(self.tmpdir.name, 'out')
+        self.assertEqual(incremental_export(path, out_dir), {'products': 3, 'reviews': 6})
+        self.assertEqual(incremental_export(path, out_dir), {'products': 0, 'reviews': 0})
+
+        # _save_data nối thêm toàn bộ danh sách: 3 sản phẩm cũ (1 đổi giá) + 1 sản phẩm mới
+        updated = [dict(p) for p in self.products[:4]]
+        updated[0]['price'] = 990000
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(updated))
+        self.assertEqual(incremental_export(path, out_dir), {'products': 2, 'reviews': 2})
+
+        products = pd.read_csv(os.path.join(out_dir, 'extracted_products.csv'), encoding='utf-8-sig')
+        self.assertEqual(list(products['id']), [1, 2, 3, 1, 4])
+        compact_export(out_dir)
+        products = pd.read_csv(os.path.join(out_dir, 'extracted_products.csv'), encoding='utf-8-sig')
+        self.assertEqual(sorted(products['id']), [1, 2, 3, 4])
+        self.assertEqual(products.loc[products['id'] == 1, 'price'].item(), 990000)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,195 @@
+import asyncio
+import os
+import sys
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+from json_labeling import (MAX_COMMENT_TOKENS, LabelCache, LabelJournal, RateLimiter, TextDeduper, build_prompt,
+                           classify_async, estimate_tokens, flatten_comments, normalize_text, pack_batches,
+                           parse_answer, restore_comments)
+
+
+class FakeClient:
+    """Async stand-in for the OpenAI client: labels every comment in the prompt as POS."""
+
+    def __init__(self, delay=0.01):
+        self.delay = delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, model, messages, temperature):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(self.delay)
+        self.in_flight -= 1
+        lines = [line for line in messages[-1]['content'].splitlines() if line.startswith('Comment ')]
+        reply = '\n'.join(f"{line.split(':')[0].replace('Comment ', '')}: <POS>" for line in lines)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=reply))])
+
+
+class FlakyClient(FakeClient):
+    """Drops the last comment of every reply, answers garbage once, and fails the first call."""
+
+    def __init__(self):
+        super().__init__(delay=0)
+        self.calls = 0
+
+    async def create(self, model, messages, temperature):
+        self.calls += 1
+        if self.calls == 1:
+            raise RuntimeError('503 Service Unavailable')
+        if self.calls == 2:
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content='Xin lỗi, tôi không hiểu.'))])
+        response = await super().create(model, messages, temperature)
+        lines = response.choices[0].message.content.splitlines()
+        reply = lines if len(lines) == 1 else lines[:-1] + ['999: <NEG>']
+        response.choices[0].message.content = '\n'.join(reply)
+        return response
+
+
+class BrokenClient:
+    def __init__(self):
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, model, messages, temperature):
+        self.calls += 1
+        raise RuntimeError('401 Unauthorized')
+
+
+def make_data(n_products=3, n_comments=7):
+    return [{'comments': [{'content': f'bình luận {p}-{c}'} for c in range(n_comments)]}
+            for p in range(n_products)]
+
+
+class TestJsonLabeling(unittest.TestCase):
+
+    def test_parse_answer(self):
+        text = "Comment 1: <POS>\n2: negative\nrác\n3 <NEU>\nabc: <POS>\n1: <NEU>"
+        self.assertEqual(parse_answer(text), {1: '<NEU>', 2: '<NEG>'})
+
+    def test_classify_async_labels_everything_concurrently(self):
+        flattened = flatten_comments(make_data())
+        client = FakeClient()
+        stats = asyncio.run(classify_async(flattened, client, chunk_size=2, concurrency=4))
+        self.assertTrue(all(it['sentiment'] == '<POS>' for it in flattened))
+        self.assertEqual(stats.labeled, len(flattened))
+        self.assertEqual(stats.requests, 11)
+        self.assertLessEqual(client.max_in_flight, 4)
+        self.assertGreater(client.max_in_flight, 1)
+
+    def test_classify_async_requeues_missing_and_splits_garbage(self):
+        flattened = flatten_comments(make_data(n_products=2, n_comments=4))
+        labeled = []
+        stats = asyncio.run(classify_async(flattened, FlakyClient(), chunk_size=4, concurrency=1,
+                                           retry_delay=0, on_chunk=labeled.extend))
+        self.assertTrue(all(it['sentiment'] == '<POS>' for it in flattened))
+        self.assertEqual(stats.unlabeled, [])
+        self.assertEqual(stats.errors, 1)
+        self.assertEqual(stats.splits, 1)
+        self.assertGreater(stats.requeued, 0)
+        self.assertGreater(stats.invalid, 0)
+        self.assertNotIn(999, {it['global_index'] for it in labeled})
+
+    def test_classify_async_gives_up_after_retries(self):
+        flattened = flatten_comments(make_data(n_products=1, n_comments=5))
+        client = BrokenClient()
+        stats = asyncio.run(classify_async(flattened, client, chunk_size=2, retry_delay=0, max_retries=2))
+        self.assertEqual(client.calls, 9)  # 3 batches x 3 attempts, then stop
+        self.assertEqual(sorted(stats.unlabeled), list(range(5)))
+        self.assertFalse(any(it.get('sentiment') for it in flattened))
+
+    def test_pack_batches_by_token_budget(self):
+        short = [{'global_index': i, 'content': 'ok'} for i in range(30)]
+        self.assertEqual([len(b) for b in pack_batches(short, target_tokens=2000, max_items=12)], [12, 12, 6])
+
+        long_text = 'rất ' * 200
+        items = [{'global_index': i, 'content': long_text} for i in range(5)]
+        items.insert(2, {'global_index': 99, 'content': 'x' * 100000})
+        batches = pack_batches(items, target_tokens=600, max_items=50)
+        self.assertEqual([len(b) for b in batches], [2, 1, 2, 1])
+        self.assertEqual(batches[1][0]['global_index'], 99)  # oversize item goes alone
+        self.assertEqual([it['global_index'] for b in batches for it in b], [0, 1, 99, 2, 3, 4])
+        for batch in batches:
+            if len(batch) > 1:
+                self.assertLessEqual(estimate_tokens(build_prompt(batch)), 600)
+        # ... and is clipped in the prompt, on one line
+        prompt = build_prompt(batches[1])
+        self.assertLess(estimate_tokens(prompt), MAX_COMMENT_TOKENS + 100)
+        self.assertEqual(len([line for line in prompt.splitlines() if line.startswith('Comment ')]), 1)
+
+    def test_rate_limiter_waits_for_window(self):
+        now = [0.0]
+        waits = []
+
+        async def fake_sleep(seconds):
+            waits.append(seconds)
+            now[0] += seconds
+
+        async def run():
+            limiter = RateLimiter(rpm=2, tpm=100, clock=lambda: now[0], sleep=fake_sleep)
+            await limiter.acquire(10)
+            await limiter.acquire(10)
+            await limiter.acquire(10)   # rpm exhausted: waits a full window
+            await limiter.acquire(95)   # tpm exceeded: waits again
+        asyncio.run(run())
+        self.assertEqual(waits, [60.0, 60.0])
+
+    def test_journal_resume_skips_labeled_comments(self):
+        data = make_data()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            journal = LabelJournal(os.path.join(tmpdir, 'labels.journal.jsonl'))
+            first = flatten_comments(data)
+            for it in first[:5]:
+                it['sentiment'] = '<NEG>'
+            journal.append(first[:5])
+            # Simulate a torn write from a crash mid-line
+            with open(journal.path, 'a', encoding='utf-8') as f:
+                f.write('{"global_index": 5, "outer')
+
+            resumed = flatten_comments(data)
+            resumed[3]['content'] = 'đã sửa'  # changed comment: its journal label is not reused
+            self.assertEqual(journal.apply(resumed), 4)
+            todo = [it for it in resumed if not it.get('sentiment')]
+            asyncio.run(classify_async(todo, FakeClient(), chunk_size=4, on_chunk=journal.append))
+
+            restore_comments(data, resumed)
+            labels = [c['sentiment'] for c in data[0]['comments']]
+            self.assertEqual(labels, ['<NEG>', '<NEG>', '<NEG>', '<POS>', '<NEG>', '<POS>', '<POS>'])
+            self.assertEqual(len(journal.load()), len(resumed))
+
+    def test_normalize_text(self):
+        self.assertEqual(normalize_text('Cực kì  hài lòng'), normalize_text('cuc ki hai long'))
+        self.assertEqual(normalize_text('Tốt😍😍😍'), normalize_text('tốt 😍'))
+        self.assertEqual(normalize_text('👍🏻👍'), '👍')
+        self.assertNotEqual(normalize_text('hàng đẹp'), normalize_text('hàng xấu'))
+
+    def test_dedup_and_cache_reduce_requests(self):
+        data = [{'comments': [{'content': 'Cực kì hài lòng'}, {'content': 'cuc ki hai long'},
+                              {'content': 'hàng đẹp'}, {'content': '😍😍'}, {'content': '😍'}]}]
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache = LabelCache(os.path.join(tmpdir, 'label_cache.json'))
+            deduper = TextDeduper(cache)
+            flattened = flatten_comments(data)
+            todo, cached = deduper.prepare(flattened)
+            self.assertEqual((len(todo), len(cached)), (3, 0))
+            labeled = []
+            client = FakeClient()
+            stats = asyncio.run(classify_async(todo, client, chunk_size=10,
+                                               on_chunk=lambda chunk: labeled.extend(deduper.fan_out(chunk))))
+            self.assertEqual(stats.requests, 1)
+            self.assertEqual(len(labeled), 5)
+            self.assertTrue(all(it['sentiment'] == '<POS>' for it in flattened))
+            cache.save()
+
+            # Next run: everything comes from the persistent cache
+            again = flatten_comments(data)
+            todo, cached = TextDeduper(LabelCache(cache.path)).prepare(again)
+            self.assertEqual((len(todo), len(cached)), (0, 5))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'scraping'))
+from keyword_stats import KeywordStats
+
+
+class TestKeywordStats(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.stats_file = os.path.join(self.tmpdir.name, 'keyword_stats.json')
+        self.stats = KeywordStats(self.stats_file)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _keywords(self):
+        return [
+            {'keyword': 'vivo điện thoại cao cấp', 'category': 'phone', 'max_products': 50, 'sleep': 5},
+            {'keyword': 'samsung điện thoại giá rẻ', 'category': 'phone', 'max_products': 50, 'sleep': 5},
+            {'keyword': 'ốp lưng', 'category': 'accessory', 'max_products': 30, 'sleep': 5},
+        ]
+
+    def test_new_ratio_counts_known_search_hits(self):
+        products = [{'id': 1, 'reviews': [{}, {}]}, {'id': 2, 'reviews': []}]
+        first = self.stats.record('a', products, requests=5)
+        second = self.stats.record('a', [{'id': 3, 'reviews': [{}]}], requests=7, known_products=3)
+        self.assertEqual(first, {'new_products': 2, 'new_reviews': 2, 'requests': 5})
+        self.assertEqual(second, {'new_products': 1, 'new_reviews': 1, 'requests': 7})
+        # EMA của 2/2 và 1/4 kết quả tìm kiếm là mới
+        self.assertAlmostEqual(self.stats.keywords['a']['new_ratio'], 0.625)
+        self.assertEqual(self.stats.keywords['a']['new_products'], 3)
+        self.assertNotIn('products', self.stats.keywords['a'])
+
+    def test_all_known_search_hits_give_zero_ratio(self):
+        self.stats.record('a', [], requests=1, known_products=10)
+        self.assertEqual(self.stats.keywords['a']['new_ratio'], 0.0)
+        self.assertIsNone(self.stats.keywords['a']['requests_per_product'])
+
+    def test_prioritize_orders_by_yield_and_shrinks_low_yield(self):
+        self.stats.record('vivo điện thoại cao cấp', [{'id': 1}, {'id': 100}], requests=20, known_products=8)
+        self.stats.record('samsung điện thoại giá rẻ', [{'id': i} for i in range(2, 12)], requests=20)
+        planned = self.stats.prioritize(self._keywords())
+
+        # Keyword chưa có thống kê được chạy trước, keyword yield thấp xuống cuối
+        self.assertEqual([k['keyword'] for k in planned],
+                         ['ốp lưng', 'samsung điện thoại giá rẻ', 'vivo điện thoại cao cấp'])
+        self.assertEqual(planned[1]['max_products'], 50)
+        self.assertEqual(planned[2]['max_products'], 20)
+
+    def test_prioritize_skips_keywords_over_budget(self):
+        self.stats.record('vivo điện thoại cao cấp', [{'id': 1}], requests=3)
+        planned = self.stats.prioritize(self._keywords(), request_budget=200)
+        self.assertNotIn('vivo điện thoại cao cấp', [k['keyword'] for k in planned])
+
+    def test_save_and_reload(self):
+        self.stats.record('ốp lưng', [{'id': 7, 'reviews': [{}]}], requests=3)
+        self.stats.save()
+        reloaded = KeywordStats(self.stats_file)
+        self.assertEqual(reloaded.keywords['ốp lưng']['runs'], 1)
+        self.assertEqual(reloaded.keywords['ốp lưng']['new_ratio'], 1.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,151 @@
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+from label_stream import (LabelSidecar, SidecarLabelCache, detect_format, iter_records, label_stream,
+                          label_stream_api, read_labels)
+from stub_api import StubServer, stub_label, synthetic_comments
+
+
+def label_all(label='<POS>', limit=None):
+    """classify() stand-in: labels up to `limit` items per call, one chunk at a time."""
+    calls = []
+
+    def classify(items, on_chunk):
+        calls.append(len(items))
+        for it in items[:limit]:
+            it['sentiment'] = label
+        on_chunk(items)
+    return classify, calls
+
+
+class TestLabelStream(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.dir = self.tmpdir.name
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.dir, name)
+
+    def test_formats_share_review_keys(self):
+        products = [{'id': 1, 'reviews': [{'id': 10, 'content': 'tốt'}, {'id': 11, 'content': ' '}]},
+                    {'id': 2, 'reviews': [{'id': 12, 'content': 'tệ'}]}]
+        with open(self.path('tiki.jsonl'), 'w', encoding='utf-8') as f:
+            f.writelines(json.dumps(p, ensure_ascii=False) + '\n' for p in products)
+        pd.DataFrame({'product_id': [1, 1, 2], 'review_id': [10, 11, 12], 'title': ['a', 'b', 'c'],
+                      'content': ['tốt', None, 'tệ']}).to_csv(self.path('reviews.csv'), index=False)
+        with open(self.path('shopee.json'), 'w', encoding='utf-8') as f:
+            json.dump([{'link': 'https://shopee.vn/p', 'comments': [{'author': 'an', 'content': 'ok'}]}], f)
+
+        self.assertEqual(detect_format(self.path('tiki.jsonl')), 'tiki')
+        self.assertEqual(detect_format(self.path('reviews.csv')), 'reviews')
+        self.assertEqual(detect_format(self.path('shopee.json')), 'shopee')
+
+        tiki = list(iter_records(self.path('tiki.jsonl')))
+        table = list(iter_records(self.path('reviews.csv')))
+        self.assertEqual([r['key'] for r in tiki], ['id:10', 'id:11', 'id:12'])
+        self.assertEqual(tiki, table)
+        shopee = list(iter_records(self.path('shopee.json')))
+        self.assertTrue(shopee[0]['key'].startswith('fp:'))
+
+    def test_sidecar_labels_and_resume(self):
+        contents = ['tốt', 'tệ', 'tốt', 'bình thường', 'tốt lắm', 'ổn']
+        pd.DataFrame({'product_id': 1, 'review_id': range(len(contents)),
+                      'content': contents}).to_csv(self.path('reviews.csv'), index=False)
+        sidecar = LabelSidecar(self.path('reviews.labels.db'))
+
+        # First run labels only the first representative of each window
+        classify, calls = label_all(limit=1)
+        totals = label_stream(iter_records(self.path('reviews.csv')), sidecar, classify, window=3)
+        self.assertEqual(calls, [2, 3])  # duplicate 'tốt' collapsed in the first window
+        self.assertEqual(totals['labeled'], 3)
+        self.assertEqual(len(sidecar), 3)
+
+        # Second run only sends what is still unlabeled
+        classify, calls = label_all('<NEU>')
+        label_stream(iter_records(self.path('reviews.csv')), sidecar, classify, window=3)
+        self.assertEqual(calls, [1, 2])
+        sidecar.close()
+
+        labels = read_labels(self.path('reviews.labels.db')).set_index('review_key')['sentiment']
+        self.assertEqual(labels.to_dict(), {'id:0': '<POS>', 'id:1': '<NEU>', 'id:2': '<POS>',
+                                            'id:3': '<POS>', 'id:4': '<NEU>', 'id:5': '<NEU>'})
+
+    def test_edited_review_is_relabeled(self):
+        sidecar = LabelSidecar(self.path('labels.db'))
+        classify, calls = label_all()
+        label_stream([{'key': 'id:1', 'content': 'tốt'}], sidecar, classify)
+        label_stream([{'key': 'id:1', 'content': 'tốt'}], sidecar, classify)
+        label_stream([{'key': 'id:1', 'content': 'hàng lỗi'}], sidecar, classify)
+        self.assertEqual(calls, [1, 1])
+        sidecar.close()
+
+    def test_async_classify_overlaps_windows(self):
+        sidecar = LabelSidecar(self.path('labels.db'))
+        active = {'now': 0, 'max': 0}
+
+        async def classify(items, on_chunk):
+            active['now'] += 1
+            active['max'] = max(active['max'], active['now'])
+            await asyncio.sleep(0.01)
+            for it in items:
+                it['sentiment'] = '<POS>'
+            on_chunk(items)
+            active['now'] -= 1
+
+        records = [{'key': f'id:{i}', 'content': f'review {i}'} for i in range(6)]
+        totals = label_stream(records, sidecar, classify, window=2)
+        self.assertEqual(totals['labeled'], 6)
+        self.assertEqual(active['max'], 2)
+        sidecar.close()
+
+    def test_label_cache_lives_in_sidecar(self):
+        sidecar = LabelSidecar(self.path('labels.db'))
+        classify, calls = label_all()
+        label_stream([{'key': 'id:1', 'content': 'Hàng  ĐẸP'}], sidecar, classify, cache=SidecarLabelCache(sidecar))
+        sidecar.close()
+
+        sidecar = LabelSidecar(self.path('labels.db'))
+        cache = SidecarLabelCache(sidecar)
+        totals = label_stream([{'key': 'id:2', 'content': 'hàng đẹp'}], sidecar, classify, cache=cache)
+        self.assertEqual((calls, totals['cached'], len(cache)), ([1], 1, 1))
+        sidecar.close()
+
+    def test_api_stream_shares_client_across_windows(self):
+        async def run():
+            from openai import AsyncOpenAI
+            server = StubServer()
+            url = await server.start()
+            client = AsyncOpenAI(api_key='stub', base_url=url, max_retries=0)
+            records = [{'key': f'id:{it["global_index"]}', 'content': it['content']}
+                       for it in synthetic_comments(200)]
+            try:
+                totals, stats = await label_stream_api(records, sidecar, client, window=50, concurrency=4,
+                                                       chunk_size=20, retry_delay=0.01)
+            finally:
+                await client.close()
+                await server.stop()
+            return records, totals, stats
+
+        sidecar = LabelSidecar(self.path('labels.db'))
+        records, totals, stats = asyncio.run(run())
+        labels = read_labels(self.path('labels.db')).set_index('review_key')['sentiment']
+        self.assertEqual(len(labels), len(records))
+        self.assertTrue(all(labels[r['key']] == stub_label(r['content']) for r in records))
+        # One ClassificationStats for the whole stream, not one per window
+        self.assertEqual(stats.labeled, totals['sent'])
+        sidecar.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
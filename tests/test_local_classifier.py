@@ -0,0 +1,81 @@
+import json
+import os
+import random
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+from local_classifier import LABELS, LocalClassifier, evaluate, hash_features, load_labeled, split_holdout
+
+PHRASES = {
+    '<POS>': ['hàng đẹp', 'rất hài lòng', 'giao nhanh', 'chất lượng tốt', 'tuyệt vời', 'đáng tiền'],
+    '<NEG>': ['hàng lỗi', 'rất thất vọng', 'giao chậm', 'chất lượng kém', 'phí tiền', 'hỏng'],
+    '<NEU>': ['bình thường', 'tạm được', 'đã nhận hàng', 'chưa dùng thử', 'không có gì', 'ổn'],
+}
+
+
+def make_corpus(n, seed=0):
+    rng = random.Random(seed)
+    texts, labels = [], []
+    for _ in range(n):
+        label = rng.choice(LABELS)
+        texts.append(' '.join(rng.sample(PHRASES[label], 2)) + rng.choice([' shop', ' ạ', '']))
+        labels.append(label)
+    return texts, labels
+
+
+class TestLocalClassifier(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        texts, labels = make_corpus(3000)
+        cls.model = LocalClassifier(n_features=1 << 14).fit(texts, labels, epochs=3)
+
+    def test_hash_features_rows_are_normalized(self):
+        indptr, indices, values = hash_features(['rất hài lòng', '', 'ok'], n_features=1 << 10)
+        self.assertEqual(list(indptr[:3]), [0, 5, 5])  # 3 unigrams + 2 bigrams, then an empty row
+        self.assertAlmostEqual(float((values[:5] ** 2).sum()), 1.0, places=5)
+        self.assertTrue((indices < 1 << 10).all())
+
+    def test_learns_and_reports(self):
+        texts, labels = make_corpus(500, seed=1)
+        report = evaluate(self.model, texts, labels, threshold=0.9)
+        self.assertGreater(report['accuracy'], 0.95)
+        self.assertEqual(sum(map(sum, report['confusion'])), 500)
+        self.assertGreater(report['coverage'], 0.5)
+
+    def test_route_labels_only_confident_items(self):
+        items = [{'global_index': 0, 'content': 'hàng đẹp giao nhanh'},
+                 {'global_index': 1, 'content': 'xyz'}]
+        confident, uncertain = self.model.route(items, threshold=0.9)
+        self.assertEqual([it['global_index'] for it in confident], [0])
+        self.assertEqual(confident[0]['sentiment'], '<POS>')
+        self.assertEqual([it['global_index'] for it in uncertain], [1])
+        self.assertNotIn('sentiment', uncertain[0])
+
+    def test_save_load_round_trip(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'model.npz')
+            self.model.save(path)
+            loaded = LocalClassifier.load(path)
+        texts, _ = make_corpus(50, seed=2)
+        self.assertEqual(loaded.predict(texts)[0], self.model.predict(texts)[0])
+
+    def test_load_labeled_and_split(self):
+        data = [{'comments': [{'content': 'tốt', 'sentiment': '<POS>'}, {'content': 'chưa gán'},
+                              {'content': ' ', 'sentiment': '<NEG>'}]}, 'rác']
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'labeled.json')
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            texts, labels = load_labeled([path])
+        self.assertEqual((texts, labels), (['tốt'], ['<POS>']))
+
+        train_x, train_y, test_x, test_y = split_holdout(list('abcdefghij'), list('0123456789'), 0.3)
+        self.assertEqual((len(train_x), len(test_x)), (7, 3))
+        self.assertEqual(sorted(train_x + test_x), list('abcdefghij'))
+
+
+if __name__ == '__main__':
+    unittest.main()
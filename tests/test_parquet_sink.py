@@ -0,0 +1,70 @@
+import os
+import sys
+import tempfile
+import unittest
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'scraping'))
+from parquet_sink import ParquetSink
+
+
+def make_product(product_id, keyword):
+    return {'id': product_id, 'name': f'Sản phẩm {product_id}', 'price': '1.299.000', 'rating': 4.5,
+            'brand': {'id': 3, 'name': 'Apple'}, 'search_keyword': keyword, 'search_category': 'phone',
+            'reviews': [{'id': product_id * 10, 'content': 'hàng đẹp', 'rating': 5, 'time': 1758166281}],
+            'specifications': [{'name': 'RAM', 'value': '8GB'}]}
+
+
+class TestParquetSink(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.sink = ParquetSink(self.tmpdir.name, row_group_size=2)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def part_file(self, table):
+        table_dir = os.path.join(self.tmpdir.name, table)
+        files = os.listdir(table_dir)
+        self.assertEqual(len(files), 1)
+        return pq.ParquetFile(os.path.join(table_dir, files[0]))
+
+    def test_round_trip_keeps_schema_and_full_row_groups(self):
+        # Ba keyword liên tiếp dùng chung sink như batch_scraper, không flush giữa các keyword
+        product_id = 1
+        for keyword, count in [('iphone', 2), ('samsung', 1), ('oppo', 2)]:
+            for _ in range(count):
+                self.sink.write_product(make_product(product_id, keyword))
+                product_id += 1
+        self.sink.close()
+
+        products = self.part_file('products')
+        self.assertEqual(products.schema_arrow, self.sink.schemas['products'])
+        self.assertEqual([products.metadata.row_group(i).num_rows for i in range(products.num_row_groups)],
+                         [2, 2, 1])
+
+        table = products.read()
+        self.assertEqual(table.column('id').to_pylist(), [1, 2, 3, 4, 5])
+        self.assertEqual(table.column('price').to_pylist(), [1299000.0] * 5)
+        self.assertEqual(table.column('rating').to_pylist(), [4.5] * 5)
+        self.assertEqual(table.column('search_keyword').type, pa.dictionary(pa.int32(), pa.string()))
+        self.assertEqual(table.column('search_keyword').to_pylist(),
+                         ['iphone', 'iphone', 'samsung', 'oppo', 'oppo'])
+
+        reviews = self.part_file('reviews')
+        self.assertEqual(reviews.schema_arrow, self.sink.schemas['reviews'])
+        self.assertEqual(reviews.read().column('review_id').to_pylist(), [10, 20, 30, 40, 50])
+
+    def test_review_time_is_epoch_seconds(self):
+        self.sink.write_product(make_product(1, 'iphone'))
+        self.sink.close()
+        reviews = pd.read_parquet(os.path.join(self.tmpdir.name, 'reviews'), columns=['time'])
+        self.assertEqual(reviews['time'].iloc[0], pd.Timestamp('2025-09-18 03:31:21'))
+
+
+if __name__ == '__main__':
+    unittest.main()
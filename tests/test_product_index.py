@@ -0,0 +1,53 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'scraping'))
+from product_index import ProductIndex
+
+
+class TestProductIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.index_file = os.path.join(self.tmpdir.name, 'product_index.jsonl')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_add_returns_true_only_for_new_products(self):
+        index = ProductIndex(self.index_file)
+        self.assertTrue(index.add(277944334, 'samsung điện thoại giá rẻ', 'phone'))
+        self.assertFalse(index.add(277944334, 'ốp lưng', 'accessory'))
+        self.assertIn(277944334, index)
+        self.assertNotIn(1, index)
+        self.assertEqual(index.get(277944334), {
+            'keywords': ['samsung điện thoại giá rẻ', 'ốp lưng'],
+            'categories': ['phone', 'accessory'],
+        })
+
+    def test_index_persists_memberships(self):
+        index = ProductIndex(self.index_file)
+        index.add(1, 'a', 'phone')
+        index.add(1, 'a', 'phone')
+        index.add(2, 'b', 'laptop')
+        with open(self.index_file, encoding='utf-8') as f:
+            self.assertEqual(len(f.readlines()), 2)
+
+        reloaded = ProductIndex(self.index_file)
+        self.assertEqual(len(reloaded), 2)
+        self.assertEqual(reloaded.get(2), {'keywords': ['b'], 'categories': ['laptop']})
+
+
+    def test_deferred_adds_are_written_on_commit(self):
+        index = ProductIndex(self.index_file)
+        index.add(1, 'a', 'phone', commit=False)
+        self.assertIn(1, index)
+        self.assertEqual(len(ProductIndex(self.index_file)), 0)
+        index.commit()
+        self.assertEqual(len(ProductIndex(self.index_file)), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
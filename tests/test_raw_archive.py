@@ -0,0 +1,77 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'scraping'))
+from extract_data import iter_products
+from raw_archive import RawArchive, iter_index, read_record
+from reparse import reparse_archive
+from tiki_parse import parse_product_details, parse_reviews_response
+
+
+def search_body(ids):
+    return {'data': [{'id': i, 'name': f'Điện thoại {i}', 'url_path': f'dien-thoai-p{i}.html',
+                      'price': 1000 * i, 'quantity_sold': {'value': 3}, 'seller': {'name': 'Tiki'}}
+                     for i in ids]}
+
+
+def product_body(product_id):
+    return {'id': product_id, 'description': '<p>Mô tả</p>', 'brand': {'id': 1, 'name': 'Samsung'},
+            'specifications': [{'attributes': [{'name': 'RAM', 'value': '8 GB'}]}]}
+
+
+def reviews_body(ids):
+    return {'data': [{'id': i, 'content': 'hàng đẹp', 'rating': 5, 'created_by': {'name': 'An'},
+                      'created_at': 1758166281} for i in ids]}
+
+
+class TestRawArchive(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.archive_dir = os.path.join(self.tmpdir.name, 'raw')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_parse_functions(self):
+        details = parse_product_details(product_body(1))
+        self.assertEqual(details['specifications'], [{'name': 'RAM', 'value': '8 GB'}])
+        self.assertEqual(details['brand'], {'id': 1, 'name': 'Samsung'})
+        reviews = parse_reviews_response(reviews_body([1, 2, 3]), limit=2)
+        self.assertEqual([r['id'] for r in reviews], [1, 2])
+        self.assertEqual(reviews[0]['author'], 'An')
+
+    def test_index_and_random_access(self):
+        archive = RawArchive(self.archive_dir, segment_bytes=200)
+        archive.write('product_api', 'https://tiki.vn/api/v2/products/1', product_body(1), product_id=1, status=200)
+        archive.write('product_html', 'https://tiki.vn/p1.html', '<html>p1</html>', product_id=1)
+        archive.close()
+
+        entries = list(iter_index(self.archive_dir, product_id=1))
+        self.assertEqual([e['kind'] for e in entries], ['product_api', 'product_html'])
+        # Segment nhỏ nên mỗi bản ghi nằm ở segment riêng
+        self.assertNotEqual(entries[0]['segment'], entries[1]['segment'])
+        self.assertEqual(read_record(self.archive_dir, entries[1])['body'], '<html>p1</html>')
+
+    def test_reparse_rebuilds_products_in_parallel(self):
+        archive = RawArchive(self.archive_dir, segment_bytes=300)
+        archive.write('search_api', 'https://tiki.vn/api/v2/products?q=samsung&limit=40', search_body([1, 2]))
+        archive.write('product_api', 'https://tiki.vn/api/v2/products/1', product_body(1), product_id=1)
+        archive.write('reviews_api', 'https://tiki.vn/api/v2/reviews?product_id=1&page=1', reviews_body([10, 11]), product_id=1)
+        archive.write('reviews_api', 'https://tiki.vn/api/v2/reviews?product_id=1&page=2', reviews_body([11, 12]), product_id=1)
+        archive.write('search_html', 'https://tiki.vn/search?q=samsung', '<html></html>')
+        archive.close()
+
+        output = os.path.join(self.tmpdir.name, 'reparsed.jsonl.gz')
+        self.assertEqual(reparse_archive(self.archive_dir, output, workers=2), 2)
+        products = {p['id']: p for p in iter_products(output)}
+        self.assertEqual(products[1]['search_keyword'], 'samsung')
+        self.assertEqual(products[1]['brand'], {'id': 1, 'name': 'Samsung'})
+        self.assertEqual(sorted(r['id'] for r in products[1]['reviews']), [10, 11, 12])
+        self.assertEqual(products[2]['reviews'], [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,35 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'scraping'))
+from records import product_row, to_float
+
+
+class TestRecords(unittest.TestCase):
+
+    def test_to_float_keeps_decimals(self):
+        self.assertEqual(to_float('4.5'), 4.5)
+        self.assertEqual(to_float('4,5'), 4.5)
+        self.assertEqual(to_float('4.5/5 sao'), 4.5)
+        self.assertEqual(to_float('-15.5%'), -15.5)
+        self.assertEqual(to_float(4), 4.0)
+
+    def test_to_float_reads_thousands_separators(self):
+        self.assertEqual(to_float('1.299.000 ₫'), 1299000.0)
+        self.assertEqual(to_float('15.000đ'), 15000.0)
+        self.assertEqual(to_float('1,299,000'), 1299000.0)
+        self.assertEqual(to_float('1.299,5'), 1299.5)
+        self.assertEqual(to_float('1,299.5'), 1299.5)
+
+    def test_to_float_rejects_non_numbers(self):
+        for value in (None, True, '', 'Liên hệ', '1.2.3'):
+            self.assertIsNone(to_float(value), value)
+
+    def test_product_row_parses_string_rating(self):
+        row = product_row({'id': '7', 'price': '1.299.000', 'rating': '4.5'})
+        self.assertEqual((row['id'], row['price'], row['rating']), (7, 1299000.0, 4.5))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'scraping'))
+from extract_data import extract_scraping_data
+from review_index import ReviewIndex, review_key
+
+
+class TestReviewIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.index_file = os.path.join(self.tmpdir.name, 'review_index.txt')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_key_uses_id_or_normalized_fingerprint(self):
+        self.assertEqual(review_key(1, {'id': 42}), 'id:42')
+        self.assertEqual(review_key(1, {'review_id': 42.0}), 'id:42')
+        a = review_key('https://shopee.vn/p', {'author': 'An', 'time': '2024-05-01', 'content': 'Hàng  đẹp'})
+        b = review_key('https://shopee.vn/p', {'author': 'an', 'time': '2024-05-01', 'content': 'hàng đẹp '})
+        c = review_key('https://shopee.vn/q', {'author': 'An', 'time': '2024-05-01', 'content': 'Hàng đẹp'})
+        self.assertEqual(a, b)
+        self.assertNotEqual(a, c)
+
+    def test_filter_new_persists_across_runs(self):
+        reviews = [{'id': 1}, {'id': 2}, {'id': 1}, {'author': 'An', 'content': 'tốt'}]
+        index = ReviewIndex(self.index_file)
+        self.assertEqual(len(index.filter_new(7, reviews)), 3)
+
+        reloaded = ReviewIndex(self.index_file)
+        self.assertEqual(len(reloaded), 3)
+        self.assertEqual(reloaded.filter_new(7, reviews + [{'id': 3}]), [{'id': 3}])
+
+    def test_select_new_marks_nothing_until_keys_are_added(self):
+        index = ReviewIndex(self.index_file)
+        kept, keys = index.select_new(7, [{'id': 1}, {'id': 1}, {'id': 2}])
+        self.assertEqual(kept, [{'id': 1}, {'id': 2}])
+        self.assertEqual(len(index), 0)
+
+        index.add_keys(keys, commit=False)
+        self.assertEqual(index.select_new(7, [{'id': 2}]), ([], []))
+        self.assertEqual(len(ReviewIndex(self.index_file)), 0)
+        index.commit()
+        self.assertEqual(len(ReviewIndex(self.index_file)), 2)
+
+    def test_extract_drops_duplicate_reviews(self):
+        path = os.path.join(self.tmpdir.name, 'tiki_product.json')
+        product = {'id': 1, 'name': 'a', 'reviews': [{'id': 10, 'content': 'x'}, {'content': 'y', 'author': 'B'}]}
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump([product], f)
+            json.dump([product], f)
+
+        _, reviews_df = extract_scraping_data(path)
+        self.assertEqual(len(reviews_df), 2)
+
+        index = ReviewIndex(self.index_file)
+        extract_scraping_data(path, review_index=index)
+        # Khóa chỉ được ghi khi caller đã lưu reviews và commit
+        self.assertEqual(len(ReviewIndex(self.index_file)), 0)
+        index.commit()
+        _, again = extract_scraping_data(path, review_index=ReviewIndex(self.index_file))
+        self.assertEqual(len(again), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
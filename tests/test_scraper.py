@@ -1,5 +1,69 @@
+import os
+import tempfile
+import time
 import unittest
-from src.retriv import ShopeeScraper
+from selenium.common.exceptions import NoSuchElementException, StaleElementReferenceException
+from src.retriv import FIRST_REVIEW_JS, ShopeeScraper
+from raw_archive import RawArchive, iter_index, read_record  # on sys.path once src.retriv is imported
+from review_index import ReviewIndex
+
+
+class FakeReviewDriver:
+    """Ratings list that is re-rendered (old container goes stale) on every page change."""
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.page = 0
+        self.container = object()
+
+    def _check(self, container):
+        if container is not self.container:
+            raise StaleElementReferenceException('stale ratings list')
+
+    def find_element(self, by, value):
+        if value == 'product-ratings__list':
+            return self.container
+        if value == 'shopee-svg-icon icon-arrow-right' and self.page + 1 < len(self.pages):
+            return self
+        raise NoSuchElementException(value)
+
+    def find_elements(self, by, value):
+        return [self.container]
+
+    def click(self):
+        self.page += 1
+        self.container = object()
+
+    def execute_script(self, script, container):
+        self._check(container)
+        reviews = [{'author': 'a', 'rating': 5, 'time': '', 'content': text, 'seller_respond': '', 'like_count': 0}
+                   for text in self.pages[self.page]]
+        if script == FIRST_REVIEW_JS:
+            return reviews[0]['content']
+        return reviews
+
+class FakeNetworkDriver:
+    """Resource timing buffer that stops growing at 250 entries unless cleared and raised."""
+
+    def __init__(self):
+        self.entries = 250
+        self.limit = 250
+
+    def fetch(self):
+        self.entries = min(self.entries + 1, self.limit)
+
+    def execute_script(self, script, reset):
+        if reset:
+            self.entries, self.limit = 0, 10000
+        return ['complete', self.entries]
+
+class FakePageDriver:
+    def get(self, url):
+        self.current_url = url
+        self.page_source = f'<html>{url}</html>'
+
+    def execute_script(self, script, reset):
+        return ['complete', 0]
 
 class TestShopeeScraper(unittest.TestCase):
 
@@ -36,5 +100,69 @@ class TestShopeeScraper(unittest.TestCase):
         # Here we can only check if the method exists
         self.assertTrue(hasattr(self.scraper, '_retrieve_products'))
 
+    def test_seen_reviews_keep_saved_comments(self):
+        saved = {'author': 'an', 'time': '2024-05-01', 'content': 'hàng đẹp'}
+        product = {'link': 'https://shopee.vn/p', 'total_rating': 1, 'comments': [saved]}
+        self.scraper._store_comments(product, [dict(saved)])
+        self.scraper._store_comments(product, [dict(saved)])
+        self.assertEqual(product['comments'], [saved])
+        self.assertTrue(product['comments_scraped'])
+
+        # Ratings exist but no review could be collected: not marked as scraped
+        failed = {'link': 'https://shopee.vn/q', 'total_rating': 1, 'comments': []}
+        self.scraper._store_comments(failed, [])
+        self.assertNotIn('comments_scraped', failed)
+
+    def test_review_keys_are_committed_after_save(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            index_file = os.path.join(tmpdir, 'review_index.txt')
+            self.scraper.review_index = ReviewIndex(index_file)
+            self.scraper.out_file = os.path.join(tmpdir, 'shopee_test.json')
+            product = {'link': 'https://shopee.vn/p', 'total_rating': 1, 'comments': []}
+            self.scraper._store_comments(product, [{'author': 'an', 'time': '', 'content': 'ok'}])
+            self.assertEqual(len(ReviewIndex(index_file)), 0)
+
+            self.scraper.output_data = {product['link']: product}
+            self.scraper._periodic_save()
+            self.assertEqual(len(ReviewIndex(index_file)), 1)
+
+    def test_missing_comments_skips_products_already_scraped(self):
+        scraped = []
+        self.scraper._scrape_details = scraped.append
+        self.scraper._periodic_save = lambda: None
+        self.scraper.output_data = {
+            'a': {'link': 'a', 'comments': []},
+            'b': {'link': 'b', 'comments': [], 'comments_scraped': True},
+            'c': {'link': 'c', 'comments': [{'content': 'ok'}]},
+        }
+        self.scraper._scrape_missing_comments()
+        self.assertEqual([p['link'] for p in scraped], ['a'])
+
+    def test_network_idle_counts_past_full_resource_buffer(self):
+        driver = FakeNetworkDriver()
+        idle = self.scraper._network_idle(0.2)
+        deadline = time.monotonic() + 0.4
+        while time.monotonic() < deadline:
+            driver.fetch()
+            self.assertFalse(idle(driver))
+            time.sleep(0.02)
+        time.sleep(0.25)
+        self.assertTrue(idle(driver))
+
+    def test_safe_get_archives_page_source(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            self.scraper.raw_archive = RawArchive(tmpdir)
+            self.scraper.driver = FakePageDriver()
+            self.assertTrue(self.scraper._safe_get('https://shopee.vn/p'))
+            self.scraper.raw_archive.close()
+            entries = list(iter_index(tmpdir))
+            self.assertEqual([(e['kind'], e['url']) for e in entries], [('shopee_page_html', 'https://shopee.vn/p')])
+            self.assertEqual(read_record(tmpdir, entries[0])['body'], '<html>https://shopee.vn/p</html>')
+
+    def test_collect_reviews_follows_rerendered_list(self):
+        self.scraper.driver = FakeReviewDriver([['r1', 'r2'], ['r3', 'r4'], ['r5']])
+        reviews = self.scraper._collect_reviews(10)
+        self.assertEqual([r['content'] for r in reviews], ['r1', 'r2', 'r3', 'r4', 'r5'])
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
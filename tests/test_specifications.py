@@ -0,0 +1,54 @@
+import os
+import sys
+import unittest
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'scraping'))
+from specifications import AttributeKeys, normalize_specifications, pivot_specifications
+
+
+class TestSpecifications(unittest.TestCase):
+
+    def _products(self):
+        return pd.DataFrame([
+            {'id': 1, 'specifications': [
+                {'name': 'RAM', 'value': '8 GB'},
+                {'name': 'ROM', 'value': '256GB'},
+                {'name': 'Kích thước màn hình', 'value': '6,7 inch'},
+            ]},
+            {'id': 2, 'specifications': [
+                {'name': ' ram ', 'value': '12GB'},
+                {'name': 'Bộ nhớ trong', 'value': '1 TB'},
+                {'name': 'ROM', 'value': '512 GB'},
+                {'name': 'Xuất xứ', 'value': 'Việt Nam'},
+            ]},
+            {'id': 3, 'specifications': []},
+        ])
+
+    def test_normalize_interns_attribute_names(self):
+        attributes, keys = normalize_specifications(self._products())
+        self.assertEqual(keys.names, ['ram', 'rom', 'kích thước màn hình', 'bộ nhớ trong', 'xuất xứ'])
+        self.assertEqual(str(attributes['attr_key_id'].dtype), 'int32')
+        self.assertEqual(len(attributes), 7)
+        self.assertEqual(attributes[attributes['product_id'] == 2]['attr_key_id'].tolist(), [0, 3, 1, 4])
+
+    def test_keys_stay_stable_across_chunks(self):
+        keys = AttributeKeys(['xuất xứ'])
+        _, keys = normalize_specifications(self._products(), keys)
+        self.assertEqual(keys.ids['xuất xứ'], 0)
+        self.assertEqual(keys.ids['ram'], 1)
+
+    def test_pivot_parses_typed_columns(self):
+        attributes, keys = normalize_specifications(self._products())
+        pivot = pivot_specifications(attributes, keys).set_index('product_id')
+        self.assertEqual(pivot.loc[1, 'ram_gb'], 8.0)
+        self.assertEqual(pivot.loc[1, 'storage_gb'], 256.0)
+        self.assertAlmostEqual(pivot.loc[1, 'screen_inch'], 6.7)
+        # ROM được ưu tiên hơn "Bộ nhớ trong"
+        self.assertEqual(pivot.loc[2, 'storage_gb'], 512.0)
+        self.assertTrue(pd.isna(pivot.loc[2, 'screen_inch']))
+
+
+if __name__ == '__main__':
+    unittest.main()
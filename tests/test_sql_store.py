@@ -0,0 +1,98 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'scraping'))
+from price_history import PriceHistory
+from sql_store import SQLStore
+
+
+class TestSQLStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.store = SQLStore(os.path.join(self.tmpdir.name, 'tiki_data.db'), batch_size=2)
+
+    def tearDown(self):
+        self.store.close()
+        self.tmpdir.cleanup()
+
+    def test_upsert_keeps_one_row_per_key(self):
+        product = {'id': 1, 'name': 'iPhone', 'price': 100, 'rating': 4.5, 'search_category': 'phone',
+                   'brand': {'id': 3, 'name': 'Apple'},
+                   'reviews': [{'id': 10, 'content': 'hàng đẹp', 'rating': 5, 'time': 1758166281}],
+                   'specifications': [{'name': 'RAM', 'value': '8GB'}]}
+        self.store.write_product(product)
+        # Lần scrape sau: giá đổi, thiếu brand, review cũ xuất hiện lại
+        self.store.write_product({'id': 1, 'price': 90, 'reviews': [{'id': 10, 'content': 'hàng đẹp'}]})
+        self.store.flush()
+
+        products = self.store.load_products(['id', 'price', 'brand'])
+        self.assertEqual(products.to_dict('records'), [{'id': 1, 'price': 90.0, 'brand': 'Apple'}])
+        self.assertEqual(len(self.store.load_reviews(clean=False)), 1)
+
+    def test_load_reviews_applies_notebook_filters(self):
+        self.store.upsert_products([
+            {'id': 1, 'rating': 4.0, 'reviews': [{'id': 10, 'content': 'ok'}, {'id': 11, 'content': ''}]},
+            {'id': 2, 'rating': 0, 'reviews': [{'id': 20, 'content': 'ok'}]},
+        ])
+        self.store.upsert_products([{'id': 3, 'reviews': [{'id': 30, 'content': 'ok'}]}])
+        self.store.conn.execute('DELETE FROM products WHERE id = 3')
+
+        self.assertEqual(list(self.store.load_reviews(['review_id'])['review_id']), [10])
+        self.assertEqual(len(self.store.load_reviews(clean=False)), 4)
+
+    def test_load_products_by_category_uses_index(self):
+        plan = self.store.conn.execute(
+            "EXPLAIN QUERY PLAN SELECT * FROM products WHERE search_category = 'phone'"
+        ).fetchall()
+        self.assertIn('idx_products_search_category', str(plan))
+
+
+class TestPriceHistory(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, 'tiki_data.db')
+        self.day = 86400
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _run(self, run_ts, products):
+        history = PriceHistory(self.db_path, run_ts=run_ts)
+        changes = history.record(products)
+        history.close()
+        return changes
+
+    def test_sink_flushes_at_batch_size(self):
+        history = PriceHistory(self.db_path, run_ts=0, batch_size=2)
+        history.write_product({'id': 1, 'price': 100, 'reviews': [{'id': 10}]})
+        history.write_observation({'id': 2, 'price': 200})
+        self.assertEqual((len(history.pending), history.changes_written), (0, 2))
+        history.write_product({'id': 3, 'price': 300})
+        self.assertEqual(len(history.pending), 1)
+        history.close()
+        self.assertEqual(history.changes_written, 3)
+
+    def test_only_changes_are_stored(self):
+        self.assertEqual(self._run(0, [{'id': 1, 'price': 100, 'discount': 0}]), 2)
+        self.assertEqual(self._run(self.day, [{'id': 1, 'price': 100, 'discount': 0}]), 0)
+        self.assertEqual(self._run(2 * self.day, [{'id': 1, 'price': 80, 'discount': 20}]), 2)
+        self.assertEqual(self._run(3 * self.day, [{'id': 1, 'price': 100, 'discount': 0}]), 2)
+
+        history = PriceHistory(self.db_path)
+        series = history.price_series(1)
+        self.assertEqual(list(series['value']), [100, 80, 100])
+        rows = history.conn.execute('SELECT COUNT(*) FROM product_history').fetchone()[0]
+        self.assertEqual(rows, 6)
+
+        changed = history.changed_products('discount', days=2, now=3 * self.day)
+        self.assertEqual(changed[['product_id', 'old_value', 'new_value']].values.tolist(),
+                         [[1, 0, 20], [1, 20, 0]])
+        history.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'scraping'))
+from extract_data import iter_products
+from streams import JsonlSink, open_stream
+
+
+class TestStreams(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _products(self, start, count):
+        return [{'id': i, 'name': f'Sản phẩm {i}', 'description': '<p>Mô tả dài</p>' * 50}
+                for i in range(start, start + count)]
+
+    def test_sink_roundtrip_and_ratio(self):
+        for ext in ('.jsonl', '.jsonl.gz', '.jsonl.zst'):
+            path = os.path.join(self.tmpdir.name, 'products' + ext)
+            sink = JsonlSink(path)
+            for product in self._products(0, 20):
+                sink.write_product(product)
+            sink.flush()
+            sink.close()
+            products = list(iter_products(path))
+            self.assertEqual([p['id'] for p in products], list(range(20)))
+            self.assertEqual(products[3]['name'], 'Sản phẩm 3')
+            if ext != '.jsonl':
+                self.assertGreater(sink.metrics['compression_ratio'], 5)
+
+    def test_append_runs_and_resume_from_offset(self):
+        path = os.path.join(self.tmpdir.name, 'products.jsonl.zst')
+        sink = JsonlSink(path)
+        for product in self._products(0, 5):
+            sink.write_product(product)
+        sink.close()
+        offset = os.path.getsize(path)
+
+        sink = JsonlSink(path)
+        for product in self._products(5, 3):
+            sink.write_product(product)
+        sink.close()
+
+        self.assertEqual(len(list(iter_products(path))), 8)
+        self.assertEqual([p['id'] for p in iter_products(path, start_offset=offset)], [5, 6, 7])
+
+    def test_open_stream_text_gzip(self):
+        path = os.path.join(self.tmpdir.name, 'data.json.gz')
+        with open_stream(path, 'wt') as f:
+            f.write('[{"id": 1}, {"id": 2}]')
+        self.assertEqual([p['id'] for p in iter_products(path)], [1, 2])
+
+
+if __name__ == '__main__':
+    unittest.main()
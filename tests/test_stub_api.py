@@ -0,0 +1,46 @@
+import asyncio
+import os
+import sys
+import unittest
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+from json_labeling import build_prompt, parse_answer, retry_after
+from stub_api import StubConfig, StubServer, benchmark, stub_label, synthetic_comments
+
+
+class TestStubApi(unittest.TestCase):
+
+    def test_answer_is_deterministic_with_injected_faults(self):
+        items = synthetic_comments(200)
+        prompt = build_prompt(items)
+        clean = parse_answer(StubServer().answer(prompt))
+        self.assertEqual(clean, {it['global_index']: stub_label(it['content']) for it in items})
+
+        server = StubServer(StubConfig(drop_rate=0.1, malformed_rate=0.1, seed=1))
+        faulty = parse_answer(server.answer(prompt))
+        self.assertEqual(len(faulty), 200 - server.counters['dropped'] - server.counters['malformed'])
+        self.assertTrue(all(clean[idx] == label for idx, label in faulty.items()))
+        self.assertEqual(faulty, parse_answer(StubServer(StubConfig(drop_rate=0.1, malformed_rate=0.1, seed=1))
+                                              .answer(prompt)))
+
+    def test_benchmark_recovers_from_faults(self):
+        config = StubConfig(error_rate=0.1, drop_rate=0.05, malformed_rate=0.05, rate_limit=20, rate_window=0.2)
+        result = asyncio.run(benchmark(300, config, concurrency=4, chunk_size=20, retry_delay=0.01))
+        server = result['server']
+        self.assertGreater(server['errors'] + server['rate_limited'], 0)
+        self.assertGreater(server['dropped'] + server['malformed'], 0)
+        self.assertGreater(result['requeued'], 0)
+        # Every comment is either labeled correctly or reported as unlabeled
+        self.assertAlmostEqual(result['accuracy'], 1 - result['unlabeled'] / 300)
+        self.assertGreater(result['tokens'], 0)
+
+    def test_retry_after_header(self):
+        error = RuntimeError('429')
+        error.response = SimpleNamespace(headers={'retry-after': '1.5'})
+        self.assertEqual(retry_after(error), 1.5)
+        self.assertEqual(retry_after(RuntimeError('boom')), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src', 'scraping'))
+import tiki_data
+from price_history import PriceHistory
+from product_index import ProductIndex
+from review_index import ReviewIndex
+from streams import JsonlSink
+
+
+class FakeContext:
+    async def add_init_script(self, script):
+        pass
+
+    async def new_page(self):
+        return object()
+
+    async def storage_state(self, path=None):
+        pass
+
+
+class FakeBrowser:
+    async def new_context(self, **kwargs):
+        return FakeContext()
+
+    async def close(self):
+        pass
+
+
+class FakeFirefox:
+    async def launch(self, **kwargs):
+        return FakeBrowser()
+
+
+class FakePlaywright:
+    firefox = FakeFirefox()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class OfflineScraper(tiki_data.TikiPlaywrightScraper):
+    """Scraper với kết quả tìm kiếm/chi tiết cố định, không mở browser"""
+
+    def __init__(self, search_results, workdir, **kwargs):
+        super().__init__('iphone', headless=True, **kwargs)
+        self.search_results = search_results
+        self.output_file = os.path.join(workdir, 'tiki_product.json')
+        self.state_file = os.path.join(workdir, 'tiki_state.json')
+        self.detail_requests = 0
+
+    async def _search_products(self, page):
+        self.request_count += 1
+        return [dict(product) for product in self.search_results]
+
+    async def _scrape_product_details(self, page, product):
+        self.detail_requests += 1
+        product['reviews'] = [{'id': product['id'] * 10, 'content': 'hàng đẹp'}]
+
+    async def _human_like_delay(self, min_sec=1, max_sec=3):
+        pass
+
+
+class TestTikiScraper(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.dir = self.tmpdir.name
+        self.index_file = os.path.join(self.dir, 'product_index.jsonl')
+        self.review_index_file = os.path.join(self.dir, 'review_index.txt')
+        self.history_path = os.path.join(self.dir, 'history.db')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def run_scrape(self, search_results, run_ts):
+        """Một lần chạy như main(): scrape, đóng sink rồi mới commit index"""
+        product_index = ProductIndex(self.index_file)
+        review_index = ReviewIndex(self.review_index_file)
+        history = PriceHistory(self.history_path, run_ts=run_ts)
+        scraper = OfflineScraper(search_results, self.dir, product_index=product_index,
+                                 review_index=review_index, sinks=[history])
+        with mock.patch.object(tiki_data, 'async_playwright', FakePlaywright):
+            products = asyncio.run(scraper.scrape())
+        history.close()
+        product_index.commit()
+        review_index.commit()
+        return scraper, products
+
+    def test_known_product_price_change_is_recorded(self):
+        first, products = self.run_scrape([{'id': 1, 'name': 'iPhone', 'price': 100, 'discount': 0}], run_ts=0)
+        self.assertEqual((first.detail_requests, len(products)), (1, 1))
+
+        second, products = self.run_scrape([{'id': 1, 'name': 'iPhone', 'price': 80, 'discount': 20}],
+                                            run_ts=86400)
+        # Sản phẩm đã có trong index không bị lấy lại chi tiết nhưng giá mới vẫn được ghi
+        self.assertEqual((second.detail_requests, second.known_products, products), (0, 1, []))
+
+        history = PriceHistory(self.history_path)
+        self.assertEqual(list(history.price_series(1)['value']), [100, 80])
+        changed = history.changed_products('discount', days=2, now=86400)
+        self.assertEqual(changed[['product_id', 'old_value', 'new_value']].values.tolist(), [[1, 0, 20]])
+        history.close()
+
+    def test_indexes_are_not_written_before_commit(self):
+        product_index = ProductIndex(self.index_file)
+        review_index = ReviewIndex(self.review_index_file)
+        scraper = OfflineScraper([{'id': 1, 'price': 100}], self.dir, product_index=product_index,
+                                 review_index=review_index)
+        with mock.patch.object(tiki_data, 'async_playwright', FakePlaywright):
+            asyncio.run(scraper.scrape())
+        self.assertIn(1, product_index)
+        self.assertEqual((len(ProductIndex(self.index_file)), len(ReviewIndex(self.review_index_file))), (0, 0))
+
+    def test_jsonl_sink_replaces_json_dump(self):
+        jsonl_path = os.path.join(self.dir, 'tiki.jsonl')
+        sink = JsonlSink(jsonl_path)
+        scraper = OfflineScraper([{'id': i, 'price': 100} for i in range(1, 7)], self.dir, sinks=[sink])
+        with mock.patch.object(tiki_data, 'async_playwright', FakePlaywright):
+            asyncio.run(scraper.scrape())
+        sink.close()
+        self.assertFalse(os.path.exists(scraper.output_file))
+        with open(jsonl_path, encoding='utf-8') as f:
+            self.assertEqual(sorted(json.loads(line)['id'] for line in f), [1, 2, 3, 4, 5, 6])
+
+
+if __name__ == '__main__':
+    unittest.main()